@@ -0,0 +1,166 @@
+"""
+Lazy access to the Cloudinary SDK.
+
+Nothing is imported or configured at startup; the SDK is loaded and
+configured from `settings.CLOUDINARY` the first time it is actually used.
+
+Calls that reach Cloudinary's servers go through the client named by
+`settings.CLOUDINARY_CLIENT`, so tests and offline development can swap
+in `OfflineCloudinaryClient` (or a mock) without touching the models.
+"""
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_configured = False
+
+
+def get_cloudinary():
+    global _configured
+    import cloudinary
+
+    if not _configured:
+        cloudinary.config(**settings.CLOUDINARY)
+        _configured = True
+    return cloudinary
+
+
+def get_uploader():
+    get_cloudinary()
+    import cloudinary.uploader
+    return cloudinary.uploader
+
+
+def get_api():
+    get_cloudinary()
+    import cloudinary.api
+    return cloudinary.api
+
+
+def get_upload_folder(owner_id):
+    """Folder a direct upload of `owner_id` is signed for."""
+    return f"{getattr(settings, 'CLOUDINARY_UPLOAD_FOLDER', 'flats')}/{owner_id}"
+
+
+class CloudinaryClient:
+    """Uploads, deletions and upload signatures against the Cloudinary API."""
+
+    allowed_formats = "jpg,jpeg,png,webp"
+
+    def upload(self, file, **options):
+        """Upload a file, returns a CloudinaryResource."""
+        return get_uploader().upload_resource(file, **options)
+
+    def destroy(self, public_id, **options):
+        return get_uploader().destroy(public_id, **options)
+
+    def delete_resources(self, public_ids):
+        return get_api().delete_resources(public_ids)
+
+    def sign_upload(self, owner_id):
+        """
+        Parameters (signature included) the client posts with its file to
+        `upload_url`. The signature pins the owner's folder and the formats.
+        """
+        config = get_cloudinary().config()
+        params = {
+            "timestamp": int(time.time()),
+            "folder": get_upload_folder(owner_id),
+            "allowed_formats": self.allowed_formats,
+        }
+        params["signature"] = get_cloudinary().utils.api_sign_request(params, config.api_secret)
+        params["api_key"] = config.api_key
+        return {
+            "upload_url": f"https://api.cloudinary.com/v1_1/{config.cloud_name}/image/upload",
+            "params": params,
+        }
+
+    def verify_upload(self, public_id, version, signature):
+        """Check the signature Cloudinary returned with a direct upload."""
+        return get_cloudinary().utils.verify_api_response_signature(public_id, version, signature)
+
+    def resource(self, public_id, version=None, format=None, type="upload", resource_type="image"):
+        return get_cloudinary().CloudinaryResource(
+            public_id=public_id, version=version, format=format, type=type, resource_type=resource_type
+        )
+
+
+class OfflineCloudinaryClient(CloudinaryClient):
+    """
+    Client that never leaves the process: uploads get generated public_ids
+    and are recorded in `uploads`, deletions in `deleted`. Signatures are
+    real (they are computed locally), so the direct-upload flow works.
+    """
+
+    def __init__(self):
+        self.uploads = []
+        self.deleted = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def upload(self, file, **options):
+        with self._lock:
+            public_id = f"offline/{next(self._ids)}"
+            self.uploads.append((public_id, getattr(file, "name", None)))
+        extension = os.path.splitext(getattr(file, "name", "") or "")[1].lstrip(".") or "jpg"
+        return self.resource(
+            public_id, version=1, format=extension,
+            type=options.get("type", "upload"), resource_type=options.get("resource_type", "image"),
+        )
+
+    def destroy(self, public_id, **options):
+        with self._lock:
+            self.deleted.append(public_id)
+        return {"result": "ok"}
+
+    def delete_resources(self, public_ids):
+        with self._lock:
+            self.deleted.extend(public_ids)
+        return {"deleted": {public_id: "deleted" for public_id in public_ids}}
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client():
+    """The configured client, one instance per process."""
+    path = getattr(settings, "CLOUDINARY_CLIENT", "config.cloud.CloudinaryClient")
+    with _clients_lock:
+        if path not in _clients:
+            _clients[path] = import_string(path)()
+        return _clients[path]
+
+
+_executor = None
+
+
+def get_upload_executor():
+    """Thread pool for uploading a request's images in parallel (CLOUDINARY_UPLOAD_WORKERS)."""
+    global _executor
+    with _clients_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "CLOUDINARY_UPLOAD_WORKERS", 4),
+                thread_name_prefix="cloudinary-upload",
+            )
+        return _executor
+
+
+def destroy(public_id, **options):
+    return get_client().destroy(public_id, **options)
+
+
+def delete_resources(public_ids, batch_size=100):
+    """Delete many images with one Admin API call per 100 public_ids."""
+    public_ids = list(public_ids)
+    for start in range(0, len(public_ids), batch_size):
+        try:
+            get_client().delete_resources(public_ids[start:start + batch_size])
+        except Exception as e:
+            print(f"Error deleting images from Cloudinary: {e}")
@@ -0,0 +1,128 @@
+import gzip
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+def _gzip(content):
+    return gzip.compress(content, compresslevel=6, mtime=0)
+
+
+def _brotli(content):
+    return brotli.compress(content, quality=5)
+
+
+# Preferred encoding first
+ENCODERS = {}
+if brotli is not None:
+    ENCODERS["br"] = _brotli
+ENCODERS["gzip"] = _gzip
+
+_QVALUE_RE = re.compile(r";\s*q\s*=\s*([0-9.]+)")
+
+
+def get_min_size():
+    return getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+
+
+def get_content_types():
+    return getattr(settings, "COMPRESSION_CONTENT_TYPES", ("application/json",))
+
+
+def is_compressible(content_type, size):
+    """Check the size threshold and the content-type allow-list."""
+    if size < get_min_size():
+        return False
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return media_type in get_content_types()
+
+
+def compress_all(content, content_type):
+    """Precompress a body with every available encoding (used when caching responses)."""
+    if not is_compressible(content_type, len(content)):
+        return {}
+    encoded = {}
+    for encoding, encoder in ENCODERS.items():
+        compressed = encoder(content)
+        if len(compressed) < len(content):
+            encoded[encoding] = compressed
+    return encoded
+
+
+def accepted_encodings(accept_encoding):
+    """Codings of an Accept-Encoding header with a non-zero q-value ("gzip;q=0" refuses gzip)."""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding = item.split(";")[0].strip()
+        match = _QVALUE_RE.search(item)
+        try:
+            quality = float(match.group(1)) if match else 1.0
+        except ValueError:
+            quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    accepted = accepted_encodings(accept_encoding)
+    for encoding in ENCODERS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli (when installed) or gzip.
+
+    Responses carrying a `precompressed` dict ({encoding: bytes}) — set by the
+    cached views — are served from it instead of being compressed again.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+
+        precompressed = getattr(response, "precompressed", None)
+        if precompressed is None and not is_compressible(
+            response.get("Content-Type"), len(response.content)
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if precompressed is not None:
+            compressed = precompressed.get(encoding)
+        else:
+            compressed = ENCODERS[encoding](response.content)
+
+        # Not worth it (or not precompressed for this encoding)
+        if compressed is None or len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+
+        # The body changed, so a strong ETag is no longer valid
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+
+        return response
@@ -0,0 +1,85 @@
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import json
+
+try:
+    import orjson
+except ImportError:  # Fall back to DRF's stdlib based classes
+    orjson = None
+
+
+if orjson is not None:
+    # Datetimes go through DRF's encoder ("Z" suffix for UTC), everything
+    # orjson doesn't know natively (Decimal, lazy strings, ...) as well.
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson.
+
+    For compact, unicode output it produces the same JSON as DRF's renderer,
+    byte for byte except floats in exponent notation (orjson writes `1e16`
+    where the stdlib writes `1e+16`, the same number). Indented output
+    (browsable API, `; indent=` media types), non-default JSON settings and
+    data orjson can't encode (integers beyond 64 bits, ...) use the stdlib
+    implementation.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except TypeError:  # orjson.JSONEncodeError included
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict javascript subset escaping as DRF
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser backed by orjson, with the stdlib parser for anything orjson rejects."""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read() if stream is not None else b''
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass
+
+        # orjson is strict; let the stdlib decide (NaN/Infinity, error messages)
+        try:
+            parse_constant = json.strict_constant if self.strict else None
+            return json.loads(body.decode(encoding), parse_constant=parse_constant)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+def is_enabled():
+    """True when orjson is installed and the DRF JSON settings allow the fast path."""
+    return orjson is not None and api_settings.UNICODE_JSON and api_settings.COMPACT_JSON
@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections, router
+from django.utils.functional import cached_property
+
+
+# Below this many rows an exact COUNT is cheap enough to keep
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimated_count(model):
+    """
+    Planner estimate of the table's row count (PostgreSQL `reltuples`), kept
+    up to date by autovacuum/ANALYZE. None on other databases or when the
+    table has never been analyzed.
+    """
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+def is_unfiltered(queryset):
+    return hasattr(queryset, "query") and not queryset.query.where and not queryset.query.is_sliced
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin change lists of big tables: the unfiltered list
+    uses the planner estimate instead of a full COUNT(*), filtered lists
+    and small tables still count exactly.
+    """
+
+    @cached_property
+    def count(self):
+        if is_unfiltered(self.object_list):
+            estimate = estimated_count(self.object_list.model)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+def count_rows(queryset):
+    """
+    Row count for a paginated API list, as (count, is_exact).
+
+    Unfiltered lists of big tables use the planner estimate
+    (API_ESTIMATE_COUNTS), those of small tables or without an estimate
+    (SQLite) count exactly; filtered lists count at most API_COUNT_CAP + 1
+    rows, so a broad search reports "1000+" instead of counting every match.
+    """
+    if is_unfiltered(queryset):
+        if getattr(settings, "API_ESTIMATE_COUNTS", True):
+            estimate = estimated_count(queryset.model)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate, False
+        return queryset.count(), True
+
+    cap = getattr(settings, "API_COUNT_CAP", None)
+    if cap is None:
+        return queryset.count(), True
+
+    # SELECT COUNT(*) FROM (... LIMIT cap + 1): stops scanning after the cap
+    count = queryset.order_by()[:cap + 1].count()
+    if count > cap:
+        return cap, False
+    return count, True
+
+
+class InexactPage(Page):
+    """Page of a list with an approximate count: "next" comes from the rows themselves."""
+
+    def __init__(self, object_list, number, paginator, more):
+        super().__init__(object_list, number, paginator)
+        self.more = more
+
+    def has_next(self):
+        return self.more
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator with a count computed up front (see count_rows). When the
+    count isn't exact, pages past it stay reachable and each page reads one
+    extra row to know whether another page follows.
+    """
+
+    def __init__(self, object_list, per_page, count, count_is_exact=True, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+        self.count_is_exact = count_is_exact
+
+    def validate_number(self, number):
+        if self.count_is_exact:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        if self.count_is_exact:
+            return super().page(number)
+
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        return InexactPage(rows[:self.per_page], number, self, more=len(rows) > self.per_page)
@@ -0,0 +1,254 @@
+"""
+Opt-in request profiling.
+
+A random sample of requests (PROFILING_SAMPLE_RATE) runs under cProfile.
+The other requests are watched by a stack sampler and kept only when they
+took longer than PROFILING_SLOW_THRESHOLD. The hottest functions of every
+kept request go to a bounded ring buffer per URL name in the shared cache,
+so the staff endpoint and the `profiling_report` command see all workers.
+
+With PROFILING_ENABLED off the middleware removes itself at startup and
+costs nothing.
+"""
+import cProfile
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+
+INDEX_KEY = "profiling:url_names"
+BUFFER_KEY = "profiling:profiles:{}"
+
+
+def get_cache():
+    return caches[getattr(settings, "PROFILING_CACHE", "default")]
+
+
+def get_top_functions():
+    return getattr(settings, "PROFILING_TOP_FUNCTIONS", 20)
+
+
+def get_buffer_size():
+    return getattr(settings, "PROFILING_BUFFER_SIZE", 50)
+
+
+_path_prefixes = None
+
+
+def function_label(key):
+    """'package/module.py:12(name)' for a pstats-style (filename, lineno, name) key."""
+    global _path_prefixes
+    filename, lineno, name = key
+    if filename == "~":  # Built-in functions
+        return name
+
+    if _path_prefixes is None:
+        _path_prefixes = sorted({os.path.join(path, "") for path in sys.path if path}, key=len, reverse=True)
+    for prefix in _path_prefixes:
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    return f"{filename}:{lineno}({name})"
+
+
+def profiled_functions(profiler, top):
+    """Functions of a cProfile run with the most time spent in themselves."""
+    stats = pstats.Stats(profiler).stats
+    hottest = sorted(stats.items(), key=lambda item: -item[1][2])[:top]
+    return [
+        {
+            "function": function_label(key),
+            "calls": calls,
+            "self_ms": round(self_time * 1000, 2),
+            "total_ms": round(total_time * 1000, 2),
+        }
+        for key, (_, calls, self_time, total_time, _) in hottest
+    ]
+
+
+def sampled_functions(self_samples, total_samples, interval, top):
+    """Functions seen on top of the sampled stacks most often, times estimated from the interval."""
+    return [
+        {
+            "function": function_label(key),
+            "calls": None,
+            "self_ms": round(count * interval * 1000, 2),
+            "total_ms": round(total_samples[key] * interval * 1000, 2),
+        }
+        for key, count in self_samples.most_common(top)
+    ]
+
+
+def code_key(code):
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+class StackSampler:
+    """
+    Background thread that snapshots the stacks of the threads serving
+    watched requests every `interval` seconds. It sleeps while no request
+    is watched.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.watched = {}  # thread id -> (self samples, total samples)
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def watch(self, thread_id):
+        counters = (Counter(), Counter())
+        with self.lock:
+            self.watched[thread_id] = counters
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="profiling-sampler", daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+        return counters
+
+    def unwatch(self, thread_id):
+        with self.lock:
+            self.watched.pop(thread_id, None)
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.watched:
+                    self.wakeup.clear()
+                    continue
+                frames = sys._current_frames()
+                for thread_id, (self_samples, total_samples) in self.watched.items():
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    self_samples[code_key(frame.f_code)] += 1
+                    stack = set()
+                    while frame is not None:
+                        stack.add(code_key(frame.f_code))
+                        frame = frame.f_back
+                    total_samples.update(stack)
+
+
+def record(url_name, entry):
+    """Append a profile to the URL name's ring buffer (best effort, concurrent writes may drop one)."""
+    cache = get_cache()
+    key = BUFFER_KEY.format(url_name)
+    profiles = cache.get(key) or []
+    profiles.append(entry)
+    cache.set(key, profiles[-get_buffer_size():], None)
+
+    url_names = cache.get(INDEX_KEY) or []
+    if url_name not in url_names:
+        cache.set(INDEX_KEY, url_names + [url_name], None)
+
+
+def get_profiles(url_name=None):
+    """{url name: [profile, ...]} oldest first, for one URL name or all of them."""
+    cache = get_cache()
+    url_names = [url_name] if url_name else cache.get(INDEX_KEY) or []
+    profiles = cache.get_many([BUFFER_KEY.format(name) for name in url_names])
+    return {name: profiles.get(BUFFER_KEY.format(name), []) for name in url_names}
+
+
+def clear_profiles():
+    cache = get_cache()
+    url_names = cache.get(INDEX_KEY) or []
+    cache.delete_many([INDEX_KEY] + [BUFFER_KEY.format(name) for name in url_names])
+
+
+def summarize(profiles, top=None):
+    """Request count, latency and the functions with the most self time over all profiles of a URL name."""
+    self_ms = Counter()
+    total_ms = Counter()
+    for profile in profiles:
+        for function in profile["functions"]:
+            self_ms[function["function"]] += function["self_ms"]
+            total_ms[function["function"]] += function["total_ms"]
+
+    durations = [profile["duration_ms"] for profile in profiles]
+    return {
+        "profiles": len(profiles),
+        "slow": sum(profile["reason"] == "slow" for profile in profiles),
+        "mean_ms": round(sum(durations) / len(durations), 2) if durations else None,
+        "max_ms": max(durations, default=None),
+        "functions": [
+            {"function": name, "self_ms": round(ms, 2), "total_ms": round(total_ms[name], 2)}
+            for name, ms in self_ms.most_common(top or get_top_functions())
+        ],
+    }
+
+
+class ProfilingMiddleware:
+    """
+    Profile PROFILING_SAMPLE_RATE of the requests with cProfile and keep
+    stack samples of requests slower than PROFILING_SLOW_THRESHOLD (ms).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.01)
+        self.slow_threshold = getattr(settings, "PROFILING_SLOW_THRESHOLD", 1000)
+        self.interval = getattr(settings, "PROFILING_SAMPLE_INTERVAL", 0.005)
+        self.sampler = StackSampler(self.interval) if self.slow_threshold is not None else None
+
+    def __call__(self, request):
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.profile(request)
+        if self.sampler is None:
+            return self.get_response(request)
+
+        thread_id = threading.get_ident()
+        self_samples, total_samples = self.sampler.watch(thread_id)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            self.sampler.unwatch(thread_id)
+            duration_ms = (time.perf_counter() - started) * 1000
+            if duration_ms >= self.slow_threshold:
+                self.store(
+                    request, duration_ms, "slow",
+                    sampled_functions(self_samples, total_samples, self.interval, get_top_functions()),
+                )
+
+    def profile(self, request):
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            return self.get_response(request)
+        finally:
+            profiler.disable()
+            duration_ms = (time.perf_counter() - started) * 1000
+            self.store(request, duration_ms, "sampled", profiled_functions(profiler, get_top_functions()))
+
+    def store(self, request, duration_ms, reason, functions):
+        match = getattr(request, "resolver_match", None)
+        url_name = match.view_name if match and match.view_name else "<unresolved>"
+        try:
+            record(url_name, {
+                "path": request.path,
+                "method": request.method,
+                "reason": reason,
+                "duration_ms": round(duration_ms, 2),
+                "at": timezone.now().isoformat(),
+                "functions": functions,
+            })
+        except Exception as e:
+            # Profiling must never fail the request
+            print(f"Error storing request profile: {e}")
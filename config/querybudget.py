@@ -0,0 +1,81 @@
+"""
+Query budgets for tests.
+
+`QueryBudgetMixin` is mixed into a Django TestCase and gives two
+assertions: a request stays within a fixed number of queries, and a
+request doesn't issue more queries when there are more rows to show
+(the N+1 detector). Failures list the SQL that was run.
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .sql import fingerprint
+
+
+# Most budgets keep the shared cache tier in memory, so they count the
+# queries of the endpoint, not cache round trips. DATABASE_CACHES is the
+# production setup (the shared tier is the api_cache table): budgets run
+# with it count the cache's own queries too. Both check for writes of
+# other workers on every read, so counts don't depend on timing.
+LOCAL_CACHES = {
+    "default": {
+        "BACKEND": "config.tiered_cache.TieredCache",
+        "OPTIONS": {"L2": "shared", "VERSION_CHECK_INTERVAL": 0},
+    },
+    "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "querybudget"},
+}
+
+DATABASE_CACHES = {
+    "default": LOCAL_CACHES["default"],
+    "shared": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "api_cache"},
+}
+
+
+def format_queries(queries):
+    return "\n".join(f"  {number}. {sql}" for number, sql in enumerate(queries, start=1))
+
+
+class QueryBudgetMixin:
+    """TestCase mixin with query budget and N+1 assertions."""
+
+    def capture_queries(self, func):
+        """
+        Run `func` and return (result, sql list). Callbacks queued with
+        transaction.on_commit run (and count) as they would after a commit.
+        """
+        with CaptureQueriesContext(connection) as context:
+            with self.captureOnCommitCallbacks(execute=True):
+                result = func()
+        return result, [query["sql"] for query in context.captured_queries]
+
+    def assertQueryBudget(self, budget, func, label=None):
+        result, queries = self.capture_queries(func)
+        if len(queries) > budget:
+            self.fail(
+                f"{label or 'Call'} ran {len(queries)} queries, the budget is {budget}:\n"
+                f"{format_queries(queries)}"
+            )
+        return result
+
+    def assertNoNPlusOne(self, func, grow, label=None):
+        """
+        Run `func`, let `grow` add rows, run `func` again: the second run
+        must not issue more queries. The cache is cleared before each run
+        so both go to the database.
+        """
+        cache.clear()
+        _, before = self.capture_queries(func)
+        self.capture_queries(grow)
+        cache.clear()
+        _, after = self.capture_queries(func)
+
+        if len(after) > len(before):
+            repeated = Counter(map(fingerprint, after)) - Counter(map(fingerprint, before))
+            self.fail(
+                f"{label or 'Call'} went from {len(before)} to {len(after)} queries when rows were added. "
+                f"Queries that grew with the data:\n"
+                + "\n".join(f"  +{count}  {sql}" for sql, count in repeated.most_common())
+            )
@@ -0,0 +1,182 @@
+"""
+Slow query log.
+
+A database execute wrapper times every query of a request (or of any
+block run in `slow_query_log`) and keeps the ones slower than
+SLOW_QUERY_THRESHOLD. At the end of the block they are merged into
+per-fingerprint totals in the shared cache: count, total and max time,
+the views that ran them and one example statement. With
+SLOW_QUERY_EXPLAIN the plan of each fingerprint is captured once.
+`manage.py slow_query_report` prints the aggregate.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .sql import fingerprint
+
+
+INDEX_KEY = "querylog:fingerprints"
+ENTRY_KEY = "querylog:entry:{}"
+
+# Set while the log runs its own queries (cache writes, EXPLAIN)
+_local = threading.local()
+
+
+def get_cache():
+    return caches[getattr(settings, "SLOW_QUERY_CACHE", "default")]
+
+
+def get_threshold():
+    return getattr(settings, "SLOW_QUERY_THRESHOLD", 100)
+
+
+def get_max_fingerprints():
+    return getattr(settings, "SLOW_QUERY_MAX_FINGERPRINTS", 500)
+
+
+def fingerprint_id(value):
+    return hashlib.blake2b(value.encode(), digest_size=8).hexdigest()
+
+
+class SlowQueryRecorder:
+    """Execute wrapper collecting the slow queries of one block, tagged with `origin`."""
+
+    def __init__(self, origin):
+        self.origin = origin
+        self.threshold = get_threshold()
+        self.queries = []  # (alias, sql, params, duration_ms, origin)
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, "busy", False):
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if duration_ms >= self.threshold:
+                alias = context["connection"].alias
+                self.queries.append((alias, sql, None if many else params, duration_ms, self.origin))
+
+
+def explain(alias, sql, params):
+    """Plan of a SELECT, or None. Runs in a savepoint so a failure leaves the transaction usable."""
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    connection = connections[alias]
+    try:
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+
+
+def flush(queries):
+    """Merge slow queries into the per-fingerprint totals."""
+    cache = get_cache()
+    capture_plans = getattr(settings, "SLOW_QUERY_EXPLAIN", True)
+
+    grouped = {}
+    for alias, sql, params, duration_ms, origin in queries:
+        key = fingerprint(sql)
+        group = grouped.setdefault(key, {"queries": [], "example": (alias, sql, params)})
+        group["queries"].append((duration_ms, origin))
+        # Keep the slowest statement as the example
+        if duration_ms >= max(duration for duration, _ in group["queries"]):
+            group["example"] = (alias, sql, params)
+
+    index = cache.get(INDEX_KEY) or []
+    now = timezone.now().isoformat()
+    for key, group in grouped.items():
+        entry_id = fingerprint_id(key)
+        entry_key = ENTRY_KEY.format(entry_id)
+        entry = cache.get(entry_key)
+        if entry is None:
+            if len(index) >= get_max_fingerprints():
+                continue
+            index.append(entry_id)
+            entry = {
+                "fingerprint": key, "example": group["example"][1], "count": 0, "total_ms": 0.0,
+                "max_ms": 0.0, "views": {}, "explain": None, "first_seen": now,
+            }
+
+        durations = [duration for duration, _ in group["queries"]]
+        entry["count"] += len(durations)
+        entry["total_ms"] = round(entry["total_ms"] + sum(durations), 2)
+        if max(durations) > entry["max_ms"]:
+            entry["max_ms"] = round(max(durations), 2)
+            entry["example"] = group["example"][1]
+        entry["views"] = dict(Counter(entry["views"]) + Counter(origin for _, origin in group["queries"]))
+        entry["last_seen"] = now
+
+        if capture_plans and entry["explain"] is None:
+            entry["explain"] = explain(*group["example"])
+
+        cache.set(entry_key, entry, None)
+    cache.set(INDEX_KEY, index, None)
+
+
+@contextmanager
+def slow_query_log(origin):
+    """Record the slow queries run inside the block on every database connection."""
+    recorder = SlowQueryRecorder(origin)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        try:
+            yield recorder
+        finally:
+            stack.close()
+            if recorder.queries:
+                _local.busy = True
+                try:
+                    flush(recorder.queries)
+                except Exception as e:
+                    # The log must never fail the request
+                    print(f"Error storing slow queries: {e}")
+                finally:
+                    _local.busy = False
+
+
+def get_entries():
+    """Per-fingerprint totals, slowest in total first."""
+    cache = get_cache()
+    index = cache.get(INDEX_KEY) or []
+    entries = cache.get_many([ENTRY_KEY.format(entry_id) for entry_id in index])
+    return sorted(entries.values(), key=lambda entry: -entry["total_ms"])
+
+
+def clear_entries():
+    cache = get_cache()
+    index = cache.get(INDEX_KEY) or []
+    cache.delete_many([INDEX_KEY] + [ENTRY_KEY.format(entry_id) for entry_id in index])
+
+
+class SlowQueryLogMiddleware:
+    """Run each request in `slow_query_log`, tagging queries with the URL name of the view."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "SLOW_QUERY_LOG_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Queries before URL resolution (e.g. the session user) are tagged "<middleware>"
+        with slow_query_log("<middleware>") as recorder:
+            request.slow_query_recorder = recorder
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        request.slow_query_recorder.origin = match.view_name or view_func.__qualname__
@@ -15,9 +15,6 @@ from datetime import timedelta
 import environ
 import dj_database_url
 import os
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -61,6 +58,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Add this line at the top
+    'config.profiling.ProfilingMiddleware',  # Removes itself unless PROFILING_ENABLED
+    'config.querylog.SlowQueryLogMiddleware',  # Removes itself unless SLOW_QUERY_LOG_ENABLED
+    'config.compression.CompressionMiddleware',  # gzip / brotli, reuses precompressed cached bodies
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -154,19 +154,34 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # orjson backed, same output as DRF's JSONRenderer (stdlib fallback without orjson)
+    'DEFAULT_RENDERER_CLASSES': (
+        'config.fastjson.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'config.fastjson.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),  # Set the access token lifetime
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),    # Set the refresh token lifetime
-    'ROTATE_REFRESH_TOKENS': False,                # Set to True if you want to issue a new refresh token on access token refresh
+    'ROTATE_REFRESH_TOKENS': True,                 # Set to True if you want to issue a new refresh token on access token refresh
     'BLACKLIST_AFTER_ROTATION': True,              # Set to True if you want old refresh tokens to become invalid after use
+    'TOKEN_REFRESH_SERIALIZER': 'user_profile.tokens.RevocableTokenRefreshSerializer',  # Revocation without token_blacklist queries
     'ALGORITHM': 'HS256',                          # Default signing algorithm
     'SIGNING_KEY': SECRET_KEY,                     # Secret key for token signing
     'AUTH_HEADER_TYPES': ('Bearer',),              # Header prefix for access tokens
 }
 
+TOKEN_REVOCATION_CAPACITY = 1_000_000  # Revoked refresh tokens the bloom filter holds before a rebuild
+TOKEN_REVOCATION_EXACT_SIZE = 100_000  # Most recent revocations kept as an exact in-memory set
+TOKEN_REVOCATION_SYNC_INTERVAL = 1.0  # Seconds between pulls of revocations made by other workers
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -184,14 +199,82 @@ EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD")  # Use an App Password if using
 
 
 
-cloudinary.config( 
-  cloud_name = env('CLOUD_NAME'), 
-  api_key = env('API_KEY'), 
-  api_secret = env('API_SECRET')
-)
+# Cloudinary is imported and configured lazily on first use (see config/cloud.py)
+CLOUDINARY = {
+    'cloud_name': env('CLOUD_NAME'),
+    'api_key': env('API_KEY'),
+    'api_secret': env('API_SECRET'),
+}
 
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
+# 'config.cloud.OfflineCloudinaryClient' keeps uploads in memory (tests, offline development)
+CLOUDINARY_CLIENT = env('CLOUDINARY_CLIENT', default='config.cloud.CloudinaryClient')
+CLOUDINARY_UPLOAD_FOLDER = 'flats'  # Direct uploads are signed for <folder>/<owner id>
+CLOUDINARY_UPLOAD_WORKERS = 4  # Threads uploading the files of one request in parallel
+
+
+# Response compression (brotli is used when the package is installed)
+COMPRESSION_MIN_SIZE = 1024  # bytes
+COMPRESSION_CONTENT_TYPES = (
+    'application/json',
+    'text/html',
+    'text/plain',
+)
+
+# Cache
+# L1: per-worker LRU, L2: the shared database cache table (python manage.py createcachetable)
+CACHES = {
+    'default': {
+        'BACKEND': 'config.tiered_cache.TieredCache',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 60,  # Seconds, whatever the entry's own timeout
+            'VERSION_CHECK_INTERVAL': 1,  # Seconds between checks for writes made by other workers
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'api_cache',
+    },
+}
+
+API_CACHE_TIMEOUT = 60 * 15  # Home, categories and locations responses
+API_CACHE_LOCK_WAIT = 5  # Seconds a worker waits for another one rebuilding the same cache entry
+WARM_CACHE_ON_START = env.bool("WARM_CACHE_ON_START", default=False)  # gunicorn post_worker_init runs warm_cache
+
+API_ESTIMATE_COUNTS = True  # Unfiltered big lists report the PostgreSQL row estimate
+API_COUNT_CAP = 1000  # Filtered lists stop counting here ("1000+"), None for exact counts
+
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24  # Seconds a stored Idempotency-Key response is replayed
+
+INQUIRY_EMAILS_ENABLED = env.bool("INQUIRY_EMAILS_ENABLED", default=True)  # Inquiries always land in the owner's inbox
+INQUIRY_DIGEST_WINDOW = 60 * 60  # Seconds of inquiries coalesced into one email for owners on digest delivery
+
+# Request profiling (config/profiling.py), see GET /api/profiling/ or manage.py profiling_report
+PROFILING_ENABLED = env.bool("PROFILING_ENABLED", default=False)
+PROFILING_SAMPLE_RATE = 0.01  # Share of requests run under cProfile
+PROFILING_SLOW_THRESHOLD = 1000  # ms, slower requests keep their stack samples (None: no sampler)
+PROFILING_SAMPLE_INTERVAL = 0.005  # Seconds between stack samples of watched requests
+PROFILING_TOP_FUNCTIONS = 20  # Functions kept per profile
+PROFILING_BUFFER_SIZE = 50  # Profiles kept per URL name
+PROFILING_CACHE = 'shared'  # Written straight to the shared tier, profiles don't need the L1
+
+# Slow query log (config/querylog.py), see manage.py slow_query_report
+SLOW_QUERY_LOG_ENABLED = env.bool("SLOW_QUERY_LOG_ENABLED", default=False)
+SLOW_QUERY_THRESHOLD = 100  # ms
+SLOW_QUERY_EXPLAIN = True  # Capture the plan of each fingerprint once
+SLOW_QUERY_MAX_FINGERPRINTS = 500  # New fingerprints are dropped past this
+SLOW_QUERY_CACHE = 'shared'
+
+FLAT_ARCHIVE_AFTER_DAYS = 365  # manage.py archive_flats hides flats not updated for this long (None: never)
+
+SIMILAR_FLATS_REFRESH_INTERVAL = 60  # Seconds between checks for changes made by other workers
+
+AUTOCOMPLETE_REFRESH_INTERVAL = 60  # Seconds a worker serves its title index before checking for changes
+AUTOCOMPLETE_BACKGROUND_REBUILD = True  # Rebuild in a thread and keep serving the old index meanwhile
+
 
 CORS_ALLOWED_ORIGINS = [
     "https://easyrent-kushtia.netlify.app",
@@ -211,4 +294,5 @@ CORS_ALLOW_HEADERS = (
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 )
\ No newline at end of file
@@ -0,0 +1,12 @@
+"""SQL helpers shared by the query budgets (tests) and the slow query log."""
+import re
+
+
+def fingerprint(sql):
+    """The query with its literals and IN lists replaced, so repeats of one query compare equal."""
+    sql = re.sub(r'SAVEPOINT "\w+"', "SAVEPOINT ?", sql)
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = sql.replace("%s", "?")
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    sql = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(...)", sql)
+    return re.sub(r"\s+", " ", sql).strip()
@@ -0,0 +1,281 @@
+"""
+Two-tier cache backend.
+
+L1 is a small LRU dict inside each worker, L2 a shared backend (another
+CACHES alias, e.g. the database cache table). Reads are served from L1
+when possible. Keys are grouped in namespaces, their first two ":"
+separated parts ("flat:home:json" is in "flat:home"). Overwriting or
+deleting a key bumps its namespace's generation in L2, and each worker
+compares the generations of the namespaces it holds at most once per
+VERSION_CHECK_INTERVAL, dropping only the L1 entries of the ones that
+changed. A value changed by one worker is therefore never served stale by
+another for longer than that.
+
+`add` only succeeds on absent keys, which no worker can hold a live copy
+of, so it bumps nothing; lock keys (UNVERSIONED_SUFFIXES) never bump
+either and stay out of L1. L2 values carry their expiry, so an L1 copy
+never outlives the L2 entry it was read from.
+"""
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+GENERATION_KEY = "tiered:generation:{}"
+EPOCH_KEY = "tiered:epoch"  # Bumped by clear(), drops every L1
+WRAPPED = "tiered:1"  # Marks L2 values written by this backend
+_MISSING = object()
+
+
+def namespace(key):
+    return ":".join(key.split(":", 2)[:2])
+
+
+def shared_tier(cache):
+    """
+    The L2 of a TieredCache, any other backend as is: for small keys that
+    every worker must read fresh, like the version keys of in-memory indexes.
+    """
+    # Not isinstance(): django.core.cache.cache is a proxy to the backend
+    return getattr(cache, "l2", cache)
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.l2_alias = options.get("L2", "shared")
+        self.l1_max_entries = options.get("L1_MAX_ENTRIES", 1000)
+        self.l1_timeout = options.get("L1_TIMEOUT", 60)
+        self.check_interval = options.get("VERSION_CHECK_INTERVAL", 1.0)
+        self.unversioned_suffixes = tuple(options.get("UNVERSIONED_SUFFIXES", (":lock",)))
+
+        self._l1 = OrderedDict()  # l1 key -> (expires_at, pickled value, namespace)
+        self._lock = threading.Lock()
+        self._generations = {}  # namespace -> generation the L1 entries were read under
+        self._epoch = None
+        self._checked_at = 0.0
+        self._hits = {"l1": 0, "l2": 0, "miss": 0}
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _versioned(self, key):
+        return not key.endswith(self.unversioned_suffixes)
+
+    # L2 values are (WRAPPED, expires_at, value), expires_at a time.time() or None
+
+    def _timeout(self, timeout):
+        """Resolved here, so L2 stores the entry for as long as its wrapper says."""
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _wrap(self, value, timeout):
+        return (WRAPPED, self.get_backend_timeout(timeout), value)
+
+    @staticmethod
+    def _unwrap(entry):
+        """(expires_at, value), or _MISSING for absent keys and values in another format."""
+        if isinstance(entry, tuple) and len(entry) == 3 and entry[0] == WRAPPED:
+            return entry[1:]
+        return _MISSING
+
+    @staticmethod
+    def _remaining(expires_at):
+        return None if expires_at is None else expires_at - time.time()
+
+    # L1
+
+    def _check_generations(self):
+        """
+        Drop the L1 entries of the namespaces written to by any worker since
+        our last check: one L2 read per interval, for all of them.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            namespaces = list(self._generations)
+        keys = [GENERATION_KEY.format(name) for name in namespaces]
+        current = self.l2.get_many(keys + [EPOCH_KEY])
+
+        with self._lock:
+            epoch = current.get(EPOCH_KEY)
+            if epoch != self._epoch:
+                self._l1.clear()
+                self._generations.clear()
+                self._epoch = epoch
+            else:
+                changed = {
+                    name for name, key in zip(namespaces, keys)
+                    if name in self._generations and current.get(key) != self._generations[name]
+                }
+                if changed:
+                    for l1_key in [k for k, entry in self._l1.items() if entry[2] in changed]:
+                        del self._l1[l1_key]
+                    for name in changed:
+                        del self._generations[name]
+            self._checked_at = now
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] <= time.monotonic():
+                del self._l1[key]
+                return _MISSING
+            self._l1.move_to_end(key)
+            return entry[1]
+
+    def _l1_set(self, key, value, name, remaining, generation=_MISSING):
+        """
+        Keep a copy for at most L1_TIMEOUT and never longer than the L2 entry
+        (`remaining` seconds, None: no expiry). `generation` is the one of
+        `name` read together with the value, needed when it isn't tracked yet.
+        """
+        timeout = self.l1_timeout if remaining is None else min(remaining, self.l1_timeout)
+        if timeout <= 0:
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if name not in self._generations:
+                if generation is _MISSING:
+                    return
+                self._generations[name] = generation
+            self._l1[key] = (time.monotonic() + timeout, pickled, name)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._l1.pop(key, None)
+
+    def _written(self, keys):
+        """Keys were overwritten or deleted: forget our copies and bump their namespaces."""
+        self._l1_delete(*[self.make_and_validate_key(key) for key in keys])
+        names = {namespace(key) for key in keys if self._versioned(key)}
+        if names:
+            generation = time.time_ns()
+            self.l2.set_many({GENERATION_KEY.format(name): generation for name in names}, None)
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        self._check_generations()
+
+        pickled = self._l1_get(l1_key)
+        if pickled is not _MISSING:
+            self._hits["l1"] += 1
+            return pickle.loads(pickled)
+
+        name = namespace(key)
+        versioned = self._versioned(key)
+        with self._lock:
+            tracked = name in self._generations
+        if versioned and not tracked:
+            # The value and the generation it belongs to, in one round trip
+            generation_key = GENERATION_KEY.format(name)
+            found = self.l2.get_many([key, generation_key], version=version)
+            entry = self._unwrap(found.get(key))
+            generation = self.l2.get(generation_key) if version else found.get(generation_key)
+        else:
+            entry, generation = self._unwrap(self.l2.get(key, version=version)), _MISSING
+
+        if entry is _MISSING:
+            self._hits["miss"] += 1
+            return default
+        self._hits["l2"] += 1
+        expires_at, value = entry
+        if versioned:
+            self._l1_set(l1_key, value, name, self._remaining(expires_at), generation)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        self.l2.set(key, self._wrap(value, timeout), timeout, version=version)
+        self._written([key])
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Locks rely on add() being atomic, so it is decided by L2 alone
+        timeout = self._timeout(timeout)
+        return self.l2.add(key, self._wrap(value, timeout), timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        # The expiry is part of the stored value, so the value is written again
+        entry = self._unwrap(self.l2.get(key, version=version))
+        if entry is _MISSING:
+            return False
+        self.set(key, entry[1], timeout, version=version)
+        return True
+
+    def delete(self, key, version=None):
+        deleted = self.l2.delete(key, version=version)
+        self._written([key])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l2.delete_many(keys, version=version)
+        self._written(keys)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        failed = self.l2.set_many(
+            {key: self._wrap(value, timeout) for key, value in data.items()}, timeout, version=version
+        )
+        self._written(list(data))
+        return failed
+
+    def has_key(self, key, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        self._check_generations()
+        return self._l1_get(l1_key) is not _MISSING or self._unwrap(self.l2.get(key, version=version)) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        # Like BaseCache.incr a read and a write, but the key keeps its expiry
+        entry = self._unwrap(self.l2.get(key, version=version))
+        if entry is _MISSING:
+            raise ValueError("Key '%s' not found" % key)
+        expires_at, value = entry
+        value += delta
+        remaining = self._remaining(expires_at)
+        self.set(key, value, None if remaining is None else max(remaining, 0.001), version=version)
+        return value
+
+    def clear(self):
+        self.l2.clear()
+        with self._lock:
+            self._l1.clear()
+            self._generations.clear()
+        self.l2.set(EPOCH_KEY, time.time_ns(), None)
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+    # Stats
+
+    def stats(self):
+        """Hit rates of this worker since it started."""
+        hits = dict(self._hits)
+        reads = sum(hits.values())
+        l2_reads = hits["l2"] + hits["miss"]
+        return {
+            "pid": os.getpid(),
+            "reads": reads,
+            "l1_entries": len(self._l1),
+            "l1_hits": hits["l1"],
+            "l2_hits": hits["l2"],
+            "misses": hits["miss"],
+            "l1_hit_rate": round(hits["l1"] / reads, 4) if reads else None,
+            "l2_hit_rate": round(hits["l2"] / l2_reads, 4) if l2_reads else None,
+            "overall_hit_rate": round((hits["l1"] + hits["l2"]) / reads, 4) if reads else None,
+        }
@@ -1,24 +1,91 @@
 from django.contrib import admin
+from config.pagination import EstimatedCountPaginator
+from .archive import archive_flats, restore_flats, listings_changed
 from .models import (
     Flat,
+    FlatFeature,
+    FlatAvailability,
+    FlatBooking,
+    Inquiry,
     Category,
     Location
 )
 # Register your models here.
 
+class FlatFeatureInline(admin.TabularInline):
+    model = FlatFeature
+    extra = 0
+
+
+class FlatAvailabilityInline(admin.TabularInline):
+    model = FlatAvailability
+    extra = 0
+
+
+class FlatBookingInline(admin.TabularInline):
+    model = FlatBooking
+    extra = 0
+    raw_id_fields = ("renter",)
+
+
 class FlatAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ('title',)}
-    
-    
+    inlines = [FlatFeatureInline, FlatAvailabilityInline, FlatBookingInline]
+
+    # 🔹 Change list: one query for the page, no COUNT(*) over the whole table
+    list_display = ("title", "owner", "category", "location", "price", "is_active", "created_at")
+    list_select_related = ("owner", "category", "location")
+    list_filter = ("category", "location", "is_active")
+    search_fields = ("=slug", "=owner__email")  # Exact (iexact) lookups on indexed columns
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # 🔹 Change form: no <select> with every user in it
+    raw_id_fields = ("owner", "renters_who_messaged")
+    autocomplete_fields = ("category", "location")
+
+    actions = ["archive", "restore"]
+
+    def delete_queryset(self, request, queryset):
+        """Bulk "delete selected": one DELETE and batched Cloudinary cleanup"""
+        Flat.bulk_delete(queryset)
+
+    @admin.action(description="Archive selected flats (hide from listings)")
+    def archive(self, request, queryset):
+        ids = archive_flats(queryset)
+        if ids:
+            listings_changed()
+        self.message_user(request, f"{len(ids)} flats archived.")
+
+    @admin.action(description="Restore selected flats")
+    def restore(self, request, queryset):
+        ids = restore_flats(queryset)
+        if ids:
+            listings_changed()
+        self.message_user(request, f"{len(ids)} flats restored.")
+
+
 class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ('title',)}
+    search_fields = ("title",)
     
     
 class LocationAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ('title',)}
+    search_fields = ("title",)
+
+
+class InquiryAdmin(admin.ModelAdmin):
+    list_display = ("flat", "owner", "first_name", "last_name", "email", "created_at", "read_at")
+    list_select_related = ("flat", "owner")
+    search_fields = ("=owner__email", "=email")
+    raw_id_fields = ("flat", "owner", "renter")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     
     
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Flat, FlatAdmin)
-admin.site.register(Location, LocationAdmin)
\ No newline at end of file
+admin.site.register(Location, LocationAdmin)
+admin.site.register(Inquiry, InquiryAdmin)
@@ -0,0 +1,106 @@
+import datetime
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Flat, FlatCard
+from . import autocomplete, cache, similarity
+from .saved_searches import discard_pending_matches, match_flats
+
+
+def get_archive_after():
+    """Days without an update after which a flat is archived (None: never)."""
+    return getattr(settings, "FLAT_ARCHIVE_AFTER_DAYS", 365)
+
+
+def stale_flats(days=None):
+    """Active flats not updated for `days` days, read through the partial updated_at index."""
+    days = get_archive_after() if days is None else days
+    if days is None:
+        return Flat.objects.none()
+    cutoff = timezone.now().date() - datetime.timedelta(days=days)
+    return Flat.objects.filter(is_active=True, updated_at__lt=cutoff)
+
+
+def listings_changed():
+    """Archiving and restoring bypass the save signals: drop what is derived from the cards."""
+    cache.invalidate(*cache.LISTING_CACHE_KEYS)
+    similarity.invalidate()
+    autocomplete.invalidate()
+
+
+def archive_flats(queryset):
+    """
+    Archive the active flats of `queryset` in one transaction: one UPDATE
+    flags them, their listing cards and pending saved-search matches are
+    deleted, so public listings (which read the cards) no longer see them.
+    Rows locked by a concurrent request are skipped. Returns the ids.
+    """
+    with transaction.atomic():
+        ids = list(
+            queryset.filter(is_active=True)
+            .select_for_update(skip_locked=True)
+            .values_list("id", flat=True)
+        )
+        if ids:
+            Flat.objects.filter(id__in=ids).update(is_active=False, archived_at=timezone.now())
+            FlatCard.objects.filter(flat_id__in=ids).delete()
+            discard_pending_matches(ids)
+    return ids
+
+
+def restore_flats(queryset):
+    """
+    Put archived flats of `queryset` back into the listings: their cards
+    are rebuilt in one INSERT and saved searches they match are notified.
+    """
+    with transaction.atomic():
+        flats = list(
+            queryset.filter(is_active=False)
+            .select_for_update(of=("self",))
+            .select_related("owner", "category", "location")
+        )
+        if flats:
+            Flat.objects.filter(id__in=[flat.id for flat in flats]).update(is_active=True, archived_at=None)
+            for flat in flats:
+                flat.is_active, flat.archived_at = True, None
+            FlatCard.objects.bulk_create(
+                [FlatCard(flat=flat, **FlatCard.values_for(flat)) for flat in flats],
+                ignore_conflicts=True,
+            )
+            match_flats(flats)
+    return [flat.id for flat in flats]
+
+
+def archive_stale(days=None, batch_size=500, pause=0.0, dry_run=False):
+    """
+    Archive stale flats in batches of `batch_size`, each in its own short
+    transaction, sleeping `pause` seconds in between. Yields the number of
+    flats archived per batch; caches are invalidated once at the end.
+    """
+    queryset = stale_flats(days)
+    if dry_run:
+        yield queryset.count()
+        return
+
+    archived = 0
+    last_id = 0
+    try:
+        while True:
+            # Keyset over the ids: flats skipped because they were locked don't stall the loop
+            batch = list(queryset.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1]
+
+            # The staleness is checked again under the lock
+            ids = archive_flats(queryset.filter(id__in=batch))
+            archived += len(ids)
+            yield len(ids)
+            if pause:
+                time.sleep(pause)
+    finally:
+        if archived:
+            listings_changed()
@@ -0,0 +1,183 @@
+import heapq
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count
+
+from config.tiered_cache import shared_tier
+
+
+VERSION_CACHE_KEY = "flat:autocomplete:version"
+
+MAX_RESULTS = 20
+# Prefixes matching more index entries than this get their top results
+# computed at build time, the rest are ranked on lookup
+RANKED_ON_LOOKUP = 256
+KEY_END = chr(sys.maxunicode)
+
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+
+class AutocompleteIndex:
+    """
+    Sorted prefix index over category, location and flat titles.
+
+    Every title is stored once per word, starting at that word ("gulshan
+    dhaka" and "dhaka"), so a query matches the start of any word. Items are
+    numbered by popularity, which makes ranking a prefix's matches a matter
+    of taking the smallest numbers in its bisected key range. Prefixes with
+    big ranges (short or common ones) are answered from a precomputed table.
+    """
+
+    def __init__(self, items):
+        # items: (popularity, type, id, title, slug), kept most popular first
+        self.items = sorted(items, key=lambda item: (-item[0], normalize(item[3])))
+
+        entries = []
+        for rank, (popularity, kind, item_id, title, slug) in enumerate(self.items):
+            words = normalize(title).split(" ")
+            for start in range(len(words)):
+                entries.append((" ".join(words[start:]), rank))
+        entries.sort()
+
+        self.keys = [key for key, rank in entries]
+        self.ranks = [rank for key, rank in entries]
+
+        self.top = {}
+        self._precompute("", 0, len(self.keys))
+
+    def _precompute(self, prefix, low, high):
+        """Top ranks of keys[low:high], all starting with `prefix`, recording the big ranges."""
+        if high - low <= RANKED_ON_LOOKUP:
+            return heapq.nsmallest(MAX_RESULTS, set(self.ranks[low:high]))
+
+        # Keys equal to the prefix sort first, then one child range per next character
+        depth = len(prefix)
+        exact = bisect_right(self.keys, prefix, low, high)
+        candidates = set(self.ranks[low:exact])
+        while exact < high:
+            child = self.keys[exact][:depth + 1]
+            end = bisect_right(self.keys, child + KEY_END, exact, high)
+            candidates.update(self._precompute(child, exact, end))
+            exact = end
+
+        top = heapq.nsmallest(MAX_RESULTS, candidates)
+        self.top[prefix] = top
+        return top
+
+    @classmethod
+    def from_database(cls):
+        from .models import Category, FlatCard, Inquiry, Location
+
+        flats_per_category = dict(
+            FlatCard.objects.order_by().values_list("category_id").annotate(Count("flat_id"))
+        )
+        flats_per_location = dict(
+            FlatCard.objects.order_by().values_list("location_id").annotate(Count("flat_id"))
+        )
+        inquiries_per_flat = dict(
+            Inquiry.objects.order_by().values_list("flat_id").annotate(Count("id"))
+        )
+
+        items = [
+            (flats_per_category.get(pk, 0), "category", pk, title, slug)
+            for pk, title, slug in Category.objects.values_list("id", "title", "slug")
+        ]
+        items += [
+            (flats_per_location.get(pk, 0), "location", pk, title, slug)
+            for pk, title, slug in Location.objects.values_list("id", "title", "slug")
+        ]
+        items += [
+            (inquiries_per_flat.get(pk, 0), "flat", pk, title, slug)
+            for pk, title, slug in FlatCard.objects.values_list("flat_id", "title", "slug").iterator(chunk_size=5000)
+        ]
+        return cls(items)
+
+    def suggest(self, query, limit=8):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_RESULTS)
+
+        ranks = self.top.get(prefix)
+        if ranks is None:
+            low = bisect_left(self.keys, prefix)
+            high = bisect_right(self.keys, prefix + KEY_END, low)
+            ranks = heapq.nsmallest(limit, set(self.ranks[low:high]))
+
+        suggestions = []
+        for rank in ranks[:limit]:
+            popularity, kind, item_id, title, slug = self.items[rank]
+            suggestions.append({"type": kind, "id": item_id, "title": title, "slug": slug})
+        return suggestions
+
+
+_index = None
+_index_version = None
+_checked_at = 0.0
+_rebuilding = None  # Thread building the next index, while the current one is served
+_lock = threading.Lock()
+
+
+def get_refresh_interval():
+    return getattr(settings, "AUTOCOMPLETE_REFRESH_INTERVAL", 60)
+
+
+def rebuilds_in_background():
+    return getattr(settings, "AUTOCOMPLETE_BACKGROUND_REBUILD", True)
+
+
+def invalidate():
+    """
+    Titles changed: every worker, this one included, rebuilds its index at
+    its next check, so a burst of saves costs one rebuild per interval.
+    The version is a timestamp, so setting it needs no read first.
+    """
+    shared_tier(cache).set(VERSION_CACHE_KEY, time.time_ns(), None)
+
+
+def _rebuild(version):
+    """Build the index of `version` in a background thread, then swap it in."""
+    global _index, _index_version, _rebuilding
+    try:
+        index = AutocompleteIndex.from_database()
+        with _lock:
+            _index, _index_version = index, version
+    finally:
+        with _lock:
+            _rebuilding = None
+        connections.close_all()  # This thread's own connections
+
+
+def get_index():
+    """
+    This process' index, built on first use and rebuilt when the shared
+    version key changed, checked at most once per refresh interval. Only
+    the first build blocks: later ones run in one background thread while
+    requests keep getting the old index (AUTOCOMPLETE_BACKGROUND_REBUILD).
+    """
+    global _index, _index_version, _checked_at, _rebuilding
+
+    now = time.monotonic()
+    with _lock:
+        if _index is not None and now - _checked_at < get_refresh_interval():
+            return _index
+        _checked_at = now
+
+        # Read before the rows: a change made during the build triggers another one
+        version = shared_tier(cache).get(VERSION_CACHE_KEY)
+        if _index is None or (version != _index_version and not rebuilds_in_background()):
+            _index, _index_version = AutocompleteIndex.from_database(), version
+        elif version != _index_version and _rebuilding is None:
+            _rebuilding = threading.Thread(
+                target=_rebuild, args=(version,), name="autocomplete-rebuild", daemon=True
+            )
+            _rebuilding.start()
+        return _index
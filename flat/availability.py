@@ -0,0 +1,82 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from .models import Flat, FlatAvailability, FlatBooking
+
+
+def parse_date_range(query_params):
+    """
+    Read `available_from` / `available_to` from the query string.
+    Returns (start, end) or None when the filter isn't used.
+    """
+    start = query_params.get("available_from")
+    end = query_params.get("available_to")
+    if not start and not end:
+        return None
+    if not start or not end:
+        raise ValidationError({"error": "Both available_from and available_to are required."})
+
+    try:
+        start, end = parse_date(start), parse_date(end)
+    except ValueError:
+        start = end = None
+    if start is None or end is None:
+        raise ValidationError({"error": "Dates must be in YYYY-MM-DD format."})
+    if end <= start:
+        raise ValidationError({"error": "available_to must be after available_from."})
+    return start, end
+
+
+def overlapping(queryset, start, end):
+    """Ranges of `queryset` overlapping the half-open range [start, end)."""
+    return queryset.filter(start_date__lt=end, end_date__gt=start)
+
+
+def filter_available(queryset, start, end):
+    """
+    Flats that are offered for the whole of [start, end) and not booked in it.
+    Both checks are correlated EXISTS subqueries on the (flat, start_date,
+    end_date) indexes, so the database does the work in one query. Touching
+    windows are merged when saved, so one window covers any offered stay.
+    """
+    offered = FlatAvailability.objects.filter(
+        flat=OuterRef("pk"), start_date__lte=start, end_date__gte=end
+    )
+    booked = overlapping(FlatBooking.objects.filter(flat=OuterRef("pk")), start, end)
+    return queryset.filter(Exists(offered), ~Exists(booked))
+
+
+def has_booking_overlap(flat_id, start, end):
+    """
+    Sorted-interval check: bookings of a flat don't overlap, so ordered by
+    start date only the last one starting before `end` can overlap
+    [start, end). That is one index seek instead of a range scan.
+    """
+    previous = (
+        FlatBooking.objects.filter(flat_id=flat_id, start_date__lt=end)
+        .order_by("-start_date")
+        .values_list("end_date", flat=True)
+        .first()
+    )
+    return previous is not None and previous > start
+
+
+def book_flat(flat, start, end, renter=None):
+    """Create a booking, refusing dates that aren't offered or are already booked."""
+    with transaction.atomic():
+        # Serialize concurrent bookings of the same flat
+        Flat.objects.select_for_update().filter(pk=flat.pk).values_list("pk").first()
+
+        if not FlatAvailability.objects.filter(flat=flat, start_date__lte=start, end_date__gte=end).exists():
+            raise ValidationError({"error": "The flat is not offered for these dates."})
+        if has_booking_overlap(flat.pk, start, end):
+            raise ValidationError({"error": "The flat is already booked for these dates."})
+
+        try:
+            with transaction.atomic():
+                return FlatBooking.objects.create(flat=flat, renter=renter, start_date=start, end_date=end)
+        except IntegrityError:
+            # PostgreSQL exclusion constraint, a concurrent booking won
+            raise ValidationError({"error": "The flat is already booked for these dates."})
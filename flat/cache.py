@@ -0,0 +1,127 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from config.compression import compress_all
+
+
+HOME_CACHE_KEY = "flat:home"
+CATEGORIES_CACHE_KEY = "flat:categories"
+LOCATIONS_CACHE_KEY = "flat:locations"
+CATEGORY_PAGE_CACHE_KEY = "flat:category_page"  # First page of each category, versioned
+
+# Everything that shows listing cards
+LISTING_CACHE_KEYS = (HOME_CACHE_KEY, CATEGORY_PAGE_CACHE_KEY)
+
+LOCK_TIMEOUT = 30  # Seconds a crashed worker can hold a rebuild lock
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_cache_timeout():
+    return getattr(settings, "API_CACHE_TIMEOUT", 60 * 15)
+
+
+def response_cache_key(base_key, renderer_format):
+    return f"{base_key}:{renderer_format}"
+
+
+def get_lock_wait():
+    return getattr(settings, "API_CACHE_LOCK_WAIT", 5)
+
+
+def category_page_key(category_id):
+    """One key per category, all dropped at once by bumping the version."""
+    version = cache.get(f"{CATEGORY_PAGE_CACHE_KEY}:version", 0)
+    return f"{CATEGORY_PAGE_CACHE_KEY}:{version}:{category_id}"
+
+
+def invalidate(*base_keys):
+    """Drop every cached rendering of the given views."""
+    if CATEGORY_PAGE_CACHE_KEY in base_keys:
+        cache.set(f"{CATEGORY_PAGE_CACHE_KEY}:version", time.time_ns(), None)
+    cache.delete_many(
+        [response_cache_key(key, fmt) for key in base_keys for fmt in ("json", "api", "data")]
+    )
+
+
+def get_or_compute(key, compute, timeout=None):
+    """
+    Cached value of `key`, computed by a single worker on a miss.
+
+    The first worker to miss takes a lock (cache.add) and recomputes; the
+    others wait for its result instead of running the same queries, and
+    only compute themselves if it takes longer than API_CACHE_LOCK_WAIT.
+    `compute` may return None for results that must not be cached.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + get_lock_wait()
+    while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return compute()
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+    try:
+        value = cache.get(key)  # Filled while we were taking the lock
+        if value is None:
+            value = compute()
+            if value is not None:
+                # add(): the key is absent, no worker holds a copy to invalidate
+                cache.add(key, value, timeout or get_cache_timeout())
+    finally:
+        cache.delete(lock_key)
+    return value
+
+
+def cached_data(base_key, build):
+    """
+    Serialized data of a cached list view, for responses that embed it
+    (e.g. bootstrap). Shares the view's key, so invalidate() drops both.
+    """
+    return get_or_compute(response_cache_key(base_key, "data"), build)
+
+
+class CachedResponseMixin:
+    """
+    Serve the rendered body of a read-only list view from the cache.
+
+    The entry also stores the body precompressed with every available
+    encoding, so `CompressionMiddleware` doesn't recompress hot responses.
+    """
+
+    cache_key = None
+
+    def get(self, request, *args, **kwargs):
+        key = response_cache_key(self.cache_key, request.accepted_renderer.format)
+        uncached = []
+
+        def render():
+            response = super(CachedResponseMixin, self).get(request, *args, **kwargs)
+            response = self.finalize_response(request, response, *args, **kwargs)
+            response.render()
+            if response.status_code != 200:
+                uncached.append(response)
+                return None
+
+            content_type = response["Content-Type"]
+            return {
+                "content": response.content,
+                "content_type": content_type,
+                "encoded": compress_all(response.content, content_type),
+            }
+
+        entry = get_or_compute(key, render)
+        if entry is None:
+            return uncached[0]
+
+        response = HttpResponse(entry["content"], content_type=entry["content_type"])
+        response.precompressed = entry["encoded"]
+        return response
@@ -0,0 +1,91 @@
+import re
+
+from django.core.files.uploadedfile import UploadedFile
+from django.db import models
+
+from config.cloud import get_cloudinary, get_client
+
+
+# Same format as cloudinary.models.CLOUDINARY_FIELD_DB_RE
+CLOUDINARY_FIELD_DB_RE = re.compile(
+    r'(?:(?P<resource_type>image|raw|video)/'
+    r'(?P<type>upload|private|authenticated)/)?'
+    r'(?:v(?P<version>\d+)/)?'
+    r'(?P<public_id>.*?)'
+    r'(\.(?P<format>[^.]+))?$'
+)
+
+
+class CloudinaryField(models.Field):
+    """
+    Drop-in for `cloudinary.models.CloudinaryField` that doesn't import the
+    Cloudinary SDK when the models are loaded, only when a value is first
+    read from the database or uploaded.
+
+    It deconstructs to the original field, so existing migrations still
+    describe it and no schema change is involved.
+    """
+
+    description = "A resource stored in Cloudinary"
+
+    def __init__(self, *args, **kwargs):
+        self.type = kwargs.pop("type", "upload")
+        self.resource_type = kwargs.pop("resource_type", "image")
+        kwargs["max_length"] = 255
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        return name, "cloudinary.models.CloudinaryField", args, kwargs
+
+    def get_internal_type(self):
+        return 'CharField'
+
+    def value_to_string(self, obj):
+        return self.get_prep_value(self.value_from_object(obj))
+
+    def parse_cloudinary_resource(self, value):
+        m = CLOUDINARY_FIELD_DB_RE.match(value)
+        return get_cloudinary().CloudinaryResource(
+            type=m.group('type') or self.type,
+            resource_type=m.group('resource_type') or self.resource_type,
+            version=m.group('version'),
+            public_id=m.group('public_id'),
+            format=m.group('format'),
+        )
+
+    def from_db_value(self, value, expression, connection):
+        if value is not None:
+            return self.parse_cloudinary_resource(value)
+
+    def to_python(self, value):
+        if value is None or value is False or isinstance(value, UploadedFile):
+            return value
+        if isinstance(value, str):
+            return self.parse_cloudinary_resource(value)
+        return value
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if isinstance(value, UploadedFile):
+            if hasattr(value, 'seekable') and value.seekable():
+                value.seek(0)
+            value = get_client().upload(value, type=self.type, resource_type=self.resource_type)
+            setattr(model_instance, self.attname, value)
+        return self.get_prep_value(value)
+
+    def get_prep_value(self, value):
+        if not value:
+            return self.get_default()
+        if isinstance(value, str):
+            return value
+        return value.get_prep_value()
+
+    def formfield(self, **kwargs):
+        from cloudinary.forms import CloudinaryFileField
+
+        options = {"type": self.type, "resource_type": self.resource_type}
+        options.update(kwargs.pop('options', {}))
+        defaults = {'form_class': CloudinaryFileField, 'options': options, 'autosave': False}
+        defaults.update(kwargs)
+        return super().formfield(**defaults)
@@ -0,0 +1,93 @@
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+def get_ttl():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 60 * 60 * 24))
+
+
+def purge_expired():
+    """Drop keys older than the TTL (uses the created_at index)."""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - get_ttl()).delete()
+    return deleted
+
+
+def request_hash(request):
+    """Fingerprint of the request body: a retry sends the same bytes again."""
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def reserve(user, key, path, body_hash=""):
+    """
+    Atomically claim `key` for `user`. Returns (record, None) when this
+    request owns the key, or (None, response) to answer a retry with.
+    """
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(user=user, key=key, path=path, request_hash=body_hash), None
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if record is None or record.created_at < timezone.now() - get_ttl():
+        # Expired (or just evicted): start over with a fresh reservation
+        IdempotencyKey.objects.filter(user=user, key=key).delete()
+        return reserve(user, key, path, body_hash)
+
+    # Keys stored before bodies were hashed have no hash to compare
+    if record.path != path or record.request_hash not in ("", body_hash):
+        return None, Response(
+            {"error": "This Idempotency-Key was used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.status_code is None:
+        return None, Response(
+            {"error": "A request with this Idempotency-Key is still being processed."},
+            status=status.HTTP_409_CONFLICT,
+        )
+    return None, Response(record.response, status=record.status_code, headers={"Idempotent-Replayed": "true"})
+
+
+def idempotent(method):
+    """
+    Make an APIView handler honour the `Idempotency-Key` header: the first
+    response for a key is stored and returned again for retries without
+    running the handler. Reusing a key for another path or body is rejected
+    with 422. Server errors release the key so it can be retried.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key or not request.user.is_authenticated:
+            return method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({"error": "Idempotency-Key is too long."}, status=status.HTTP_400_BAD_REQUEST)
+
+        record, replay = reserve(request.user, key, request.path, request_hash(request))
+        if replay is not None:
+            return replay
+
+        try:
+            response = method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=["status_code", "response"])
+        return response
+
+    return wrapper
@@ -0,0 +1,43 @@
+from config.cloud import get_cloudinary
+
+
+IMAGE_FIELDS = ("image_1", "image_2", "image_3", "image_4")
+
+# Derivative sizes served to the frontend, all delivered as WebP
+IMAGE_VARIANTS = {
+    "thumb": {"width": 160, "height": 120, "crop": "fill", "gravity": "auto"},
+    "card": {"width": 480, "height": 320, "crop": "fill", "gravity": "auto"},
+    "full": {"width": 1600, "crop": "limit"},
+}
+
+
+def image_key(value):
+    """Comparable identity of an image field value (CloudinaryResource has no __eq__)."""
+    if hasattr(value, "public_id"):
+        return value.get_prep_value()
+    return value or None
+
+
+def build_image_variants(flat):
+    """
+    Build every derivative URL for the flat's images once, grouped by variant
+    so list endpoints can hand out `images["card"]` without any extra work.
+    Each list has one slot per image field, `images[variant][0]` is image_1
+    and so on; empty fields keep their slot as None.
+    """
+    images = {variant: [] for variant in IMAGE_VARIANTS}
+    CloudinaryResource = get_cloudinary().CloudinaryResource
+
+    for field in IMAGE_FIELDS:
+        resource = getattr(flat, field)
+        present = isinstance(resource, CloudinaryResource) and resource.public_id
+
+        for variant, options in IMAGE_VARIANTS.items():
+            images[variant].append(
+                resource.build_url(
+                    format="webp", quality="auto", secure=True, **options
+                )
+                if present else None
+            )
+
+    return images
@@ -0,0 +1,165 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection, EmailMultiAlternatives
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Inquiry, InboxCounter
+
+
+def add_unread(owner_id, count=1):
+    """Increment the owner's unread counter, creating it on first use."""
+    if InboxCounter.objects.filter(owner_id=owner_id).update(unread=F("unread") + count):
+        return
+    try:
+        with transaction.atomic():
+            InboxCounter.objects.create(owner_id=owner_id, unread=count)
+    except IntegrityError:
+        # Created concurrently, increment that row instead
+        InboxCounter.objects.filter(owner_id=owner_id).update(unread=F("unread") + count)
+
+
+def get_unread(owner_id):
+    return InboxCounter.objects.filter(owner_id=owner_id).values_list("unread", flat=True).first() or 0
+
+
+def create_inquiry(flat, renter, data):
+    """Persist an inquiry and count it as unread, in one transaction."""
+    with transaction.atomic():
+        inquiry = Inquiry.objects.create(flat=flat, owner_id=flat.owner_id, renter=renter, **data)
+        add_unread(flat.owner_id)
+    return inquiry
+
+
+def mark_read(owner, ids=None):
+    """
+    Mark the owner's inquiries (all of them when `ids` is None) as read with
+    one UPDATE, and take exactly the rows it changed off the counter.
+    """
+    with transaction.atomic():
+        unread = Inquiry.objects.filter(owner=owner, read_at__isnull=True)
+        if ids is not None:
+            unread = unread.filter(id__in=ids)
+        updated = unread.update(read_at=timezone.now())
+        if updated:
+            InboxCounter.objects.filter(owner=owner).update(unread=F("unread") - updated)
+    return updated
+
+
+def forget_unread(flat_ids):
+    """
+    Take the unread inquiries about `flat_ids` off their owners' counters:
+    the rows go with the flats (CASCADE), so call this in the transaction
+    that deletes them. One UPDATE per owner with unread inquiries.
+    """
+    counts = (
+        Inquiry.objects.filter(flat_id__in=flat_ids, read_at__isnull=True)
+        .order_by()
+        .values("owner_id")
+        .annotate(unread=Count("id"))
+        .values_list("owner_id", "unread")
+    )
+    for owner_id, unread in counts:
+        InboxCounter.objects.filter(owner_id=owner_id).update(unread=F("unread") - unread)
+
+
+def get_digest_window():
+    return getattr(settings, "INQUIRY_DIGEST_WINDOW", 60 * 60)
+
+
+def send_inquiry_email(inquiry):
+    """Email the owner a copy of one inquiry (immediate delivery)."""
+    flat = inquiry.flat
+
+    # Render HTML email template with dynamic data
+    html = render_to_string(
+        "emails/booking_email.html",
+        {
+            "owner_name": flat.owner.first_name,
+            "flat_title": flat.title,
+            "first_name": inquiry.first_name,
+            "last_name": inquiry.last_name,
+            "email": inquiry.email,
+            "phone": inquiry.phone,
+            "message": inquiry.message,
+        },
+    )
+
+    message = EmailMultiAlternatives(
+        f"Message from {inquiry.first_name} {inquiry.last_name} - Interested in Your Flat",
+        inquiry.message,  # Plain text version (fallback)
+        f"EasyRent Support Team <{settings.EMAIL_HOST_USER}>",
+        [flat.owner.email],
+    )
+    message.attach_alternative(html, "text/html")
+    message.send()
+
+    Inquiry.objects.filter(pk=inquiry.pk).update(emailed_at=timezone.now())
+
+
+def send_inquiry_digests(batch_size=200):
+    """
+    One email per owner whose oldest unsent inquiry is older than the
+    digest window, covering all of their unsent inquiries. Every digest is
+    rendered once and all of them go out over one SMTP connection.
+
+    Owners aren't filtered on inquiry_delivery: immediate emails set
+    emailed_at, so what is left unsent was collected while the owner was on
+    digest delivery (or its immediate email failed) and still goes out.
+    """
+    if not getattr(settings, "INQUIRY_EMAILS_ENABLED", True):
+        return 0
+
+    cutoff = timezone.now() - timedelta(seconds=get_digest_window())
+    owner_ids = list(
+        Inquiry.objects.filter(emailed_at__isnull=True)
+        .order_by()
+        .values("owner_id")
+        .annotate(oldest=Min("created_at"))
+        .filter(oldest__lte=cutoff)
+        .values_list("owner_id", flat=True)[:batch_size]
+    )
+    if not owner_ids:
+        return 0
+
+    pending = (
+        Inquiry.objects.filter(owner_id__in=owner_ids, emailed_at__isnull=True)
+        .select_related("owner", "flat")
+        .only(
+            "owner", "flat", "first_name", "last_name", "email", "phone", "message", "created_at",
+            "owner__first_name", "owner__email", "flat__title", "flat__slug",
+        )
+        .order_by("owner_id", "created_at")
+    )
+    by_owner = {}
+    for inquiry in pending:
+        by_owner.setdefault(inquiry.owner, []).append(inquiry)
+
+    messages = []
+    for owner, inquiries in by_owner.items():
+        html = render_to_string(
+            "emails/inquiry_digest_email.html", {"owner_name": owner.first_name, "inquiries": inquiries}
+        )
+        message = EmailMultiAlternatives(
+            f"{len(inquiries)} new message(s) about your flats",
+            "\n\n".join(
+                f"{inquiry.flat.title} - {inquiry.first_name} {inquiry.last_name}: {inquiry.message}"
+                for inquiry in inquiries
+            ),
+            f"EasyRent Support Team <{settings.EMAIL_HOST_USER}>",
+            [owner.email],
+        )
+        message.attach_alternative(html, "text/html")
+        messages.append(message)
+
+    with get_connection() as connection:
+        connection.send_messages(messages)
+
+    Inquiry.objects.filter(
+        pk__in=[inquiry.pk for inquiries in by_owner.values() for inquiry in inquiries]
+    ).update(emailed_at=timezone.now())
+
+    return len(messages)
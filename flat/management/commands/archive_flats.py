@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from flat.archive import archive_stale, get_archive_after
+
+
+class Command(BaseCommand):
+    help = "Archive flats not updated for FLAT_ARCHIVE_AFTER_DAYS, in short batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Override FLAT_ARCHIVE_AFTER_DAYS")
+        parser.add_argument("--batch-size", type=int, default=500, help="Flats per transaction")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between batches")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the stale flats")
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else get_archive_after()
+        if days is None:
+            self.stdout.write("Archiving is disabled (FLAT_ARCHIVE_AFTER_DAYS is None)")
+            return
+
+        batches = archive_stale(
+            days=days, batch_size=options["batch_size"], pause=options["sleep"], dry_run=options["dry_run"]
+        )
+        if options["dry_run"]:
+            self.stdout.write(f"{next(batches)} flats not updated for {days} days")
+            return
+
+        archived = 0
+        for count in batches:
+            archived += count
+            self.stdout.write(f"  archived {count} flats")
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} flats not updated for {days} days"))
@@ -0,0 +1,61 @@
+import datetime
+import json
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from config.fastjson import ORJSONRenderer, is_enabled
+from user_profile.models import User
+from flat.models import Flat, Category, Location
+from flat.serializers import FlatListSerializer
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark DRF's JSONRenderer against ORJSONRenderer on flat listing payloads"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50, help="Flats per payload (a full listing page)")
+        parser.add_argument("--repeat", type=int, default=200, help="Renders per renderer")
+
+    def build_payload(self, rows):
+        """Serialize unsaved flats so the benchmark needs no database rows."""
+        owner = User(first_name="Karim", last_name="Rahman", phone_number="01700000000", email="owner@example.com")
+        category = Category(id=1, title="Family")
+        location = Location(id=1, title="Kushtia Sadar")
+        today = datetime.date.today()
+
+        flats = []
+        for i in range(rows):
+            flat = Flat(
+                id=i + 1, owner=owner, category=category, location=location,
+                title=f"Spacious {i % 5 + 2} room flat near the main road", slug=f"spacious-flat-{i}",
+                flat_size=1200 + i, room=i % 5 + 2, bath=2, kitchen=1, price=15000 + i * 250,
+                images={"card": [f"https://res.cloudinary.com/demo/image/upload/w_480/v1/flat-{i}.webp"]},
+                created_at=today, updated_at=today,
+            )
+            flats.append(flat)
+
+        return FlatListSerializer(flats, many=True).data
+
+    def handle(self, *args, **options):
+        data = self.build_payload(options["rows"])
+        repeat = options["repeat"]
+
+        stdlib, fast = JSONRenderer(), ORJSONRenderer()
+        # Compared as values: floats in exponent notation are written differently
+        if json.loads(stdlib.render(data)) != json.loads(fast.render(data)):
+            self.stderr.write(self.style.ERROR("Renderers produced different output"))
+            return
+
+        if not is_enabled():
+            self.stdout.write(self.style.WARNING("orjson is not installed, ORJSONRenderer uses the stdlib"))
+
+        size = len(fast.render(data))
+        stdlib_time = timeit.timeit(lambda: stdlib.render(data), number=repeat)
+        fast_time = timeit.timeit(lambda: fast.render(data), number=repeat)
+
+        self.stdout.write(f"Payload: {options['rows']} flats, {size} bytes, {repeat} renders each")
+        self.stdout.write(f"JSONRenderer:   {stdlib_time / repeat * 1e6:9.1f} µs/render")
+        self.stdout.write(f"ORJSONRenderer: {fast_time / repeat * 1e6:9.1f} µs/render")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {stdlib_time / fast_time:.1f}x"))
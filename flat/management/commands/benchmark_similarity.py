@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from flat.similarity import SimilarityIndex, NUMERIC_FEATURES
+
+
+class Command(BaseCommand):
+    help = "Benchmark building and querying the similar-flats index on synthetic flats"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--flats", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("-k", type=int, default=6)
+
+    def handle(self, *args, **options):
+        import numpy as np
+
+        n = options["flats"]
+        rng = np.random.default_rng(0)
+        rows = np.column_stack([
+            np.arange(1, n + 1),
+            rng.integers(5_000, 80_000, n),   # price
+            rng.integers(400, 3_000, n),      # flat_size
+            rng.integers(1, 7, n),            # room
+            rng.integers(1, 4, n),            # bath
+            rng.integers(1, 10, n),           # category
+            rng.integers(1, 60, n),           # location
+        ])
+
+        started = time.perf_counter()
+        index = SimilarityIndex.from_rows(rows)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        targets = rng.integers(1, n + 1, options["queries"])
+        started = time.perf_counter()
+        for flat_id in targets:
+            index.similar(int(flat_id), k=options["k"])
+        query_ms = (time.perf_counter() - started) * 1000 / len(targets)
+
+        started = time.perf_counter()
+        for flat_id in range(n + 1, n + 1001):
+            index.upsert(flat_id, [20_000] * len(NUMERIC_FEATURES), 1, 1)
+        upsert_us = (time.perf_counter() - started) * 1e6 / 1000
+
+        self.stdout.write(f"Flats:        {n}")
+        self.stdout.write(f"Build:        {build_ms:8.1f} ms")
+        self.stdout.write(f"Top-{options['k']} query: {query_ms:8.2f} ms")
+        self.stdout.write(f"Upsert:       {upsert_us:8.2f} µs")
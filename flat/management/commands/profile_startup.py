@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Runs in a fresh interpreter: load the WSGI app the way gunicorn does,
+# then serve one request and report when the response body was ready.
+STARTUP_SCRIPT = """
+import json, os, sys, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+from config.wsgi import application
+app_ready = time.time()
+path, host = sys.argv[1], sys.argv[2]
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "", "SCRIPT_NAME": "",
+    "SERVER_NAME": host, "SERVER_PORT": "80", "HTTP_HOST": host, "HTTP_ACCEPT": "application/json",
+    "SERVER_PROTOCOL": "HTTP/1.1", "wsgi.version": (1, 0), "wsgi.url_scheme": "http",
+    "wsgi.input": sys.stdin.buffer, "wsgi.errors": sys.stderr,
+    "wsgi.multithread": False, "wsgi.multiprocess": True, "wsgi.run_once": False,
+}
+status = []
+body = b"".join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+print(json.dumps({"app_ready": app_ready, "first_response": time.time(), "status": status[0], "bytes": len(body)}))
+"""
+
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` output into (module, self_us, cumulative_us, depth) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Report per-module import cost (-X importtime) and time to the first served request"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/categories/", help="URL of the first request")
+        parser.add_argument("--top", type=int, default=25, help="Number of modules to list")
+        parser.add_argument("--json", action="store_true", help="Print a machine readable report")
+
+    def handle(self, *args, **options):
+        host = settings.ALLOWED_HOSTS[-1] if settings.ALLOWED_HOSTS else "localhost"
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+
+        started = time.time()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT, options["path"], host],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, stdin=subprocess.DEVNULL,
+        )
+        if result.returncode != 0:
+            raise CommandError(
+                f"The startup interpreter exited with status {result.returncode}:\n{result.stderr[-2000:]}"
+            )
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        rows = parse_importtime(result.stderr)
+
+        # Cost of each top-level package: the self time of all of its modules
+        packages = defaultdict(int)
+        for name, self_us, cumulative_us, depth in rows:
+            packages[name.split(".")[0]] += self_us
+
+        report = {
+            "path": options["path"],
+            "status": timings["status"],
+            "app_ready_ms": round((timings["app_ready"] - started) * 1000, 1),
+            "first_response_ms": round((timings["first_response"] - started) * 1000, 1),
+            "total_import_ms": round(sum(packages.values()) / 1000, 1),
+            "packages": {
+                name: round(us / 1000, 1)
+                for name, us in sorted(packages.items(), key=lambda item: -item[1])[:options["top"]]
+            },
+            "modules": [
+                {"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative_us / 1000, 1)}
+                for name, self_us, cumulative_us, depth in sorted(rows, key=lambda row: -row[1])[:options["top"]]
+            ],
+        }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"App ready:        {report['app_ready_ms']:8.1f} ms")
+        self.stdout.write(f"First response:   {report['first_response_ms']:8.1f} ms  ({report['path']} -> {report['status']})")
+        self.stdout.write(f"Imports in total: {report['total_import_ms']:8.1f} ms\n")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Top-level packages"))
+        for name, ms in report["packages"].items():
+            self.stdout.write(f"  {ms:8.1f} ms  {name}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nModules (self time)"))
+        for row in report["modules"]:
+            self.stdout.write(f"  {row['self_ms']:8.1f} ms  {row['cumulative_ms']:8.1f} ms  {row['module']}")
@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from config import profiling
+
+
+class Command(BaseCommand):
+    help = "Show the hottest functions of the sampled and slow requests recorded by the profiling middleware"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url-name", help="Only this URL name, with its individual profiles")
+        parser.add_argument("--top", type=int, default=10, help="Functions listed per URL name")
+        parser.add_argument("--json", action="store_true", help="Print a machine readable report")
+        parser.add_argument("--clear", action="store_true", help="Drop all recorded profiles")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            profiling.clear_profiles()
+            self.stdout.write(self.style.SUCCESS("Profiles cleared"))
+            return
+
+        profiles = profiling.get_profiles(options["url_name"])
+        report = {name: profiling.summarize(entries, options["top"]) for name, entries in profiles.items()}
+
+        if options["json"]:
+            if options["url_name"]:
+                report[options["url_name"]]["recent"] = profiles[options["url_name"]]
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        if not any(summary["profiles"] for summary in report.values()):
+            self.stdout.write("No profiles recorded (is PROFILING_ENABLED set?)")
+            return
+
+        # Slowest URL names first
+        for name, summary in sorted(report.items(), key=lambda item: -(item[1]["max_ms"] or 0)):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name}: {summary['profiles']} profiles ({summary['slow']} slow), "
+                f"mean {summary['mean_ms']} ms, max {summary['max_ms']} ms"
+            ))
+            for function in summary["functions"]:
+                self.stdout.write(f"  {function['self_ms']:10.2f} ms  {function['total_ms']:10.2f} ms  {function['function']}")
+
+            if options["url_name"]:
+                self.stdout.write(self.style.MIGRATE_HEADING("\nRecent profiles"))
+                for profile in reversed(profiles[name]):
+                    self.stdout.write(
+                        f"  {profile['at']}  {profile['method']} {profile['path']}  "
+                        f"{profile['duration_ms']} ms  ({profile['reason']})"
+                    )
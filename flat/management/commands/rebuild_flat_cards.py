@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from flat.models import Flat, FlatCard
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized FlatCard listing table from Flat"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        # Archived flats have no card
+        flats = Flat.objects.filter(is_active=True).select_related("owner", "category", "location").order_by("pk")
+
+        with transaction.atomic():
+            FlatCard.objects.all().delete()
+            batch = []
+            for flat in flats.iterator(chunk_size=batch_size):
+                batch.append(FlatCard(flat=flat, **FlatCard.values_for(flat)))
+                if len(batch) >= batch_size:
+                    FlatCard.objects.bulk_create(batch)
+                    batch = []
+            FlatCard.objects.bulk_create(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {FlatCard.objects.count()} flat cards"))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from flat import similarity
+
+
+class Command(BaseCommand):
+    help = "Rebuild the similar-flats index and make every worker reload it"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = similarity.rebuild()
+        elapsed = (time.perf_counter() - started) * 1000
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(index.rows)} flats in {elapsed:.1f} ms, workers reload on their next lookup"
+        ))
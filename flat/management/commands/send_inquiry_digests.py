@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from flat.inbox import send_inquiry_digests
+
+
+class Command(BaseCommand):
+    help = "Email owners the inquiries collected during their digest window"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Owners per run")
+
+    def handle(self, *args, **options):
+        sent = send_inquiry_digests(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} inquiry digest(s)"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from flat.saved_searches import send_pending_notifications
+
+
+class Command(BaseCommand):
+    help = "Email renters the new flats queued for their saved searches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        sent = send_pending_notifications(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} saved search notification(s)"))
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from config import querylog
+
+
+SORT_KEYS = {
+    "total": lambda entry: entry["total_ms"],
+    "count": lambda entry: entry["count"],
+    "max": lambda entry: entry["max_ms"],
+    "mean": lambda entry: entry["total_ms"] / entry["count"],
+}
+
+
+class Command(BaseCommand):
+    help = "Show the slow queries recorded by the slow query log, grouped by fingerprint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20, help="Number of fingerprints to list")
+        parser.add_argument("--sort", choices=SORT_KEYS, default="total", help="Order of the fingerprints")
+        parser.add_argument("--view", help="Only queries run by this URL name")
+        parser.add_argument("--explain", action="store_true", help="Print the captured plans")
+        parser.add_argument("--json", action="store_true", help="Print a machine readable report")
+        parser.add_argument("--clear", action="store_true", help="Drop the recorded queries")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            querylog.clear_entries()
+            self.stdout.write(self.style.SUCCESS("Slow query log cleared"))
+            return
+
+        entries = querylog.get_entries()
+        if options["view"]:
+            entries = [entry for entry in entries if options["view"] in entry["views"]]
+        entries = sorted(entries, key=SORT_KEYS[options["sort"]], reverse=True)[:options["top"]]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(entries, indent=2))
+            return
+
+        if not entries:
+            self.stdout.write("No slow queries recorded (is SLOW_QUERY_LOG_ENABLED set?)")
+            return
+
+        for entry in entries:
+            views = ", ".join(f"{name} ({count})" for name, count in sorted(entry["views"].items(), key=lambda item: -item[1]))
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{entry['count']}x  total {entry['total_ms']:.1f} ms  "
+                f"mean {entry['total_ms'] / entry['count']:.1f} ms  max {entry['max_ms']:.1f} ms"
+            ))
+            self.stdout.write(f"  {entry['fingerprint']}")
+            self.stdout.write(f"  views: {views}")
+            if options["explain"] and entry["explain"]:
+                self.stdout.write("  plan:")
+                for line in entry["explain"].splitlines():
+                    self.stdout.write(f"    {line}")
+            self.stdout.write("")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from flat.warmup import warm_cache
+
+
+class Command(BaseCommand):
+    help = "Precompute the home, categories, locations and first category pages into the shared cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Drop the cached payloads and rebuild them")
+        parser.add_argument("--host", help="Host used for absolute links (default: first ALLOWED_HOSTS entry)")
+
+    def handle(self, *args, **options):
+        for path, status_code in warm_cache(force=options["force"], host=options["host"]):
+            style = self.style.SUCCESS if status_code == 200 else self.style.ERROR
+            self.stdout.write(style(f"{status_code}  {path}"))
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copy of the variants and of flat.images.build_image_variants as of
+# this migration, so later changes to the app code don't change what it does
+IMAGE_FIELDS = ('image_1', 'image_2', 'image_3', 'image_4')
+IMAGE_VARIANTS = {
+    'thumb': {'width': 160, 'height': 120, 'crop': 'fill', 'gravity': 'auto'},
+    'card': {'width': 480, 'height': 320, 'crop': 'fill', 'gravity': 'auto'},
+    'full': {'width': 1600, 'crop': 'limit'},
+}
+
+
+def build_image_variants(flat):
+    """One slot per image field, None for empty ones."""
+    images = {variant: [] for variant in IMAGE_VARIANTS}
+    for field in IMAGE_FIELDS:
+        resource = getattr(flat, field)
+        present = resource and getattr(resource, 'public_id', None)
+        for variant, options in IMAGE_VARIANTS.items():
+            images[variant].append(
+                resource.build_url(format='webp', quality='auto', secure=True, **options) if present else None
+            )
+    return images
+
+
+def backfill_image_variants(apps, schema_editor):
+    import cloudinary
+
+    cloudinary.config(**settings.CLOUDINARY)
+    Flat = apps.get_model('flat', 'Flat')
+    batch = []
+    for flat in Flat.objects.only('id', 'image_1', 'image_2', 'image_3', 'image_4').iterator(chunk_size=500):
+        flat.images = build_image_variants(flat)
+        batch.append(flat)
+        if len(batch) >= 500:
+            Flat.objects.bulk_update(batch, ['images'])
+            batch = []
+    if batch:
+        Flat.objects.bulk_update(batch, ['images'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flat', '0005_remove_flat_available'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flat',
+            name='images',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_image_variants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FEATURE_SLOTS = 5
+
+
+def copy_features_to_rows(apps, schema_editor):
+    Flat = apps.get_model('flat', 'Flat')
+    FlatFeature = apps.get_model('flat', 'FlatFeature')
+    columns = [f'{attr}_{n}' for attr in ('feature', 'description') for n in range(1, FEATURE_SLOTS + 1)]
+
+    batch = []
+    for flat in Flat.objects.values('id', *columns).iterator(chunk_size=500):
+        for n in range(1, FEATURE_SLOTS + 1):
+            if flat[f'feature_{n}'] or flat[f'description_{n}']:
+                batch.append(FlatFeature(
+                    flat_id=flat['id'], position=n,
+                    feature=flat[f'feature_{n}'], description=flat[f'description_{n}'],
+                ))
+        if len(batch) >= 2000:
+            FlatFeature.objects.bulk_create(batch)
+            batch = []
+    FlatFeature.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flat', '0006_flat_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlatFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('feature', models.CharField(max_length=255)),
+                ('description', models.CharField(max_length=255)),
+                ('flat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='features', to='flat.flat')),
+            ],
+            options={
+                'ordering': ['position'],
+                'constraints': [models.UniqueConstraint(fields=('flat', 'position'), name='unique_flat_feature_position')],
+            },
+        ),
+        migrations.RunPython(copy_features_to_rows),
+        migrations.RemoveField(
+            model_name='flat',
+            name='description_1',
+        ),
+        migrations.RemoveField(
+            model_name='flat',
+            name='description_2',
+        ),
+        migrations.RemoveField(
+            model_name='flat',
+            name='description_3',
+        ),
+        migrations.RemoveField(
+            model_name='flat',
+            name='description_4',
+        ),
+        migrations.RemoveField(
+            model_name='flat',
+            name='description_5',
+        ),
+        migrations.RemoveField(
+            model_name='flat',
+            name='feature_1',
+        ),
+        migrations.RemoveField(
+            model_name='flat',
+            name='feature_2',
+        ),
+        migrations.RemoveField(
+            model_name='flat',
+            name='feature_3',
+        ),
+        migrations.RemoveField(
+            model_name='flat',
+            name='feature_4',
+        ),
+        migrations.RemoveField(
+            model_name='flat',
+            name='feature_5',
+        ),
+    ]
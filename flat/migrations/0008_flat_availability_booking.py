@@ -0,0 +1,64 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def add_booking_exclusion_constraint(apps, schema_editor):
+    """PostgreSQL only: reject overlapping bookings of a flat in the database itself."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        "ALTER TABLE flat_flatbooking ADD CONSTRAINT flat_booking_no_overlap "
+        "EXCLUDE USING gist (flat_id WITH =, daterange(start_date, end_date, '[)') WITH &&)"
+    )
+
+
+def drop_booking_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE flat_flatbooking DROP CONSTRAINT IF EXISTS flat_booking_no_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flat', '0007_flatfeature'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlatAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('flat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='flat.flat')),
+            ],
+            options={
+                'ordering': ['start_date'],
+                'indexes': [models.Index(fields=['flat', 'start_date', 'end_date'], name='flat_availability_range_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_date__gt', models.F('start_date'))), name='flat_availability_valid_range')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FlatBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('flat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='flat.flat')),
+                ('renter', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='flat_bookings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['start_date'],
+                'indexes': [models.Index(fields=['flat', 'start_date', 'end_date'], name='flat_booking_range_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_date__gt', models.F('start_date'))), name='flat_booking_valid_range')],
+            },
+        ),
+        migrations.RunPython(add_booking_exclusion_constraint, drop_booking_exclusion_constraint),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_flat_cards(apps, schema_editor):
+    Flat = apps.get_model('flat', 'Flat')
+    FlatCard = apps.get_model('flat', 'FlatCard')
+
+    batch = []
+    for flat in Flat.objects.select_related('owner', 'category', 'location').iterator(chunk_size=500):
+        owner = flat.owner
+        card_image = next((url for url in (flat.images or {}).get('card') or () if url), '')
+        batch.append(FlatCard(
+            flat_id=flat.pk, owner_id=flat.owner_id, category_id=flat.category_id, location_id=flat.location_id,
+            title=flat.title, slug=flat.slug, flat_size=flat.flat_size, room=flat.room, bath=flat.bath,
+            kitchen=flat.kitchen, price=flat.price, card_image=card_image,
+            category_title=flat.category.title, location_title=flat.location.title,
+            owner_name=f'{owner.first_name} {owner.last_name}'.strip() or owner.email,
+            created_at=flat.created_at,
+        ))
+        if len(batch) >= 500:
+            FlatCard.objects.bulk_create(batch)
+            batch = []
+    FlatCard.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flat', '0008_flat_availability_booking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlatCard',
+            fields=[
+                ('flat', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='flat.flat')),
+                ('title', models.CharField(max_length=255)),
+                ('slug', models.SlugField(blank=True, db_index=False, null=True)),
+                ('flat_size', models.IntegerField()),
+                ('room', models.IntegerField()),
+                ('bath', models.IntegerField()),
+                ('kitchen', models.IntegerField()),
+                ('price', models.IntegerField(default=0)),
+                ('card_image', models.URLField(blank=True, max_length=500)),
+                ('category_title', models.CharField(max_length=150)),
+                ('location_title', models.CharField(max_length=150)),
+                ('owner_name', models.CharField(max_length=255)),
+                ('created_at', models.DateField()),
+                ('category', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='flat.category')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='flat.location')),
+                ('owner', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at'], name='flat_card_created_idx'), models.Index(fields=['category', '-created_at'], name='flat_card_category_idx')],
+            },
+        ),
+        migrations.RunPython(build_flat_cards, migrations.RunPython.noop),
+    ]
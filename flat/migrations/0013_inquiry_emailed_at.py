@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_existing_emailed(apps, schema_editor):
+    """Inquiries stored so far were emailed right away, keep them out of digests."""
+    Inquiry = apps.get_model("flat", "Inquiry")
+    Inquiry.objects.update(emailed_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flat', '0012_inquiry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inquiry',
+            name='emailed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_emailed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(condition=models.Q(('emailed_at__isnull', True)), fields=['owner', 'created_at'], name='inquiry_pending_email_idx'),
+        ),
+    ]
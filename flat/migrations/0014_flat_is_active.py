@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flat', '0013_inquiry_emailed_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flat',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='flat',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='flat',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['updated_at'], name='flat_active_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+def merge_availability_windows(apps, schema_editor):
+    """Merge overlapping or adjacent windows of each flat into one row."""
+    FlatAvailability = apps.get_model('flat', 'FlatAvailability')
+
+    merged, obsolete = {}, []
+    current = None
+    for window in FlatAvailability.objects.order_by('flat_id', 'start_date', 'end_date').iterator(chunk_size=2000):
+        if current is not None and window.flat_id == current.flat_id and window.start_date <= current.end_date:
+            if window.end_date > current.end_date:
+                current.end_date = window.end_date
+                merged[current.pk] = current
+            obsolete.append(window.pk)
+            continue
+        current = window
+
+    FlatAvailability.objects.filter(pk__in=obsolete).delete()
+    FlatAvailability.objects.bulk_update(merged.values(), ['end_date'], batch_size=500)
+
+
+def add_availability_exclusion_constraint(apps, schema_editor):
+    """PostgreSQL only: windows of a flat never overlap (flat.models.FlatAvailability merges them)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "ALTER TABLE flat_flatavailability ADD CONSTRAINT flat_availability_no_overlap "
+        "EXCLUDE USING gist (flat_id WITH =, daterange(start_date, end_date, '[)') WITH &&)"
+    )
+
+
+def drop_availability_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE flat_flatavailability DROP CONSTRAINT IF EXISTS flat_availability_no_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flat', '0014_flat_is_active'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_availability_windows, migrations.RunPython.noop),
+        migrations.RunPython(add_availability_exclusion_constraint, drop_availability_exclusion_constraint),
+    ]
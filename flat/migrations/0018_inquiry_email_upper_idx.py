@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:55
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flat', '0017_idempotencykey_request_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='inquiry_email_upper_idx'),
+        ),
+    ]
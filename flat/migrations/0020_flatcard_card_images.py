@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:40
+
+from django.db import migrations, models
+
+
+IMAGE_SLOTS = 4  # image_1 .. image_4
+
+
+def copy_card_images(apps, schema_editor):
+    Flat = apps.get_model('flat', 'Flat')
+    FlatCard = apps.get_model('flat', 'FlatCard')
+
+    batch = []
+    for flat_id, images in Flat.objects.filter(card__isnull=False).values_list('id', 'images').iterator(chunk_size=500):
+        batch.append(FlatCard(flat_id=flat_id, card_images=(images or {}).get('card') or [None] * IMAGE_SLOTS))
+        if len(batch) >= 500:
+            FlatCard.objects.bulk_update(batch, ['card_images'])
+            batch = []
+    FlatCard.objects.bulk_update(batch, ['card_images'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flat', '0019_flatcard_owner_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flatcard',
+            name='card_images',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(copy_card_images, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='flatcard',
+            name='card_image',
+        ),
+    ]
@@ -1,9 +1,13 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Upper
 from user_profile.models import User
+from django.utils import timezone
 from django.utils.text import slugify
 from .slug import generate_unique_slug
-from cloudinary.models import CloudinaryField
-from cloudinary.uploader import destroy
+from django.core.files.uploadedfile import UploadedFile
+from config.cloud import destroy, delete_resources, get_upload_executor
+from .fields import CloudinaryField
+from .images import IMAGE_FIELDS, image_key, build_image_variants
 # Create your models here.
 
 
@@ -17,7 +21,9 @@ class Category(models.Model):
 
     def save(self, *args, **kwargs):
         self.slug = slugify(self.title)
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            FlatCard.objects.filter(category=self).update(category_title=self.title)
         
         
 class Location(models.Model):
@@ -30,7 +36,9 @@ class Location(models.Model):
 
     def save(self, *args, **kwargs):
         self.slug = slugify(self.title)
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            FlatCard.objects.filter(location=self).update(location_title=self.title)
 
 
 class Flat(models.Model):
@@ -56,30 +64,31 @@ class Flat(models.Model):
     image_2 = CloudinaryField("image", blank=True, null=True)
     image_3 = CloudinaryField("image", blank=True, null=True)
     image_4 = CloudinaryField("image", blank=True, null=True)
-
-    feature_1 = models.CharField(max_length=255)
-    feature_2 = models.CharField(max_length=255)
-    feature_3 = models.CharField(max_length=255)
-    feature_4 = models.CharField(max_length=255)
-    feature_5 = models.CharField(max_length=255)
-
-    description_1 = models.CharField(max_length=255)
-    description_2 = models.CharField(max_length=255)
-    description_3 = models.CharField(max_length=255)
-    description_4 = models.CharField(max_length=255)
-    description_5 = models.CharField(max_length=255)
+    images = models.JSONField(default=dict, blank=True)  # Precomputed WebP variants, one slot per image_1..4
 
     # price = models.DecimalField(max_digits=10, decimal_places=2)
     # available = models.BooleanField(default=True)
     created_at = models.DateField(auto_now_add=True)
     updated_at = models.DateField(auto_now=True)
 
+    # Archived flats (rented, or stale, see flat/archive.py) keep their row but
+    # have no listing card, so only their owner sees them
+    is_active = models.BooleanField(default=True)
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Stale listing scan of the archive command, archived rows aren't indexed
+            models.Index(fields=["updated_at"], name="flat_active_updated_idx", condition=models.Q(is_active=True)),
+        ]
+
     def __str__(self):
         return self.title
     
     def save(self, *args, **kwargs):
         """🔹 Save method to handle image updates and avoid unnecessary queries."""
         updating = self.pk is not None  # Check if the object is being updated
+        images_changed = not updating
 
         if updating:
             # Fetch the original object to compare images and check for updates
@@ -87,18 +96,17 @@ class Flat(models.Model):
             
             # Check if any image has been updated, and delete the old image from Cloudinary
             if original:
-                if original.image_1 != self.image_1:
-                    if original.image_1:
-                        self._delete_image_from_cloudinary(original.image_1)
-                if original.image_2 != self.image_2:
-                    if original.image_2:
-                        self._delete_image_from_cloudinary(original.image_2)
-                if original.image_3 != self.image_3:
-                    if original.image_3:
-                        self._delete_image_from_cloudinary(original.image_3)
-                if original.image_4 != self.image_4:
-                    if original.image_4:
-                        self._delete_image_from_cloudinary(original.image_4)
+                replaced = []
+                for field in IMAGE_FIELDS:
+                    original_image = getattr(original, field)
+                    if image_key(original_image) != image_key(getattr(self, field)):
+                        images_changed = True
+                        if original_image:
+                            replaced.append(original_image)
+                kept = {image_key(getattr(self, field)) for field in IMAGE_FIELDS}
+                for image in self._unshared(replaced, exclude=[self.pk]):
+                    if image_key(image) not in kept:
+                        self._delete_image_from_cloudinary(image)
                 
             # If the title has changed, generate a new slug
             if original.title != self.title:
@@ -108,29 +116,126 @@ class Flat(models.Model):
             # Generate slug only for new objects
             self.slug = generate_unique_slug(self, self.title)
 
-        # Call the parent class save method to store the flat object
-        super().save(*args, **kwargs)
+        if self.is_active:
+            self.archived_at = None
+        elif self.archived_at is None:
+            self.archived_at = timezone.now()
+
+        # 🔹 Build image variant URLs once per image change, never per request
+        if images_changed or not self.images:
+            self._upload_pending_images(add=not updating)
+            self.images = build_image_variants(self)
+
+        # Call the parent class save method to store the flat object,
+        # the listing card is refreshed in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            FlatCard.refresh(self, created=not updating)
+
+            if updating and self.is_active != original.is_active:
+                from .saved_searches import discard_pending_matches, match_flats
+                if self.is_active:
+                    # Back from the archive: saved searches it matches hear about it
+                    match_flats([self])
+                else:
+                    discard_pending_matches([self.pk])
 
     def delete(self, *args, **kwargs):
         """Override delete method to remove images from Cloudinary when flat is deleted."""
-        if self.image_1:
-            self._delete_image_from_cloudinary(self.image_1)
-        if self.image_2:
-            self._delete_image_from_cloudinary(self.image_2)
-        if self.image_3:
-            self._delete_image_from_cloudinary(self.image_3)
-        if self.image_4:
-            self._delete_image_from_cloudinary(self.image_4)
-
-        # Call the parent class delete method to remove the record from the database
-        super().delete(*args, **kwargs)
+        for image in self._unshared([getattr(self, field) for field in IMAGE_FIELDS], exclude=[self.pk]):
+            self._delete_image_from_cloudinary(image)
+
+        from .inbox import forget_unread
+
+        # Call the parent class delete method to remove the record from the database,
+        # its unread inquiries leave the owner's counter in the same transaction
+        with transaction.atomic(savepoint=False):
+            forget_unread([self.pk])
+            return super().delete(*args, **kwargs)
+
+    @classmethod
+    def using_image(cls, public_id):
+        """Flats with the image `public_id` in any image field, whatever its version and format."""
+        query = models.Q()
+        for field in IMAGE_FIELDS:
+            query |= models.Q(**{f"{field}__endswith": f"/{public_id}"})
+            query |= models.Q(**{f"{field}__contains": f"/{public_id}."})
+        return cls.objects.filter(query)
+
+    @classmethod
+    def _unshared(cls, images, exclude):
+        """
+        The stored `images` no flat outside `exclude` (ids) uses, in one
+        query: an image shared by several rows must outlive the deletion of
+        one of them.
+        """
+        images = [image for image in images if getattr(image, "public_id", None)]
+        if not images:
+            return []
+        query = models.Q()
+        for field in IMAGE_FIELDS:
+            query |= models.Q(**{f"{field}__in": [image_key(image) for image in images]})
+        rows = cls.objects.filter(query).exclude(pk__in=exclude).values_list(*IMAGE_FIELDS)
+        in_use = {image_key(value) for row in rows for value in row}
+        return [image for image in images if image_key(image) not in in_use]
+
+    @classmethod
+    def bulk_delete(cls, queryset):
+        """
+        Delete the flats of `queryset` with one queryset delete instead of
+        Flat.delete() per row: one DELETE per table, whatever the number of
+        flats. The per-flat receivers are muted, caches and indexes are
+        dropped once after commit and the images go in batched Cloudinary
+        calls. Unread inquiries leave their owners' counters in the same
+        transaction. Returns the ids of the deleted flats.
+        """
+        from .archive import listings_changed
+        from .inbox import forget_unread
+        from .signals import flat_receivers_muted
+
+        with transaction.atomic():
+            flats = list(queryset.select_related(None).select_for_update().only("id", *IMAGE_FIELDS))
+            deleted_ids = {flat.id for flat in flats}
+            images = [getattr(flat, field) for flat in flats for field in IMAGE_FIELDS]
+            public_ids = {image.public_id for image in cls._unshared(images, exclude=deleted_ids)}
+
+            if deleted_ids:
+                forget_unread(deleted_ids)
+                with flat_receivers_muted():
+                    cls.objects.filter(id__in=deleted_ids).delete()
+                transaction.on_commit(listings_changed)
+                transaction.on_commit(lambda: delete_resources(public_ids))
+        return deleted_ids
+
+    def set_features(self, features):
+        """Replace the flat's features with `features`, a list of {"feature", "description"} dicts."""
+        self.features.all().delete()
+        FlatFeature.objects.bulk_create(
+            [
+                FlatFeature(flat=self, position=position, **item)
+                for position, item in enumerate(features, start=1)
+            ]
+        )
+        getattr(self, "_prefetched_objects_cache", {}).pop("features", None)
+
+    def _upload_pending_images(self, add):
+        """
+        Upload new image files now so their public_ids are known before the
+        row is written. Several files are uploaded in parallel, so a request
+        waits for the slowest upload instead of the sum of them.
+        """
+        pending = [field for field in IMAGE_FIELDS if isinstance(getattr(self, field), UploadedFile)]
+        if len(pending) == 1:
+            self._meta.get_field(pending[0]).pre_save(self, add)
+        elif pending:
+            # Each upload sets only its own attribute; list() re-raises the first failure
+            list(get_upload_executor().map(lambda field: self._meta.get_field(field).pre_save(self, add), pending))
 
     def _delete_image_from_cloudinary(self, image_field):
         """Helper function to delete image from Cloudinary."""
-        if image_field and image_field.url:
-            public_id = image_field.url.split('/')[-1].split('.')[0]  # Extract the public_id from URL
+        if image_field and getattr(image_field, "public_id", None):
             try:
-                destroy(public_id)  # Delete image from Cloudinary
+                destroy(image_field.public_id)  # Foldered ids (direct uploads) included
             except Exception as e:
                 print(f"Error deleting image from Cloudinary: {e}")
 
@@ -172,3 +277,287 @@ class Flat(models.Model):
     #     super().delete(*args, **kwargs)
 
 
+class FlatFeature(models.Model):
+    """Ordered feature/description pairs of a flat, kept out of the wide Flat row."""
+    flat = models.ForeignKey(Flat, related_name="features", on_delete=models.CASCADE)
+    position = models.PositiveSmallIntegerField()
+    feature = models.CharField(max_length=255)
+    description = models.CharField(max_length=255)
+
+    class Meta:
+        ordering = ["position"]
+        constraints = [
+            models.UniqueConstraint(fields=["flat", "position"], name="unique_flat_feature_position"),
+        ]
+
+    def __str__(self):
+        return self.feature
+
+
+class FlatAvailability(models.Model):
+    """
+    A date range [start_date, end_date) in which the owner offers the flat.
+    Windows of one flat never overlap or touch: saving one merges it with
+    its neighbours, so any offered stay lies inside a single row (see
+    `flat.availability.filter_available`). On PostgreSQL an exclusion
+    constraint backs this up (migration 0016).
+    """
+    flat = models.ForeignKey(Flat, related_name="availability", on_delete=models.CASCADE)
+    start_date = models.DateField()
+    end_date = models.DateField()
+
+    class Meta:
+        ordering = ["start_date"]
+        indexes = [
+            models.Index(fields=["flat", "start_date", "end_date"], name="flat_availability_range_idx"),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(end_date__gt=models.F("start_date")), name="flat_availability_valid_range"),
+        ]
+
+    def __str__(self):
+        return f"{self.flat} ({self.start_date} - {self.end_date})"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            # Serialize concurrent changes to the flat's calendar
+            Flat.objects.select_for_update().filter(pk=self.flat_id).values_list("pk").first()
+
+            touching = FlatAvailability.objects.filter(
+                flat_id=self.flat_id, start_date__lte=self.end_date, end_date__gte=self.start_date
+            )
+            if self.pk is not None:
+                touching = touching.exclude(pk=self.pk)
+            bounds = touching.aggregate(start=models.Min("start_date"), end=models.Max("end_date"))
+            if bounds["start"] is not None:
+                self.start_date = min(self.start_date, bounds["start"])
+                self.end_date = max(self.end_date, bounds["end"])
+                touching.delete()
+            super().save(*args, **kwargs)
+
+
+class FlatBooking(models.Model):
+    """
+    A booked date range [start_date, end_date) of a flat. Bookings of one flat
+    never overlap: on PostgreSQL an exclusion constraint enforces it (see
+    migration 0008), elsewhere `flat.availability.book_flat` checks it.
+    """
+    flat = models.ForeignKey(Flat, related_name="bookings", on_delete=models.CASCADE)
+    renter = models.ForeignKey(User, null=True, blank=True, related_name="flat_bookings", on_delete=models.SET_NULL)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["start_date"]
+        indexes = [
+            models.Index(fields=["flat", "start_date", "end_date"], name="flat_booking_range_idx"),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(end_date__gt=models.F("start_date")), name="flat_booking_valid_range"),
+        ]
+
+    def __str__(self):
+        return f"{self.flat} ({self.start_date} - {self.end_date})"
+
+
+class FlatCard(models.Model):
+    """
+    Denormalized read model for the listing endpoints: one narrow row per
+    flat holding everything a listing card shows, so list pages need no joins.
+    Kept in sync by Flat/Category/Location saves and the owner signal.
+    """
+    flat = models.OneToOneField(Flat, primary_key=True, related_name="card", on_delete=models.CASCADE)
+    owner = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)  # Indexed for owner renames and user deletes
+    category = models.ForeignKey(Category, related_name="+", on_delete=models.CASCADE, db_index=False)
+    location = models.ForeignKey(Location, related_name="+", on_delete=models.CASCADE)
+    title = models.CharField(max_length=255)
+    slug = models.SlugField(null=True, blank=True, db_index=False)
+    flat_size = models.IntegerField()
+    room = models.IntegerField()
+    bath = models.IntegerField()
+    kitchen = models.IntegerField()
+    price = models.IntegerField(default=0)
+    card_images = models.JSONField(default=list, blank=True)  # Flat.images["card"]: one slot per image field
+    category_title = models.CharField(max_length=150)
+    location_title = models.CharField(max_length=150)
+    owner_name = models.CharField(max_length=255)
+    created_at = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at"], name="flat_card_created_idx"),
+            models.Index(fields=["category", "-created_at"], name="flat_card_category_idx"),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @staticmethod
+    def owner_display_name(user):
+        return f"{user.first_name} {user.last_name}".strip() or user.email
+
+    @classmethod
+    def values_for(cls, flat):
+        return {
+            "owner_id": flat.owner_id,
+            "category_id": flat.category_id,
+            "location_id": flat.location_id,
+            "title": flat.title,
+            "slug": flat.slug,
+            "flat_size": flat.flat_size,
+            "room": flat.room,
+            "bath": flat.bath,
+            "kitchen": flat.kitchen,
+            "price": flat.price,
+            "card_images": (flat.images or {}).get("card") or [None] * len(IMAGE_FIELDS),
+            "category_title": flat.category.title,
+            "location_title": flat.location.title,
+            "owner_name": cls.owner_display_name(flat.owner),
+            "created_at": flat.created_at,
+        }
+
+    @classmethod
+    def refresh(cls, flat, created=False):
+        """Write the card of `flat`: one INSERT for new flats, one UPDATE otherwise."""
+        if not flat.is_active:
+            # Archived flats are out of the listings
+            if not created:
+                cls.objects.filter(flat=flat).delete()
+            return
+
+        values = cls.values_for(flat)
+        if created or not cls.objects.filter(flat=flat).update(**values):
+            cls.objects.create(flat=flat, **values)
+
+
+class SavedSearch(models.Model):
+    """
+    Search criteria a renter wants to be notified about. Empty category or
+    location means "any"; the price range is stored closed so every search
+    lives in the (match_key, min_price, max_price) index.
+    """
+    ANY = "*"
+    MAX_PRICE = 2_147_483_647
+
+    renter = models.ForeignKey(User, related_name="saved_searches", on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, null=True, blank=True, related_name="+", on_delete=models.CASCADE)
+    location = models.ForeignKey(Location, null=True, blank=True, related_name="+", on_delete=models.CASCADE)
+    min_price = models.IntegerField(default=0)
+    max_price = models.IntegerField(default=MAX_PRICE)
+    min_rooms = models.IntegerField(default=0)
+    match_key = models.CharField(max_length=50, editable=False)  # "<category|*>:<location|*>"
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["match_key", "min_price", "max_price"], name="saved_search_match_idx"),
+            models.Index(fields=["renter", "-created_at"], name="saved_search_renter_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.renter} ({self.match_key})"
+
+    @classmethod
+    def key_for(cls, category_id, location_id):
+        return f"{category_id or cls.ANY}:{location_id or cls.ANY}"
+
+    def save(self, *args, **kwargs):
+        self.match_key = self.key_for(self.category_id, self.location_id)
+        super().save(*args, **kwargs)
+
+
+class SavedSearchMatch(models.Model):
+    """A new flat matching a saved search, queued until the renter is notified."""
+    saved_search = models.ForeignKey(SavedSearch, related_name="matches", on_delete=models.CASCADE)
+    flat = models.ForeignKey(Flat, related_name="+", on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    notified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["saved_search", "flat"], name="unique_saved_search_match"),
+        ]
+        indexes = [
+            # Notification queue: only pending rows are indexed
+            models.Index(fields=["created_at"], name="saved_search_pending_idx", condition=models.Q(notified_at__isnull=True)),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response of a request sent with an `Idempotency-Key` header, replayed to
+    retries of the same key. `status_code` stays empty while the first
+    request is still running. Rows expire after IDEMPOTENCY_KEY_TTL.
+    `request_hash` (SHA-256 of the body) tells retries from reused keys.
+    """
+    user = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64, blank=True, default="")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="unique_idempotency_key"),
+        ]
+
+    def __str__(self):
+        return self.key
+
+
+class Inquiry(models.Model):
+    """A renter's message about a flat, shown in the owner's inbox."""
+    flat = models.ForeignKey(Flat, related_name="inquiries", on_delete=models.CASCADE)
+    owner = models.ForeignKey(User, related_name="inquiries", on_delete=models.CASCADE, db_index=False)
+    renter = models.ForeignKey(User, null=True, related_name="sent_inquiries", on_delete=models.SET_NULL)
+    first_name = models.CharField(max_length=255)
+    last_name = models.CharField(max_length=255)
+    email = models.EmailField()
+    phone = models.CharField(max_length=20)
+    message = models.CharField(max_length=1000)
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+    emailed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["owner", "-created_at"], name="inquiry_owner_created_idx"),
+            # Inquiries still waiting for their owner's digest
+            models.Index(
+                fields=["owner", "created_at"],
+                name="inquiry_pending_email_idx",
+                condition=models.Q(emailed_at__isnull=True),
+            ),
+            # Admin "=email" search, a case-insensitive match: UPPER("email") = UPPER(%s)
+            models.Index(Upper("email"), name="inquiry_email_upper_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.first_name} {self.last_name} - {self.flat}"
+
+
+class InboxCounter(models.Model):
+    """Unread inquiries per owner, kept up to date incrementally instead of COUNT(*)."""
+    owner = models.OneToOneField(User, primary_key=True, related_name="inbox_counter", on_delete=models.CASCADE)
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.owner}: {self.unread}"
+
+
+class IndexVersion(models.Model):
+    """
+    Change counter of an in-memory index shared by all workers. Bumped with
+    an UPDATE "value" = "value" + 1, so concurrent bumps never collide.
+    """
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
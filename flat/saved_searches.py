@@ -0,0 +1,98 @@
+from django.core.mail import get_connection, EmailMultiAlternatives
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import SavedSearch, SavedSearchMatch
+
+
+def match_keys(flat):
+    """The four (category | any) x (location | any) keys a search matching `flat` can have."""
+    return {
+        SavedSearch.key_for(category, location)
+        for category in (flat.category_id, None)
+        for location in (flat.location_id, None)
+    }
+
+
+def match_flats(flats):
+    """
+    Queue a notification for every saved search the listed (active) flats
+    match: one query for the candidates of all of them, narrowed per flat
+    in Python, and one INSERT. Matches already queued or sent are kept, so
+    a flat coming back from the archive isn't announced twice.
+    """
+    flats = [flat for flat in flats if flat.is_active]
+    if not flats:
+        return 0
+
+    candidates = list(
+        SavedSearch.objects.filter(
+            match_key__in=set().union(*map(match_keys, flats)),
+            min_price__lte=max(flat.price for flat in flats),
+            max_price__gte=min(flat.price for flat in flats),
+            min_rooms__lte=max(flat.room for flat in flats),
+        ).values_list("id", "renter_id", "match_key", "min_price", "max_price", "min_rooms")
+    )
+
+    matches = []
+    for flat in flats:
+        keys = match_keys(flat)
+        matches += [
+            SavedSearchMatch(saved_search_id=search_id, flat=flat)
+            for search_id, renter_id, key, min_price, max_price, min_rooms in candidates
+            if key in keys
+            and min_price <= flat.price <= max_price
+            and min_rooms <= flat.room
+            and renter_id != flat.owner_id
+        ]
+    SavedSearchMatch.objects.bulk_create(matches, ignore_conflicts=True)
+    return len(matches)
+
+
+def discard_pending_matches(flat_ids):
+    """
+    Drop the queued, not yet sent notifications for flats leaving the
+    listings (archived by the job, the admin, the owner's bulk update or
+    Flat.save): renters aren't told about flats they can't see.
+    """
+    return SavedSearchMatch.objects.filter(flat_id__in=flat_ids, notified_at__isnull=True).delete()[0]
+
+
+def match_new_flat(flat):
+    """Queue a notification for every saved search the new flat matches (two queries, none if archived)."""
+    return match_flats([flat])
+
+
+def send_pending_notifications(batch_size=500):
+    """Email each renter their queued matches, all over one SMTP connection."""
+    pending = list(
+        SavedSearchMatch.objects.filter(notified_at__isnull=True)
+        .select_related("saved_search__renter", "flat")
+        .order_by("created_at")[:batch_size]
+    )
+
+    by_renter = {}
+    for match in pending:
+        by_renter.setdefault(match.saved_search.renter, []).append(match)
+
+    messages = []
+    for renter, matches in by_renter.items():
+        flats = list({match.flat_id: match.flat for match in matches}.values())
+        html = render_to_string("emails/saved_search_email.html", {"renter_name": renter.first_name, "flats": flats})
+        message = EmailMultiAlternatives(
+            f"{len(flats)} new flat(s) match your saved searches",
+            "\n".join(flat.title for flat in flats),
+            f"EasyRent Support Team <{settings.EMAIL_HOST_USER}>",
+            [renter.email],
+        )
+        message.attach_alternative(html, "text/html")
+        messages.append(message)
+
+    if messages:
+        with get_connection() as connection:
+            connection.send_messages(messages)
+
+    SavedSearchMatch.objects.filter(pk__in=[match.pk for match in pending]).update(notified_at=timezone.now())
+
+    return len(messages)
@@ -1,11 +1,32 @@
+import json
+
+from django.core.files.uploadedfile import UploadedFile
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
+from config.cloud import get_client, get_upload_folder
 from user_profile.models import User
+from .images import IMAGE_FIELDS, image_key
 from .models import (
     Flat,
+    FlatFeature,
+    FlatAvailability,
+    FlatBooking,
+    FlatCard,
+    SavedSearch,
+    SavedSearchMatch,
+    Inquiry,
     Category,
     Location
 )
 
+FEATURE_SLOTS = 5  # Legacy `feature_N` / `description_N` keys
+FEATURE_SLOT_FIELDS = [
+    f"{attr}_{position}"
+    for attr in ("feature", "description")
+    for position in range(1, FEATURE_SLOTS + 1)
+]
+MAX_FEATURES = 20
+
 # Category Serializer
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -26,6 +47,100 @@ class OwnerSerializer(serializers.ModelSerializer):
         fields = ['first_name', 'last_name', 'phone_number', 'email']  # Include necessar
         
 
+def get_flat_features(flat):
+    """The flat's features, loaded with a single query unless already prefetched."""
+    if "features" not in getattr(flat, "_prefetched_objects_cache", {}):
+        prefetch_related_objects([flat], "features")
+    return list(flat.features.all())
+
+
+class FlatFeatureSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FlatFeature
+        fields = ['feature', 'description']
+
+
+class FeatureSlotField(serializers.CharField):
+    """A legacy `feature_N` / `description_N` key, backed by the flat's FlatFeature rows."""
+
+    def __init__(self, attr, position, **kwargs):
+        self.attr = attr
+        self.position = position
+        super().__init__(source='*', max_length=255, required=False, **kwargs)
+
+    def run_validation(self, data=serializers.empty):
+        # source='*' merges the returned dict into validated_data
+        return {self.field_name: super().run_validation(data)}
+
+    def to_representation(self, flat):
+        # By position, not index: migrated flats keep the gaps of their empty legacy slots
+        feature = {feature.position: feature for feature in get_flat_features(flat)}.get(self.position)
+        return getattr(feature, self.attr) if feature else ""
+
+
+class CloudinaryImageField(serializers.Field):
+    """
+    An `image_N` value: a file uploaded through the API, or an image the
+    client uploaded straight to Cloudinary with a signature from
+    owner/uploads/sign/, sent as {"public_id", "version", "signature",
+    "format"} (as JSON text in multipart forms). The current value may be
+    sent back unchanged; null or "" clears the image.
+    """
+    default_error_messages = {
+        "invalid": "Send a file, or a direct upload as {{public_id, version, signature, format}}.",
+        "signature": "The upload signature is invalid.",
+        "folder": "The image was not uploaded for this account.",
+        "in_use": "The image is already used by another flat.",
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("required", False)
+        kwargs.setdefault("allow_null", True)
+        super().__init__(**kwargs)
+
+    def validate_empty_values(self, data):
+        return super().validate_empty_values(None if data == "" else data)
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return data  # Uploaded by Flat.save, in parallel with the other files
+
+        instance = getattr(self.parent, "instance", None)
+        if isinstance(data, str):
+            current = getattr(instance, self.source, None)
+            if current and data == image_key(current):
+                return current
+            try:
+                data = json.loads(data)
+            except ValueError:
+                self.fail("invalid")
+
+        if not isinstance(data, dict) or not all(data.get(key) for key in ("public_id", "version", "signature")):
+            self.fail("invalid")
+
+        client = get_client()
+        public_id, version = str(data["public_id"]), str(data["version"])
+        if not client.verify_upload(public_id, version, str(data["signature"])):
+            self.fail("signature")
+
+        # The signature only proves Cloudinary stored it: the folder proves whose upload it was
+        owner_id = instance.owner_id if instance is not None else self.context["request"].user.id
+        if not public_id.startswith(f"{get_upload_folder(owner_id)}/"):
+            self.fail("folder")
+
+        # Each upload belongs to one flat, whose deletion destroys it
+        others = Flat.using_image(public_id)
+        if instance is not None:
+            others = others.exclude(pk=instance.pk)
+        if others.exists():
+            self.fail("in_use")
+
+        return client.resource(public_id, version=version, format=data.get("format"))
+
+    def to_representation(self, value):
+        return image_key(value)
+
+
 class FlatSerializer(serializers.ModelSerializer):
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
     category_title = serializers.StringRelatedField(source='category', read_only=True)
@@ -34,6 +149,26 @@ class FlatSerializer(serializers.ModelSerializer):
     location_title = serializers.StringRelatedField(source='location', read_only=True)
     
     owner = OwnerSerializer(read_only=True)  # Nested serializer
+    images = serializers.JSONField(read_only=True)  # Precomputed WebP variants
+
+    # Files, or public_ids of signed direct uploads (see CloudinaryImageField)
+    image_1 = CloudinaryImageField()
+    image_2 = CloudinaryImageField()
+    image_3 = CloudinaryImageField()
+    image_4 = CloudinaryImageField()
+
+    # Features live in FlatFeature rows; the numbered keys stay for older clients
+    features = FlatFeatureSerializer(many=True, required=False, max_length=MAX_FEATURES)
+    feature_1 = FeatureSlotField("feature", 1)
+    feature_2 = FeatureSlotField("feature", 2)
+    feature_3 = FeatureSlotField("feature", 3)
+    feature_4 = FeatureSlotField("feature", 4)
+    feature_5 = FeatureSlotField("feature", 5)
+    description_1 = FeatureSlotField("description", 1)
+    description_2 = FeatureSlotField("description", 2)
+    description_3 = FeatureSlotField("description", 3)
+    description_4 = FeatureSlotField("description", 4)
+    description_5 = FeatureSlotField("description", 5)
     
     
     class Meta:
@@ -56,6 +191,7 @@ class FlatSerializer(serializers.ModelSerializer):
             'image_2',
             'image_3',
             'image_4',
+            'images',
             'feature_1',
             'feature_2',
             'feature_3',
@@ -66,17 +202,185 @@ class FlatSerializer(serializers.ModelSerializer):
             'description_3',
             'description_4',
             'description_5',
+            'features',
             # 'available',
+            'is_active',  # false: archived (rented), hidden from the public listings
+            'archived_at',
             'created_at',
             'updated_at'
         ]
+        read_only_fields = ['archived_at']
+
+    def validate(self, data):
+        # New flats need either `features` or all of the numbered keys
+        if self.instance is None and "features" not in data:
+            missing = [key for key in FEATURE_SLOT_FIELDS if key not in data]
+            if missing:
+                raise serializers.ValidationError(
+                    {key: "This field is required." for key in missing}
+                )
+        return data
+
+    def pop_features(self, validated_data, flat=None):
+        """
+        Take the feature data out of `validated_data` as a list of dicts, or
+        None when the request doesn't touch features. Numbered keys are
+        applied on top of the flat's current features.
+        """
+        features = validated_data.pop("features", None)
+        slots = {key: validated_data.pop(key) for key in FEATURE_SLOT_FIELDS if key in validated_data}
+
+        if features is None and slots:
+            # Keyed by position: migrated flats can have gaps where legacy slots were empty
+            by_position = {
+                f.position: {"feature": f.feature, "description": f.description}
+                for f in (get_flat_features(flat) if flat is not None else [])
+            }
+            for key, value in slots.items():
+                attr, position = key.rsplit("_", 1)
+                by_position.setdefault(int(position), {"feature": "", "description": ""})[attr] = value
+            features = [
+                by_position.get(position, {"feature": "", "description": ""})
+                for position in range(1, max(by_position) + 1)
+            ]
+
+        return features
 
     def create(self, validated_data):
         
         request = self.context.get('request')
         validated_data['owner'] = request.user  # Assign the logged-in owner
+        features = self.pop_features(validated_data)
             
-        return super().create(validated_data)
+        flat = super().create(validated_data)
+        flat.set_features(features)
+        return flat
+
+    def update(self, instance, validated_data):
+        features = self.pop_features(validated_data, instance)
+
+        flat = super().update(instance, validated_data)
+        if features is not None:
+            flat.set_features(features)
+        return flat
+
+
+class FlatListSerializer(FlatSerializer):
+    """
+    Flat serializer for listing grids: features are left out (they are only
+    shown on the detail page) and only the card-sized image variant is sent.
+    """
+    images = serializers.SerializerMethodField()
+
+    class Meta(FlatSerializer.Meta):
+        fields = [
+            field for field in FlatSerializer.Meta.fields
+            if field != 'features' and field not in FEATURE_SLOT_FIELDS
+        ]
+
+    def get_images(self, obj):
+        return {"card": (obj.images or {}).get("card") or [None] * len(IMAGE_FIELDS)}
+
+
+class FlatCardSerializer(serializers.ModelSerializer):
+    """
+    Listing card read from the denormalized FlatCard table. It has fewer
+    keys than FlatListSerializer (the owner is only `owner_name`, no image
+    fields or updated_at), but `images` has the same shape: one card URL
+    or None per image field.
+    """
+    id = serializers.IntegerField(source='flat_id', read_only=True)
+    category = serializers.IntegerField(source='category_id', read_only=True)
+    location = serializers.IntegerField(source='location_id', read_only=True)
+    images = serializers.SerializerMethodField()
+
+    class Meta:
+        model = FlatCard
+        fields = [
+            'id',
+            'owner_name',
+            'title',
+            'slug',
+            'category',
+            'category_title',
+            'location',
+            'location_title',
+            'flat_size',
+            'room',
+            'bath',
+            'kitchen',
+            'price',
+            'images',
+            'created_at',
+        ]
+
+    def get_images(self, obj):
+        return {"card": obj.card_images or [None] * len(IMAGE_FIELDS)}
+
+
+class DateRangeSerializerMixin:
+    def validate(self, data):
+        if data["end_date"] <= data["start_date"]:
+            raise serializers.ValidationError({"end_date": "End date must be after start date."})
+        return data
+
+
+class FlatAvailabilitySerializer(DateRangeSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = FlatAvailability
+        fields = ['id', 'start_date', 'end_date']
+
+
+class FlatBookingSerializer(DateRangeSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = FlatBooking
+        fields = ['id', 'renter', 'start_date', 'end_date', 'created_at']
+        read_only_fields = ['created_at']
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    min_price = serializers.IntegerField(min_value=0, required=False)
+    max_price = serializers.IntegerField(min_value=0, max_value=SavedSearch.MAX_PRICE, required=False)
+    min_rooms = serializers.IntegerField(min_value=0, required=False)
+
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'category', 'location', 'min_price', 'max_price', 'min_rooms', 'created_at']
+
+    def validate(self, data):
+        if data.get('min_price', 0) > data.get('max_price', SavedSearch.MAX_PRICE):
+            raise serializers.ValidationError({"max_price": "Max price must not be below min price."})
+        return data
+
+
+class SavedSearchMatchSerializer(serializers.ModelSerializer):
+    saved_search = serializers.PrimaryKeyRelatedField(read_only=True)
+    flat = FlatCardSerializer(source='flat.card', read_only=True)
+
+    class Meta:
+        model = SavedSearchMatch
+        fields = ['id', 'saved_search', 'flat', 'created_at']
+
+
+class BulkFlatIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=100
+    )
+
+
+class BulkFlatUpdateSerializer(BulkFlatIdsSerializer):
+    """Fields that can be changed on many flats at once with a single UPDATE."""
+    price = serializers.IntegerField(min_value=0, required=False)
+    flat_size = serializers.IntegerField(min_value=0, required=False)
+    room = serializers.IntegerField(min_value=0, required=False)
+    bath = serializers.IntegerField(min_value=0, required=False)
+    kitchen = serializers.IntegerField(min_value=0, required=False)
+    is_active = serializers.BooleanField(required=False)  # Archive (false) or restore (true)
+
+    def validate(self, data):
+        if len(data) == 1:
+            raise serializers.ValidationError({"error": "Provide at least one field to update."})
+        return data
 
 
 class MessageSerializer(serializers.Serializer):
@@ -87,6 +391,29 @@ class MessageSerializer(serializers.Serializer):
     message = serializers.CharField(max_length=1000)
 
 
+class InquirySerializer(serializers.ModelSerializer):
+    flat_title = serializers.CharField(source='flat.title', read_only=True)
+    flat_slug = serializers.CharField(source='flat.slug', read_only=True)
+    is_read = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Inquiry
+        fields = [
+            'id', 'flat', 'flat_title', 'flat_slug', 'first_name', 'last_name',
+            'email', 'phone', 'message', 'is_read', 'read_at', 'created_at',
+        ]
+
+    def get_is_read(self, obj):
+        return obj.read_at is not None
+
+
+class InquiryMarkReadSerializer(serializers.Serializer):
+    # Leave `ids` out to mark the whole inbox as read
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=100
+    )
+
+
 class ContactFormSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=100)
     email = serializers.EmailField()
@@ -0,0 +1,102 @@
+import copy
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from user_profile.models import User
+from .models import Flat, FlatCard, Category, Location
+from . import autocomplete, cache, similarity
+
+
+# Caches and in-memory indexes are only touched once the change is committed:
+# before that, a concurrent reader would refill them with the old rows (the
+# listing card is written after post_save), and a rollback would leave them
+# describing a change that never happened.
+
+_local = threading.local()
+
+
+@contextmanager
+def flat_receivers_muted():
+    """
+    Skip the per-flat receivers below, for bulk operations that drop the
+    caches and indexes once themselves (see `Flat.bulk_delete`).
+    """
+    previous, _local.muted = muted(), True
+    try:
+        yield
+    finally:
+        _local.muted = previous
+
+
+def muted():
+    return getattr(_local, "muted", False)
+
+
+@receiver([post_save, post_delete], sender=Flat)
+def flat_changed(sender, instance, **kwargs):
+    if muted():
+        return
+    transaction.on_commit(lambda: cache.invalidate(*cache.LISTING_CACHE_KEYS))
+
+
+@receiver(post_save, sender=Flat)
+def flat_saved_similarity(sender, instance, **kwargs):
+    if muted():
+        return
+    if instance.is_active:
+        flat = copy.copy(instance)  # As saved: a later delete() in the transaction clears the pk
+        transaction.on_commit(lambda: similarity.flat_saved(flat))
+    else:
+        flat_id = instance.pk
+        transaction.on_commit(lambda: similarity.flat_deleted(flat_id))  # Archived
+
+
+@receiver(post_delete, sender=Flat)
+def flat_deleted_similarity(sender, instance, **kwargs):
+    if muted():
+        return
+    flat_id = instance.pk
+    transaction.on_commit(lambda: similarity.flat_deleted(flat_id))
+
+
+@receiver([post_save, post_delete], sender=Flat)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Location)
+def titles_changed(sender, instance, **kwargs):
+    if sender is Flat and muted():
+        return
+    transaction.on_commit(autocomplete.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, **kwargs):
+    # Listing cards show category titles too
+    transaction.on_commit(lambda: cache.invalidate(cache.CATEGORIES_CACHE_KEY, *cache.LISTING_CACHE_KEYS))
+
+
+@receiver([post_save, post_delete], sender=Location)
+def location_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: cache.invalidate(cache.LOCATIONS_CACHE_KEY, *cache.LISTING_CACHE_KEYS))
+
+
+@receiver([post_save, post_delete], sender=User)
+def owner_changed(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no cached payload shows
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    if instance.user_type == "owner":
+        transaction.on_commit(lambda: cache.invalidate(*cache.LISTING_CACHE_KEYS))
+
+
+@receiver(post_save, sender=User)
+def refresh_owner_cards(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the owner name on the listing cards in sync (same transaction as the user row)."""
+    if created or instance.user_type != "owner":
+        return
+    if update_fields and not {"first_name", "last_name", "email"} & set(update_fields):
+        return
+    FlatCard.objects.filter(owner=instance).update(owner_name=FlatCard.owner_display_name(instance))
@@ -0,0 +1,237 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+
+VERSION_NAME = "similarity"
+
+# Numeric columns of the feature matrix and their weights
+NUMERIC_FEATURES = ("price", "flat_size", "room", "bath")
+NUMERIC_WEIGHTS = (3.0, 1.5, 1.0, 0.5)
+CATEGORY_WEIGHT = 2.0
+LOCATION_WEIGHT = 2.0
+
+
+class SimilarityIndex:
+    """
+    In-memory feature matrix of all flats for "similar flats" scoring.
+
+    Rows are kept in preallocated NumPy arrays that grow by doubling, so
+    saves update a single row and deletes only clear the row's mask.
+    Scoring a flat against all others is a handful of vector operations.
+    """
+
+    def __init__(self, ids=(), numeric=(), categories=(), locations=()):
+        import numpy as np
+
+        self.np = np
+        self.size = len(ids)
+        capacity = max(self.size, 64)
+
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.numeric = np.zeros((capacity, len(NUMERIC_FEATURES)), dtype=np.float32)
+        self.categories = np.zeros(capacity, dtype=np.int64)
+        self.locations = np.zeros(capacity, dtype=np.int64)
+        self.active = np.zeros(capacity, dtype=bool)
+
+        if self.size:
+            self.ids[:self.size] = ids
+            self.numeric[:self.size] = numeric
+            self.categories[:self.size] = categories
+            self.locations[:self.size] = locations
+            self.active[:self.size] = True
+
+        self.rows = {int(flat_id): row for row, flat_id in enumerate(self.ids[:self.size])}
+
+        # Feature scales are fixed at build time, incremental updates keep them
+        std = self.numeric[:self.size].std(axis=0) if self.size else np.ones(len(NUMERIC_FEATURES))
+        self.weights = np.asarray(NUMERIC_WEIGHTS, dtype=np.float32) / np.where(std > 0, std, 1).astype(np.float32)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (flat_id, price, flat_size, room, bath, category_id, location_id) tuples."""
+        import numpy as np
+
+        data = np.asarray(rows, dtype=np.float64).reshape(-1, 3 + len(NUMERIC_FEATURES))
+        return cls(
+            ids=data[:, 0].astype(np.int64),
+            numeric=data[:, 1:1 + len(NUMERIC_FEATURES)],
+            categories=data[:, -2].astype(np.int64),
+            locations=data[:, -1].astype(np.int64),
+        )
+
+    @classmethod
+    def from_database(cls):
+        from .models import FlatCard
+
+        return cls.from_rows(
+            list(
+                FlatCard.objects.values_list(
+                    "flat_id", *NUMERIC_FEATURES, "category_id", "location_id"
+                ).iterator(chunk_size=5000)
+            )
+        )
+
+    def _grow(self):
+        np = self.np
+        capacity = len(self.ids) * 2
+        for name in ("ids", "numeric", "categories", "locations", "active"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def upsert(self, flat_id, numeric, category_id, location_id):
+        row = self.rows.get(flat_id)
+        if row is None:
+            if self.size == len(self.ids):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.rows[flat_id] = row
+            self.ids[row] = flat_id
+
+        self.numeric[row] = numeric
+        self.categories[row] = category_id
+        self.locations[row] = location_id
+        self.active[row] = True
+
+    def remove(self, flat_id):
+        row = self.rows.pop(flat_id, None)
+        if row is not None:
+            self.active[row] = False
+
+    def similar(self, flat_id, k=6):
+        """Ids of the `k` flats most similar to `flat_id`, best first."""
+        np = self.np
+        row = self.rows.get(flat_id)
+        if row is None:
+            return []
+
+        n = self.size
+        distance = np.abs(self.numeric[:n] - self.numeric[row]) @ self.weights
+        score = (
+            CATEGORY_WEIGHT * (self.categories[:n] == self.categories[row])
+            + LOCATION_WEIGHT * (self.locations[:n] == self.locations[row])
+            - distance
+        )
+        score[~self.active[:n]] = -np.inf
+        score[row] = -np.inf
+
+        k = min(k, len(self.rows) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-score, k - 1)[:k]
+        top = top[np.argsort(-score[top])]
+        return [int(flat_id) for flat_id in self.ids[top]]
+
+
+_index = None
+_index_version = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_refresh_interval():
+    return getattr(settings, "SIMILAR_FLATS_REFRESH_INTERVAL", 60)
+
+
+def bump_version():
+    """
+    Tell every worker its index is stale (they rebuild on their next
+    lookup). Versions count the changes, so the caller can tell from the
+    new number whether another worker changed something since its own
+    index was loaded. The counter is a database row incremented in SQL:
+    concurrent bumps queue on the row lock and each gets its own number.
+    """
+    from .models import IndexVersion
+
+    versions = IndexVersion.objects.filter(name=VERSION_NAME)
+    with transaction.atomic(savepoint=False):
+        if not versions.update(value=F("value") + 1):
+            IndexVersion.objects.get_or_create(name=VERSION_NAME)  # First change
+            versions.update(value=F("value") + 1)
+        return versions.values_list("value", flat=True).get()
+
+
+def get_version():
+    from .models import IndexVersion
+
+    return IndexVersion.objects.filter(name=VERSION_NAME).values_list("value", flat=True).first()
+
+
+def _adopt(version):
+    """
+    After patching this process' index for the change numbered `version`:
+    the index is current only if it had every change before it. Otherwise
+    it keeps its old version and the next lookup rebuilds it.
+    """
+    global _index_version
+    if (_index_version or 0) == version - 1:
+        _index_version = version
+
+
+def get_index():
+    """
+    This process' index, built on first use. Changes made by other workers
+    are picked up through the shared version counter, checked at most once per
+    refresh interval.
+    """
+    global _index, _index_version, _checked_at
+
+    now = time.monotonic()
+    with _lock:
+        if _index is not None and now - _checked_at < get_refresh_interval():
+            return _index
+
+        version = get_version()
+        if _index is None or version != _index_version:
+            _index = SimilarityIndex.from_database()
+            _index_version = version
+        _checked_at = now
+        return _index
+
+
+def flat_saved(flat):
+    """Apply a saved flat to this process' index and flag other workers."""
+    with _lock:
+        version = bump_version()
+        if _index is not None:
+            _index.upsert(
+                flat.pk,
+                [getattr(flat, name) for name in NUMERIC_FEATURES],
+                flat.category_id,
+                flat.location_id,
+            )
+            _adopt(version)
+
+
+def flat_deleted(flat_id):
+    with _lock:
+        version = bump_version()
+        if _index is not None:
+            _index.remove(flat_id)
+            _adopt(version)
+
+
+def invalidate():
+    """Bulk changes bypass the save signals: reload every index, this one included."""
+    global _checked_at
+    with _lock:
+        bump_version()
+        _checked_at = 0.0
+
+
+def rebuild():
+    """Full rebuild of this process' index; other workers follow via the version counter."""
+    global _index, _index_version, _checked_at
+    with _lock:
+        # Bumped first: a change made while the rows are read bumps again
+        version = bump_version()
+        _index = SimilarityIndex.from_database()
+        _index_version = version
+        _checked_at = time.monotonic()
+        return _index
@@ -1,3 +1,1300 @@
-from django.test import TestCase
+import datetime
+import gzip
+import itertools
+import json
+import threading
+import time
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from config import compression, fastjson
+from config.cloud import get_client, get_cloudinary, get_upload_folder
+from config.fastjson import ORJSONRenderer
+from config.pagination import count_rows
+from config.querybudget import DATABASE_CACHES, LOCAL_CACHES, QueryBudgetMixin, format_queries
+from config.tiered_cache import TieredCache
+from user_profile.models import User
+from . import autocomplete, similarity
+from .archive import archive_flats, restore_flats
+from .availability import book_flat, filter_available
+from .cache import HOME_CACHE_KEY, response_cache_key
+from .images import IMAGE_FIELDS
+from .inbox import create_inquiry, get_unread, mark_read, send_inquiry_digests, send_inquiry_email
+from .models import (
+    Category,
+    Flat,
+    FlatAvailability,
+    FlatBooking,
+    FlatFeature,
+    IdempotencyKey,
+    Location,
+    SavedSearch,
+    SavedSearchMatch,
+)
+from .saved_searches import match_flats, match_new_flat
+from .serializers import FlatSerializer
+
+
+AVAILABLE_FROM = datetime.date(2030, 1, 1)
+AVAILABLE_TO = datetime.date(2030, 12, 31)
+
+_numbers = itertools.count(1)
+
+
+def make_user(user_type, **extra):
+    number = next(_numbers)
+    return User.objects.create_user(
+        email=f"{user_type}{number}@example.com",
+        password="secret-password",
+        user_type=user_type,
+        first_name=user_type.title(),
+        last_name=str(number),
+        phone_number="0123456789",
+        **extra,
+    )
+
+
+def make_flat(owner, category, location, features=2):
+    number = next(_numbers)
+    flat = Flat.objects.create(
+        owner=owner,
+        category=category,
+        location=location,
+        title=f"Flat {number}",
+        flat_size=50 + number,
+        room=2,
+        bath=1,
+        kitchen=1,
+        price=1000 + number,
+    )
+    flat.set_features(
+        [{"feature": f"Feature {i}", "description": f"Description {i}"} for i in range(features)]
+    )
+    FlatAvailability.objects.create(flat=flat, start_date=AVAILABLE_FROM, end_date=AVAILABLE_TO)
+    return flat
+
+
+def inquiry_data(number=0):
+    return {
+        "first_name": "Renter",
+        "last_name": str(number),
+        "email": f"renter{number}@example.com",
+        "phone": "0123456789",
+        "message": "Is the flat still free?",
+    }
+
+
+@override_settings(
+    CACHES=LOCAL_CACHES,
+    CLOUDINARY_CLIENT="config.cloud.OfflineCloudinaryClient",
+    SIMILAR_FLATS_REFRESH_INTERVAL=0,
+    AUTOCOMPLETE_REFRESH_INTERVAL=0,
+    AUTOCOMPLETE_BACKGROUND_REBUILD=False,
+    INQUIRY_EMAILS_ENABLED=True,
+)
+class FlatQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Every flat endpoint runs a fixed number of queries, however many rows
+    it shows: budgets are checked on seeded data and the list endpoints
+    are run again with more rows to catch N+1 queries.
+    """
+
+    def setUp(self):
+        cache.clear()
+        similarity.invalidate()
+        autocomplete.invalidate()
+        mail.outbox = []
+        get_client().uploads.clear()
+
+        self.owner = make_user("owner", house_holding_number="12", address="Main street")
+        self.renter = make_user("renter")
+        self.staff = make_user("renter", is_staff=True)
+        self.added_flats = 0
+        self.categories = [Category.objects.create(title=title) for title in ("Family", "Bachelor")]
+        self.locations = [Location.objects.create(title=title) for title in ("Dhaka", "Kushtia")]
+        self.flats = [self.add_flat() for _ in range(3)]
+        self.flat = self.flats[0]
+
+        self.search = SavedSearch.objects.create(renter=self.renter, category=self.categories[0])
+        self.book(self.flats[1])
+        self.add_matches(2)
+
+        self.client = APIClient(SERVER_NAME="127.0.0.1")
+
+    # Seeding helpers
+
+    def add_flat(self, **kwargs):
+        # Alternate categories and locations: Family flats are in Dhaka
+        self.added_flats += 1
+        return make_flat(
+            self.owner,
+            self.categories[self.added_flats % 2],
+            self.locations[self.added_flats % 2],
+            **kwargs,
+        )
+
+    def add_flats(self, count):
+        return [self.add_flat() for _ in range(count)]
+
+    def book(self, flat):
+        flat.renters_who_messaged.add(self.renter)
+        create_inquiry(flat, self.renter, inquiry_data())
+
+    def add_inquiries(self, count):
+        for number in range(count):
+            create_inquiry(self.flat, self.renter, inquiry_data(number))
+
+    def add_matches(self, count):
+        for flat in self.add_flats(count):
+            SavedSearchMatch.objects.create(saved_search=self.search, flat=flat)
+
+    def login(self, user):
+        self.client.force_authenticate(user)
+
+    def get(self, name, *args, **params):
+        return lambda: self.client.get(reverse(name, args=args), params)
+
+    def post(self, name, data, *args, method="post"):
+        return lambda: getattr(self.client, method)(reverse(name, args=args), data, format="json")
+
+    def check(self, budget, request, status=200):
+        response = self.assertQueryBudget(budget, request)
+        self.assertEqual(response.status_code, status, getattr(response, "data", None))
+        return response
+
+    # Listings: a page is at most a COUNT and its rows (an empty list skips the rows query)
+
+    def test_home(self):
+        self.check(1, self.get("home"))
+        self.check(0, self.get("home"))  # Cached
+        self.assertNoNPlusOne(self.get("home"), lambda: self.add_flats(5), "home")
+
+    def test_all_flats(self):
+        self.check(2, self.get("list-flats"))
+        self.assertNoNPlusOne(self.get("list-flats"), lambda: self.add_flats(5), "all_flats")
+
+    def test_all_flats_page_size(self):
+        self.add_flats(10)
+        small = self.check(2, self.get("list-flats", page_size=2))
+        large = self.check(2, self.get("list-flats", page_size=12))
+        self.assertEqual(len(small.data["results"]), 2)
+        self.assertEqual(len(large.data["results"]), 12)
+
+    def test_filter_category(self):
+        category = self.categories[0].id
+        self.check(2, self.get("category", category=category))
+        self.check(0, self.get("category", category=category))  # Cached first page
+        self.check(2, self.get("category", category=category, page=1, page_size=5))
+        self.check(
+            2, self.get("category", category=category, available_from=AVAILABLE_FROM, available_to=AVAILABLE_TO)
+        )
+        self.assertNoNPlusOne(
+            self.get("category", category=category), lambda: self.add_flats(6), "filter_category"
+        )
+
+    def test_search(self):
+        self.check(2, self.get("search", category="Family", location="Dhaka"))
+        self.check(2, self.get("search", available_from=AVAILABLE_FROM, available_to=AVAILABLE_TO))
+        self.assertNoNPlusOne(
+            self.get("search", available_from=AVAILABLE_FROM, available_to=AVAILABLE_TO),
+            lambda: self.add_flats(5),
+            "search",
+        )
+
+    def test_flat_details(self):
+        self.check(2, self.get("flat-details", self.flat.slug))
+
+        def more_features():
+            self.flat.set_features(
+                [{"feature": f"Feature {i}", "description": "More"} for i in range(5)]
+            )
+
+        self.assertNoNPlusOne(self.get("flat-details", self.flat.slug), more_features, "flat_details")
+
+    def test_similar(self):
+        self.check(4, self.get("similar-flats", self.flat.slug))  # Builds the index
+        self.check(3, self.get("similar-flats", self.flat.slug))  # Version check
+        self.assertNoNPlusOne(
+            self.get("similar-flats", self.flat.slug, limit=20), lambda: self.add_flats(5), "similar"
+        )
+
+    def test_autocomplete(self):
+        self.check(6, self.get("autocomplete", q="fl"))
+        self.check(0, self.get("autocomplete", q="dha"))  # Built
+        self.assertNoNPlusOne(self.get("autocomplete", q="fl"), lambda: self.add_flats(5), "autocomplete")
+
+    def test_categories_and_locations(self):
+        self.check(1, self.get("categories"))
+        self.check(1, self.get("locations"))
+        self.check(0, self.get("categories"))
+        self.check(0, self.get("locations"))
+        self.assertNoNPlusOne(
+            self.get("categories"), lambda: Category.objects.create(title="Studio"), "categories"
+        )
+        self.assertNoNPlusOne(
+            self.get("locations"), lambda: Location.objects.create(title="Khulna"), "locations"
+        )
+
+    def test_contact(self):
+        data = {"name": "Visitor", "email": "visitor@example.com", "phone": "0123", "message": "Hello"}
+        self.check(0, self.post("contact", data))
+        self.assertEqual(len(mail.outbox), 1)
+
+    # Signed-in users
+
+    def test_bootstrap(self):
+        self.login(self.owner)
+        self.check(3, self.get("bootstrap"))
+        self.assertNoNPlusOne(self.get("bootstrap"), lambda: self.add_flats(5), "bootstrap (owner)")
+
+        self.login(self.renter)
+        self.check(1, self.get("bootstrap"))  # Categories and locations are cached
+        self.assertNoNPlusOne(
+            self.get("bootstrap"), lambda: [self.book(flat) for flat in self.add_flats(3)], "bootstrap (renter)"
+        )
+
+    def test_cache_stats(self):
+        self.login(self.staff)
+        self.check(0, self.get("cache-stats"))
+        self.login(self.renter)
+        self.check(0, self.get("cache-stats"), status=403)
+
+    def test_profiling_report(self):
+        self.login(self.staff)
+        self.check(0, self.get("profiling-report"))
+        self.check(0, self.get("profiling-report", url_name="home"))
+        self.login(self.renter)
+        self.check(0, self.get("profiling-report"), status=403)
+
+    # Owners
+
+    def flat_payload(self, features=2):
+        return {
+            "title": "New flat",
+            "category": self.categories[0].id,
+            "location": self.locations[0].id,
+            "flat_size": 70,
+            "room": 3,
+            "bath": 2,
+            "kitchen": 1,
+            "price": 1500,
+            "features": [{"feature": f"Feature {i}", "description": "Nice"} for i in range(features)],
+        }
+
+    def test_add_flat(self):
+        self.login(self.owner)
+        self.check(14, self.post("add-flat", self.flat_payload()), status=201)
+
+        features = [2]
+        self.assertNoNPlusOne(
+            lambda: self.client.post(reverse("add-flat"), self.flat_payload(features[0]), format="json"),
+            lambda: features.__setitem__(0, 5),
+            "add flat",
+        )
+
+    def direct_upload(self, public_id, version=1234):
+        """What Cloudinary answers a signed direct upload with."""
+        cloudinary = get_cloudinary()
+        signature = cloudinary.utils.api_sign_request(
+            {"public_id": public_id, "version": version}, cloudinary.config().api_secret, signature_version=1
+        )
+        return {"public_id": public_id, "version": version, "signature": signature, "format": "jpg"}
+
+    def test_sign_upload(self):
+        self.login(self.owner)
+        response = self.check(0, self.post("sign-upload", None))
+        self.assertEqual(response.data["params"]["folder"], get_upload_folder(self.owner.id))
+        self.login(self.renter)
+        self.check(0, self.post("sign-upload", None), status=403)
+
+    def test_add_flat_direct_upload(self):
+        self.login(self.owner)
+        folder = get_upload_folder(self.owner.id)
+        payload = dict(self.flat_payload(), image_1=self.direct_upload(f"{folder}/a"), image_2=self.direct_upload(f"{folder}/b"))
+        # One query per image checks no other flat uses it
+        response = self.check(16, self.post("add-flat", payload), status=201)
+        self.assertEqual(len([url for url in response.data["images"]["card"] if url]), 2)
+        self.assertEqual(get_client().uploads, [])  # Nothing went through the API
+
+        forged = dict(self.direct_upload(f"{folder}/c"), signature="forged")
+        self.check(3, self.post("add-flat", dict(payload, image_1=forged)), status=400)  # image_2 is checked
+        foreign = self.direct_upload(f"{get_upload_folder(self.renter.id)}/d")
+        self.check(3, self.post("add-flat", dict(payload, image_1=foreign)), status=400)
+
+    def test_direct_upload_not_shared(self):
+        self.login(self.owner)
+        folder = get_upload_folder(self.owner.id)
+        payload = dict(self.flat_payload(), image_1=self.direct_upload(f"{folder}/a"))
+        flat_id = self.client.post(reverse("add-flat"), payload, format="json").data["id"]
+
+        # Another version or format of the same upload is the same image
+        reused = dict(self.direct_upload(f"{folder}/a", version=5678), format="png")
+        response = self.client.post(reverse("add-flat"), dict(payload, image_1=reused), format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("image_1", response.data)
+
+        # Its own flat may send it again
+        response = self.client.put(
+            reverse("update-delete-flat", args=[flat_id]), {"image_2": self.direct_upload(f"{folder}/a")}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_add_flat_file_uploads(self):
+        self.login(self.owner)
+        data = {key: value for key, value in self.flat_payload().items() if key != "features"}
+        data.update({f"{attr}_{n}": f"{attr} {n}" for attr in ("feature", "description") for n in range(1, 6)})
+        for field in ("image_1", "image_2", "image_3"):
+            data[field] = SimpleUploadedFile(f"{field}.jpg", b"jpeg", content_type="image/jpeg")
+
+        response = self.check(11, lambda: self.client.post(reverse("add-flat"), data), status=201)
+        self.assertEqual(len(get_client().uploads), 3)
+        self.assertEqual(len([url for url in response.data["images"]["card"] if url]), 3)
+
+    def test_owner_flats_list(self):
+        self.login(self.owner)
+        self.check(2, self.get("list-owner-flats"))
+        self.check(2, self.get("list-owner-flats", archived=1))
+        self.assertNoNPlusOne(self.get("list-owner-flats"), lambda: self.add_flats(5), "owner flats")
+
+    def test_update_flat(self):
+        self.login(self.owner)
+        self.check(
+            14,
+            self.post("update-delete-flat", {"price": 2000, "features": [{"feature": "Lift", "description": "Yes"}]},
+                      self.flat.id, method="put"),
+        )
+        self.check(12, self.post("update-delete-flat", {"price": 2100}, self.flat.id, method="put"))
+
+    def test_delete_flat(self):
+        self.login(self.owner)
+        self.check(12, self.post("update-delete-flat", None, self.flat.id, method="delete"), status=204)
+
+    def test_bulk_update(self):
+        self.login(self.owner)
+        ids = [[flat.id for flat in self.flats]]
+        request = lambda: self.client.post(reverse("bulk-update-flats"), {"ids": ids[0], "price": 900}, format="json")
+        self.check(7, request)
+        self.assertNoNPlusOne(
+            request, lambda: ids.__setitem__(0, ids[0] + [flat.id for flat in self.add_flats(5)]), "bulk update"
+        )
+
+    def test_bulk_archive(self):
+        self.login(self.owner)
+        ids = [[flat.id for flat in self.flats]]
+        archive = lambda: self.client.post(reverse("bulk-update-flats"), {"ids": ids[0], "is_active": False}, format="json")
+        restore = lambda: self.client.post(reverse("bulk-update-flats"), {"ids": ids[0], "is_active": True}, format="json")
+
+        self.check(11, archive)
+        self.check(1, self.get("flat-details", self.flat.slug), status=404)
+        listed = {card["id"] for card in self.check(1, self.get("home")).json()}
+        self.assertFalse(listed & set(ids[0]))
+        self.check(12, restore)  # Cards and saved-search matches rebuilt
+        self.check(2, self.get("flat-details", self.flat.slug))
+
+        self.assertNoNPlusOne(
+            archive, lambda: ids.__setitem__(0, ids[0] + [flat.id for flat in self.add_flats(5)]), "bulk archive"
+        )
+        self.assertNoNPlusOne(
+            restore, lambda: ids.__setitem__(0, ids[0] + [flat.id for flat in self.add_flats(5)]), "bulk restore"
+        )
+
+    def test_bulk_delete(self):
+        self.login(self.owner)
+        ids = [[flat.id for flat in self.flats[:2]]]
+        request = lambda: self.client.post(reverse("bulk-delete-flats"), {"ids": ids[0]}, format="json")
+        self.check(16, request)
+        ids[0] = [self.flats[2].id]
+        self.assertNoNPlusOne(
+            request, lambda: ids.__setitem__(0, [flat.id for flat in self.add_flats(5)]), "bulk delete"
+        )
+
+    def test_availability(self):
+        self.login(self.owner)
+        self.check(2, self.get("flat-availability", self.flat.id))
+        data = {"start_date": "2031-01-01", "end_date": "2031-02-01"}
+        # Lock, neighbour lookup and insert, in a savepoint
+        self.check(6, self.post("flat-availability", data, self.flat.id), status=201)
+
+        def more_ranges():
+            for month in range(2, 8):
+                FlatAvailability.objects.create(
+                    flat=self.flat,
+                    start_date=datetime.date(2031, month, 1),
+                    end_date=datetime.date(2031, month, 20),
+                )
+
+        self.assertNoNPlusOne(self.get("flat-availability", self.flat.id), more_ranges, "availability")
+
+    def test_bookings(self):
+        self.login(self.owner)
+        self.check(2, self.get("flat-bookings", self.flat.id))
+        data = {"start_date": "2030-02-01", "end_date": "2030-02-10"}
+        self.check(9, self.post("flat-bookings", data, self.flat.id), status=201)
+
+        def more_bookings():
+            for month in range(3, 9):
+                FlatBooking.objects.create(
+                    flat=self.flat,
+                    renter=self.renter,
+                    start_date=datetime.date(2030, month, 1),
+                    end_date=datetime.date(2030, month, 10),
+                )
+
+        self.assertNoNPlusOne(self.get("flat-bookings", self.flat.id), more_bookings, "bookings")
+
+    def test_inbox(self):
+        self.login(self.owner)
+        self.check(2, self.get("owner-inbox"))
+        self.check(2, self.get("owner-inbox", unread=1))
+        self.assertNoNPlusOne(self.get("owner-inbox"), lambda: self.add_inquiries(5), "inbox")
+
+    def test_inbox_unread_count(self):
+        self.login(self.owner)
+        response = self.check(1, self.get("owner-inbox-unread-count"))
+        self.assertEqual(response.data["unread_count"], 1)
+
+    def test_inbox_mark_read(self):
+        self.add_inquiries(3)
+        self.login(self.owner)
+        ids = list(self.owner.inquiries.values_list("id", flat=True))
+        self.check(5, self.post("owner-inbox-mark-read", {"ids": ids[:2]}))
+        self.check(5, self.post("owner-inbox-mark-read", {}))
+
+        self.add_inquiries(3)
+        unread = list(self.owner.inquiries.filter(read_at=None).values_list("id", flat=True))
+        selected = [unread[:1]]
+        self.assertNoNPlusOne(
+            lambda: self.client.post(reverse("owner-inbox-mark-read"), {"ids": selected[0]}, format="json"),
+            lambda: selected.__setitem__(0, unread[1:]),
+            "mark read",
+        )
+
+    # Renters
+
+    def test_renter_bookings(self):
+        self.login(self.renter)
+        self.check(2, self.get("renter-bookings"))
+        self.assertNoNPlusOne(
+            self.get("renter-bookings"), lambda: [self.book(flat) for flat in self.add_flats(4)], "renter bookings"
+        )
+
+    def test_delete_booking(self):
+        self.login(self.renter)
+        self.check(2, self.post("delete-booking", None, self.flats[1].slug, method="delete"), status=204)
+
+    def test_send_message(self):
+        self.login(self.renter)
+        self.check(9, self.post("send-message", inquiry_data(), self.flat.slug))
+        self.assertEqual(len(mail.outbox), 1)
+
+        self.owner.inquiry_delivery = "digest"
+        self.owner.save(update_fields=["inquiry_delivery"])
+        self.check(8, self.post("send-message", inquiry_data(), self.flats[2].slug))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_saved_searches(self):
+        self.login(self.renter)
+        self.check(2, self.get("saved-searches"))
+        self.check(2, self.post("saved-searches", {"location": self.locations[0].id, "max_price": 5000}), status=201)
+        self.assertNoNPlusOne(
+            self.get("saved-searches"),
+            lambda: [SavedSearch.objects.create(renter=self.renter, min_rooms=n) for n in range(5)],
+            "saved searches",
+        )
+
+    def test_delete_saved_search(self):
+        self.login(self.renter)
+        self.check(3, self.post("delete-saved-search", None, self.search.id, method="delete"), status=204)
+
+    def test_saved_search_matches(self):
+        self.login(self.renter)
+        self.check(2, self.get("saved-search-matches"))
+        self.assertNoNPlusOne(self.get("saved-search-matches"), lambda: self.add_matches(5), "matches")
+
+
+class ImageVariantTests(TestCase):
+    """Precomputed variant URLs keep one slot per image field."""
+
+    def setUp(self):
+        self.owner = make_user("owner")
+        self.category = Category.objects.create(title="Family")
+        self.location = Location.objects.create(title="Dhaka")
+
+    def resource(self, public_id):
+        return get_cloudinary().CloudinaryResource(public_id, version=1, format="jpg", type="upload", resource_type="image")
+
+    def test_empty_middle_image_keeps_slots(self):
+        flat = make_flat(self.owner, self.category, self.location)
+        flat.image_1 = self.resource("flats/first")
+        flat.image_3 = self.resource("flats/third")
+        flat.save()
+
+        for variant, urls in flat.images.items():
+            self.assertEqual(len(urls), len(IMAGE_FIELDS), variant)
+            self.assertIn("flats/first", urls[0])
+            self.assertIsNone(urls[1])
+            self.assertIn("flats/third", urls[2])
+            self.assertIsNone(urls[3])
+        flat.card.refresh_from_db()
+        self.assertEqual(flat.card.card_images, flat.images["card"])
+
+    def test_listing_endpoints_agree(self):
+        cache.clear()
+        flat = make_flat(self.owner, self.category, self.location)
+        flat.image_2 = self.resource("flats/second")
+        flat.save()
+        bare = make_flat(self.owner, self.category, self.location)
+
+        client = APIClient(SERVER_NAME="127.0.0.1")
+        cards = {item["id"]: item["images"] for item in json.loads(client.get(reverse("home")).content)}
+        listed = {
+            item["id"]: item["images"] for item in json.loads(client.get(reverse("list-flats")).content)["results"]
+        }
+        self.assertEqual(cards, listed)
+        self.assertIsNone(cards[flat.id]["card"][0])
+        self.assertIn("flats/second", cards[flat.id]["card"][1])
+        self.assertEqual(cards[bare.id], {"card": [None] * len(IMAGE_FIELDS)})
+
+
+@override_settings(INQUIRY_DIGEST_WINDOW=0)
+class InquiryDigestTests(TestCase):
+    """Inquiries left unsent go out in the next digest, whatever the owner's delivery is now."""
+
+    def setUp(self):
+        self.owner = make_user("owner", inquiry_delivery="digest")
+        self.renter = make_user("renter")
+        self.flat = make_flat(self.owner, Category.objects.create(title="Family"), Location.objects.create(title="Dhaka"))
+
+    def test_switch_to_immediate_flushes_pending(self):
+        create_inquiry(self.flat, self.renter, inquiry_data(1))
+        create_inquiry(self.flat, self.renter, inquiry_data(2))
+        self.owner.inquiry_delivery = "immediate"
+        self.owner.save(update_fields=["inquiry_delivery"])
+
+        self.assertEqual(send_inquiry_digests(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.owner.email])
+        self.assertIn("2 new message(s)", mail.outbox[0].subject)
+        self.assertEqual(send_inquiry_digests(), 0)
+
+    def test_emailed_inquiries_skipped(self):
+        send_inquiry_email(create_inquiry(self.flat, self.renter, inquiry_data(1)))
+        self.assertEqual(send_inquiry_digests(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class FeatureSlotTests(TestCase):
+    """The legacy feature_N / description_N keys show the feature stored at position N."""
+
+    def test_gap_keeps_position(self):
+        category = Category.objects.create(title="Family")
+        location = Location.objects.create(title="Dhaka")
+        flat = make_flat(make_user("owner"), category, location, features=0)
+        FlatFeature.objects.create(flat=flat, position=2, feature="Lift", description="Up to the roof")
+
+        data = FlatSerializer(flat).data
+        self.assertEqual((data["feature_1"], data["description_1"]), ("", ""))
+        self.assertEqual((data["feature_2"], data["description_2"]), ("Lift", "Up to the roof"))
+
+        serializer = FlatSerializer(flat, data={"feature_3": "Garage"}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        data = FlatSerializer(Flat.objects.get(pk=flat.pk)).data
+        self.assertEqual([data[f"feature_{n}"] for n in (1, 2, 3)], ["", "Lift", "Garage"])
+
+
+@override_settings(CACHES=LOCAL_CACHES, CLOUDINARY_CLIENT="config.cloud.OfflineCloudinaryClient")
+class SharedImageTests(TestCase):
+    """An image used by several flats (rows saved before reuse was rejected) outlives each of them."""
+
+    def setUp(self):
+        get_client().deleted.clear()
+        owner = make_user("owner")
+        category = Category.objects.create(title="Family")
+        location = Location.objects.create(title="Dhaka")
+        self.flats = [make_flat(owner, category, location) for _ in range(3)]
+        for flat in self.flats:
+            flat.image_1 = get_cloudinary().CloudinaryResource(
+                "flats/shared", version=1, format="jpg", type="upload", resource_type="image"
+            )
+            flat.save()
+
+    def test_replaced_image_kept(self):
+        flat = self.flats[0]
+        flat.image_1 = None
+        flat.save()
+        self.assertEqual(get_client().deleted, [])
+
+    def test_delete(self):
+        self.flats[0].delete()
+        self.flats[1].delete()
+        self.assertEqual(get_client().deleted, [])
+        self.flats[2].delete()
+        self.assertEqual(get_client().deleted, ["flats/shared"])
+
+    def test_bulk_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Flat.bulk_delete(Flat.objects.filter(pk__in=[self.flats[0].pk, self.flats[1].pk]))
+        self.assertEqual(get_client().deleted, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Flat.bulk_delete(Flat.objects.filter(pk=self.flats[2].pk))
+        self.assertEqual(get_client().deleted, ["flats/shared"])
+
+
+@override_settings(CACHES=LOCAL_CACHES, COMPRESSION_MIN_SIZE=0)
+class CompressionTests(TestCase):
+    """Responses are compressed with the best encoding the client accepts."""
+
+    def setUp(self):
+        cache.clear()
+        owner = make_user("owner")
+        category = Category.objects.create(title="Family")
+        location = Location.objects.create(title="Dhaka")
+        for _ in range(3):
+            make_flat(owner, category, location)
+        self.client = APIClient(SERVER_NAME="127.0.0.1")
+
+    def get(self, name, accept_encoding):
+        return self.client.get(reverse(name), HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    def assertVaries(self, response):
+        self.assertIn("Accept-Encoding", response.get("Vary", ""))
+
+    def test_gzip(self):
+        plain = self.get("list-flats", "")
+        response = self.get("list-flats", "gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertVaries(response)
+        self.assertVaries(plain)
+
+    def test_refused_encoding(self):
+        response = self.get("list-flats", "gzip;q=0, identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertVaries(response)
+
+    def test_cached_response_is_precompressed(self):
+        first = self.get("home", "gzip")
+        second = self.get("home", "gzip")
+        self.assertEqual(second["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(second.content), gzip.decompress(first.content))
+        self.assertVaries(second)
+
+    @skipUnless(compression.brotli, "brotli is not installed")
+    def test_brotli_preferred(self):
+        plain = self.get("list-flats", "")
+        response = self.get("list-flats", "gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(compression.brotli.decompress(response.content), plain.content)
+
+
+@override_settings(CACHES=LOCAL_CACHES, SIMILAR_FLATS_REFRESH_INTERVAL=0)
+class CommitHookTests(TestCase):
+    """Caches and indexes only follow committed changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user("owner")
+        self.category = Category.objects.create(title="Family")
+        self.location = Location.objects.create(title="Dhaka")
+        self.client = APIClient(SERVER_NAME="127.0.0.1")
+        self.home_key = response_cache_key(HOME_CACHE_KEY, "json")
+
+    def test_invalidation_waits_for_commit(self):
+        self.client.get(reverse("home"))
+        self.assertIsNotNone(cache.get(self.home_key))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            make_flat(self.owner, self.category, self.location)
+            self.assertIsNotNone(cache.get(self.home_key))  # Still in the transaction
+
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(self.home_key))
+
+    def test_rollback_keeps_cache(self):
+        self.client.get(reverse("home"))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                make_flat(self.owner, self.category, self.location)
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertIsNotNone(cache.get(self.home_key))
+
+
+@skipUnless(fastjson.orjson, "orjson is not installed")
+class ORJSONRendererTests(TestCase):
+    """The orjson renderer writes what DRF's renderer writes."""
+
+    def assertSameJSON(self, data):
+        fast, stdlib = ORJSONRenderer().render(data), JSONRenderer().render(data)
+        self.assertEqual(fast, stdlib)
+
+    def test_parity(self):
+        self.assertSameJSON({
+            "date": datetime.date(2030, 1, 2),
+            "datetime": datetime.datetime(2030, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.timezone.utc),
+            "naive": datetime.datetime(2030, 1, 2, 3, 4, 5),
+            "time": datetime.time(12, 30),
+            "decimal": Decimal("1500.50"),
+            "floats": [0.1, 1.5, -2.25, 123456789.123],
+            "text": "Gulshan   Dhaka  ",
+            "nested": [{"id": 1, "ok": True, "none": None}],
+        })
+
+    def test_large_int_falls_back(self):
+        data = {"big": 2 ** 70, "small": -2 ** 63}
+        self.assertSameJSON(data)
+
+    def test_exponent_floats_same_value(self):
+        data = {"big": 1e16, "small": 1e-7, "decimal": Decimal("1E+20")}
+        fast, stdlib = ORJSONRenderer().render(data), JSONRenderer().render(data)
+        self.assertEqual(json.loads(fast), json.loads(stdlib))
+
+
+@override_settings(API_COUNT_CAP=2)
+class CountRowsTests(TestCase):
+    """The count cap applies to filtered lists only, unfiltered lists without an estimate count exactly."""
+
+    def setUp(self):
+        owner = make_user("owner")
+        category = Category.objects.create(title="Family")
+        location = Location.objects.create(title="Dhaka")
+        for _ in range(3):
+            make_flat(owner, category, location)
+
+    def test_unfiltered_counts_exactly(self):
+        # SQLite has no planner estimate, and small tables stay below ESTIMATE_THRESHOLD anyway
+        self.assertEqual(count_rows(Flat.objects.all()), (3, True))
+
+    def test_filtered_stops_at_cap(self):
+        self.assertEqual(count_rows(Flat.objects.filter(is_active=True)), (2, False))
+        self.assertEqual(count_rows(Flat.objects.filter(price__gt=10**9)), (0, True))
+
+
+class AvailabilityTests(TestCase):
+    """Stays are offered when the owner's windows cover them, and bookings never overlap."""
+
+    def setUp(self):
+        owner = make_user("owner")
+        self.flat = make_flat(owner, Category.objects.create(title="Family"), Location.objects.create(title="Dhaka"))
+        self.flat.availability.all().delete()
+
+    def offer(self, start, end):
+        return FlatAvailability.objects.create(flat=self.flat, start_date=start, end_date=end)
+
+    def is_available(self, start, end):
+        return filter_available(Flat.objects.filter(pk=self.flat.pk), start, end).exists()
+
+    def test_adjacent_windows_merge(self):
+        self.offer(datetime.date(2030, 1, 1), datetime.date(2030, 1, 15))
+        self.offer(datetime.date(2030, 1, 15), datetime.date(2030, 1, 31))
+
+        windows = list(self.flat.availability.values_list("start_date", "end_date"))
+        self.assertEqual(windows, [(datetime.date(2030, 1, 1), datetime.date(2030, 1, 31))])
+        self.assertTrue(self.is_available(datetime.date(2030, 1, 10), datetime.date(2030, 1, 20)))
+        booking = book_flat(self.flat, datetime.date(2030, 1, 10), datetime.date(2030, 1, 20))
+        self.assertEqual(booking.flat, self.flat)
+
+    def test_overlapping_windows_merge(self):
+        self.offer(datetime.date(2030, 3, 1), datetime.date(2030, 3, 20))
+        self.offer(datetime.date(2030, 1, 1), datetime.date(2030, 2, 1))
+        self.offer(datetime.date(2030, 1, 20), datetime.date(2030, 3, 5))
+
+        windows = list(self.flat.availability.values_list("start_date", "end_date"))
+        self.assertEqual(windows, [(datetime.date(2030, 1, 1), datetime.date(2030, 3, 20))])
+
+    def test_gap_is_not_offered(self):
+        self.offer(datetime.date(2030, 1, 1), datetime.date(2030, 1, 14))
+        self.offer(datetime.date(2030, 1, 15), datetime.date(2030, 1, 31))
+
+        self.assertEqual(self.flat.availability.count(), 2)
+        self.assertFalse(self.is_available(datetime.date(2030, 1, 10), datetime.date(2030, 1, 20)))
+        with self.assertRaises(ValidationError):
+            book_flat(self.flat, datetime.date(2030, 1, 10), datetime.date(2030, 1, 20))
+
+    def test_overlapping_booking_rejected(self):
+        self.offer(datetime.date(2030, 1, 1), datetime.date(2030, 12, 31))
+        book_flat(self.flat, datetime.date(2030, 2, 1), datetime.date(2030, 2, 10))
+
+        with self.assertRaises(ValidationError):
+            book_flat(self.flat, datetime.date(2030, 2, 9), datetime.date(2030, 2, 12))
+        book_flat(self.flat, datetime.date(2030, 2, 10), datetime.date(2030, 2, 12))  # Back to back is fine
+        self.assertFalse(self.is_available(datetime.date(2030, 2, 5), datetime.date(2030, 2, 6)))
+
+
+@override_settings(SIMILAR_FLATS_REFRESH_INTERVAL=0)
+class SimilarityVersionTests(TestCase):
+    """A worker patching its own index never skips another worker's change."""
+
+    def setUp(self):
+        cache.clear()
+        similarity.rebuild()
+        self.owner = make_user("owner")
+        self.category = Category.objects.create(title="Family")
+        self.location = Location.objects.create(title="Dhaka")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flat = make_flat(self.owner, self.category, self.location)
+        similarity.get_index()
+
+    def foreign_save(self):
+        """A flat saved by another worker: its row and version bump, but not our index."""
+        with self.captureOnCommitCallbacks(execute=False):
+            flat = make_flat(self.owner, self.category, self.location)
+        similarity.bump_version()
+        return flat
+
+    def test_local_save_after_foreign_save(self):
+        foreign = self.foreign_save()
+        with self.captureOnCommitCallbacks(execute=True):
+            local = make_flat(self.owner, self.category, self.location)
+
+        self.assertEqual(set(similarity.get_index().similar(self.flat.id, k=10)), {foreign.id, local.id})
+
+    def test_local_saves_keep_index(self):
+        index = similarity.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            local = make_flat(self.owner, self.category, self.location)
+        self.assertIs(similarity.get_index(), index)  # Patched, not rebuilt
+        self.assertEqual(index.similar(self.flat.id, k=10), [local.id])
+
+    def test_local_delete_after_foreign_save(self):
+        foreign = self.foreign_save()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_flat(self.owner, self.category, self.location).delete()
+
+        self.assertEqual(similarity.get_index().similar(self.flat.id, k=10), [foreign.id])
+
+    def test_bumps_between_reads(self):
+        # Two workers bumping after the same read each get their own number
+        version = similarity.get_version()
+        first = similarity.bump_version()
+        second = similarity.bump_version()
+        self.assertEqual((first, second), (version + 1, version + 2))
+        self.assertEqual(similarity.get_version(), second)
+
+    def test_bump_increments_in_sql(self):
+        with CaptureQueriesContext(connection) as context:
+            similarity.bump_version()
+        updates = [query["sql"] for query in context.captured_queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"value" + 1', updates[0])
+
+
+class SavedSearchMatchingTests(TestCase):
+    """New and restored active flats are matched against saved searches, once."""
+
+    def setUp(self):
+        self.owner = make_user("owner", house_holding_number="12", address="Main street")
+        self.renter = make_user("renter")
+        self.family = Category.objects.create(title="Family")
+        self.bachelor = Category.objects.create(title="Bachelor")
+        self.dhaka = Location.objects.create(title="Dhaka")
+        self.client = APIClient(SERVER_NAME="127.0.0.1")
+        self.client.force_authenticate(self.owner)
+
+    def search(self, renter=None, **criteria):
+        return SavedSearch.objects.create(renter=renter or self.renter, **criteria)
+
+    def flat(self, category=None, **fields):
+        flat = make_flat(self.owner, category or self.family, self.dhaka)
+        if fields:
+            for name, value in fields.items():
+                setattr(flat, name, value)
+            flat.save()
+        return flat
+
+    def matched(self, search):
+        return set(search.matches.values_list("flat_id", flat=True))
+
+    def test_matching(self):
+        category = self.search(category=self.family)
+        anywhere = self.search(max_price=1500)
+        rooms = self.search(location=self.dhaka, min_rooms=3)
+        other = self.search(category=self.bachelor)
+        own = self.search(renter=self.owner)
+
+        flat = self.flat(price=1200, room=3)
+        self.assertEqual(match_new_flat(flat), 3)
+        self.assertEqual(self.matched(category), {flat.id})
+        self.assertEqual(self.matched(anywhere), {flat.id})
+        self.assertEqual(self.matched(rooms), {flat.id})
+        self.assertEqual(self.matched(other), set())
+        self.assertEqual(self.matched(own), set())  # Owners aren't told about their own flats
+
+        pricey = self.flat(price=5000, room=2)
+        match_new_flat(pricey)
+        self.assertEqual(self.matched(anywhere), {flat.id})
+        self.assertEqual(self.matched(rooms), {flat.id})
+        self.assertEqual(self.matched(category), {flat.id, pricey.id})
+
+    def test_match_flats_batch(self):
+        family, bachelor = self.search(category=self.family), self.search(category=self.bachelor, max_price=3000)
+        flats = [self.flat(), self.flat(category=self.bachelor, price=2000), self.flat(category=self.bachelor, price=4000)]
+        match_flats(flats)
+        self.assertEqual(self.matched(family), {flats[0].id})
+        self.assertEqual(self.matched(bachelor), {flats[1].id})
+
+    def test_no_duplicates(self):
+        search = self.search()
+        flat = self.flat()
+        match_new_flat(flat)
+        match_new_flat(flat)
+        self.assertEqual(search.matches.count(), 1)
+
+    def test_archived_flat_not_matched(self):
+        search = self.search()
+        payload = {
+            "title": "Rented", "category": self.family.id, "location": self.dhaka.id, "flat_size": 70,
+            "room": 3, "bath": 2, "kitchen": 1, "price": 1500, "features": [], "is_active": False,
+        }
+        response = self.client.post(reverse("add-flat"), payload, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.matched(search), set())
+
+    def test_restore_matches(self):
+        search = self.search()
+        flat = self.flat(is_active=False)
+        self.client.post(reverse("bulk-update-flats"), {"ids": [flat.id], "is_active": True}, format="json")
+        self.assertEqual(self.matched(search), {flat.id})
+
+    def test_reactivation_matches(self):
+        search = self.search()
+        flat = self.flat(is_active=False)
+        self.client.put(reverse("update-delete-flat", args=[flat.id]), {"is_active": True}, format="json")
+        self.assertEqual(self.matched(search), {flat.id})
+
+    def test_restore_doesnt_notify_twice(self):
+        search = self.search()
+        flat = self.flat()
+        match_new_flat(flat)
+        search.matches.update(notified_at=timezone.now())
+
+        archive_flats(Flat.objects.filter(pk=flat.pk))
+        restore_flats(Flat.objects.filter(pk=flat.pk))
+        self.assertEqual(search.matches.count(), 1)
+        self.assertFalse(search.matches.filter(notified_at=None).exists())
+
+    def test_archiving_discards_pending(self):
+        search = self.search()
+        saved, updated, bulk, sent = self.flat(), self.flat(), self.flat(), self.flat()
+        match_flats([saved, updated, bulk, sent])
+        search.matches.filter(flat=sent).update(notified_at=timezone.now())
+
+        saved.is_active = False
+        saved.save()
+        self.client.put(reverse("update-delete-flat", args=[updated.id]), {"is_active": False}, format="json")
+        self.client.post(reverse("bulk-update-flats"), {"ids": [bulk.id], "is_active": False}, format="json")
+        archive_flats(Flat.objects.filter(pk=sent.pk))
+
+        self.assertEqual(self.matched(search), {sent.id})  # Sent notifications stay on record
+
+
+@override_settings(CACHES=DATABASE_CACHES, CLOUDINARY_CLIENT="config.cloud.OfflineCloudinaryClient")
+class BulkDeleteTests(QueryBudgetMixin, TestCase):
+    """
+    Bulk deletes cost the same number of queries for any number of flats,
+    counted with the production cache (the shared tier is a database table).
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user("owner")
+        self.category = Category.objects.create(title="Family")
+        self.location = Location.objects.create(title="Dhaka")
+        self.client = APIClient(SERVER_NAME="127.0.0.1")
+        self.client.force_authenticate(self.owner)
+
+    def bulk_delete(self, count):
+        ids = [make_flat(self.owner, self.category, self.location).id for _ in range(count)]
+        response, queries = self.capture_queries(
+            lambda: self.client.post(reverse("bulk-delete-flats"), {"ids": ids}, format="json")
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Flat.objects.filter(id__in=ids).exists())
+        return queries
+
+    def test_query_count_independent_of_ids(self):
+        self.bulk_delete(1)  # Creates the version keys, later deletes update them
+        few, many = self.bulk_delete(2), self.bulk_delete(10)
+        self.assertEqual(len(few), len(many), format_queries(many))
+        # 13 for the rows, the rest drops the caches and indexes once (about 5 per database cache write)
+        self.assertLessEqual(len(many), 55, format_queries(many))
+
+    def test_caches_dropped_once(self):
+        self.client.get(reverse("home"))
+        self.bulk_delete(3)
+        self.assertIsNone(cache.get(response_cache_key(HOME_CACHE_KEY, "json")))
+
+    def test_unread_inquiries_leave_counter(self):
+        renter = make_user("renter")
+        flats = [make_flat(self.owner, self.category, self.location) for _ in range(4)]
+        for number, flat in enumerate(flats):
+            create_inquiry(flat, renter, inquiry_data(number))
+        create_inquiry(flats[0], renter, inquiry_data(4))
+        mark_read(self.owner, [flats[3].inquiries.get().id])
+        self.assertEqual(get_unread(self.owner.id), 4)
+
+        flats[0].delete()
+        self.assertEqual(get_unread(self.owner.id), 2)
+        Flat.bulk_delete(Flat.objects.filter(id__in=[flats[1].id, flats[3].id]))
+        self.assertEqual(get_unread(self.owner.id), 1)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class TieredCacheTests(TestCase):
+    """Two workers sharing one L2: writes only drop the other worker's copies of that namespace."""
+
+    def setUp(self):
+        caches["shared"].clear()
+        self.first, self.second = self.worker(), self.worker()
+
+    def worker(self):
+        return TieredCache("", {"OPTIONS": {"L2": "shared", "VERSION_CHECK_INTERVAL": 0}})
+
+    def l1_hits(self, worker, key):
+        before = worker.stats()["l1_hits"]
+        value = worker.get(key)
+        return value, worker.stats()["l1_hits"] - before
+
+    def test_overwrite_reaches_other_worker(self):
+        self.first.set("flat:home:json", "old")
+        self.assertEqual(self.second.get("flat:home:json"), "old")
+        self.first.set("flat:home:json", "new")
+        self.assertEqual(self.second.get("flat:home:json"), "new")
+        self.first.delete("flat:home:json")
+        self.assertIsNone(self.second.get("flat:home:json"))
+
+    def test_write_keeps_other_namespaces(self):
+        self.first.set("flat:categories:json", "categories")
+        self.second.get("flat:categories:json")
+        self.first.set("flat:home:json", "home")
+        self.assertEqual(self.l1_hits(self.second, "flat:categories:json"), ("categories", 1))
+
+    def test_locks_dont_invalidate(self):
+        self.first.set("flat:home:json", "home")
+        self.second.get("flat:home:json")
+        self.assertTrue(self.first.add("flat:home:json:lock", 1, 30))
+        self.first.delete("flat:home:json:lock")
+        self.assertEqual(self.l1_hits(self.second, "flat:home:json"), ("home", 1))
+        self.assertFalse(any(key.endswith(":lock") for key in self.first._l1))
+
+    def test_fill_with_add_keeps_copies(self):
+        self.first.set("flat:categories:json", "categories")
+        self.second.get("flat:categories:json")
+        self.assertTrue(self.first.add("flat:categories:api", "browsable"))
+        self.assertEqual(self.l1_hits(self.second, "flat:categories:json"), ("categories", 1))
+
+    def test_l1_copy_capped_at_l2_expiry(self):
+        self.first.set("flat:home:json", "home", timeout=5)
+        self.second.get("flat:home:json")
+        expires_at = self.second._l1[self.second.make_key("flat:home:json")][0]
+        self.assertLessEqual(expires_at - time.monotonic(), 5)
+
+        self.first.set("flat:categories:json", "categories", timeout=None)
+        self.second.get("flat:categories:json")
+        expires_at = self.second._l1[self.second.make_key("flat:categories:json")][0]
+        self.assertGreater(expires_at - time.monotonic(), 30)  # L1_TIMEOUT
+
+    def test_incr_keeps_expiry(self):
+        self.first.set("flat:counter", 1, timeout=None)
+        self.assertEqual(self.second.incr("flat:counter"), 2)
+        self.assertIsNone(caches["shared"].get("flat:counter")[1])
+        self.assertEqual(self.first.get("flat:counter"), 2)
+
+    def test_clear(self):
+        self.first.set("flat:home:json", "home")
+        self.second.get("flat:home:json")
+        self.first.clear()
+        self.assertIsNone(self.second.get("flat:home:json"))
+
+
+class IdempotencyTests(TestCase):
+    """Retries with the same Idempotency-Key replay the first response instead of sending again."""
+
+    def setUp(self):
+        self.owner = make_user("owner")
+        self.renter = make_user("renter")
+        category = Category.objects.create(title="Family")
+        location = Location.objects.create(title="Dhaka")
+        self.flat = make_flat(self.owner, category, location)
+        self.client = APIClient(SERVER_NAME="127.0.0.1")
+        self.client.force_authenticate(self.renter)
+
+    def send(self, data, key="retry-1", slug=None):
+        return self.client.post(
+            reverse("send-message", args=[slug or self.flat.slug]),
+            data,
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays(self):
+        first = self.send(inquiry_data())
+        retry = self.send(inquiry_data())
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual((retry.status_code, retry.data), (first.status_code, first.data))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(self.flat.inquiries.count(), 1)
+
+    def test_other_body_rejected(self):
+        self.send(inquiry_data())
+        response = self.send(inquiry_data(number=2))
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.flat.inquiries.count(), 1)
+
+    def test_other_path_rejected(self):
+        other = make_flat(self.owner, self.flat.category, self.flat.location)
+        self.send(inquiry_data())
+        self.assertEqual(self.send(inquiry_data(), slug=other.slug).status_code, 422)
+
+    def test_in_progress(self):
+        IdempotencyKey.objects.create(
+            user=self.renter, key="retry-1", path=reverse("send-message", args=[self.flat.slug])
+        )
+        self.assertEqual(self.send(inquiry_data()).status_code, 409)
+        self.assertEqual(self.flat.inquiries.count(), 0)
+
+    def test_keys_are_per_user(self):
+        self.send(inquiry_data())
+        self.client.force_authenticate(make_user("renter"))
+        self.assertEqual(self.send(inquiry_data(number=2)).status_code, 200)
+        self.assertEqual(self.flat.inquiries.count(), 2)
+
+
+@override_settings(CACHES=LOCAL_CACHES, AUTOCOMPLETE_REFRESH_INTERVAL=0, AUTOCOMPLETE_BACKGROUND_REBUILD=False)
+class AutocompleteTests(TestCase):
+    """Suggestions match the start of any word of a title, most popular first."""
+
+    def setUp(self):
+        # Indexes of earlier tests go: the first get_index() then builds in this thread
+        autocomplete._index = autocomplete._index_version = None
+        autocomplete.invalidate()
+        owner = make_user("owner")
+        self.family = Category.objects.create(title="Family")
+        self.dhaka = Location.objects.create(title="Dhaka")
+        self.gulshan = Location.objects.create(title="Gulshan Dhaka")
+        self.dhanmondi = Location.objects.create(title="Dhanmondi")
+        for location, count in ((self.dhaka, 1), (self.gulshan, 3), (self.dhanmondi, 2)):
+            for _ in range(count):
+                make_flat(owner, self.family, location)
+
+    def suggest(self, query, limit=8):
+        return [(item["type"], item["title"]) for item in autocomplete.get_index().suggest(query, limit)]
+
+    def test_prefix_ordered_by_popularity(self):
+        self.assertEqual(
+            self.suggest("dh"),
+            [("location", "Gulshan Dhaka"), ("location", "Dhanmondi"), ("location", "Dhaka")],
+        )
+        self.assertEqual(self.suggest("DHAK "), [("location", "Gulshan Dhaka"), ("location", "Dhaka")])
+        self.assertEqual(self.suggest("dh", limit=1), [("location", "Gulshan Dhaka")])
+
+    def test_word_starts_only(self):
+        self.assertEqual(self.suggest("gulshan d"), [("location", "Gulshan Dhaka")])
+        self.assertEqual(self.suggest("haka"), [])
+        self.assertEqual(self.suggest(" "), [])
+
+    def test_big_ranges_precomputed(self):
+        items = [(n, "flat", n, f"Flat {n:04}", f"flat-{n}") for n in range(autocomplete.RANKED_ON_LOOKUP * 2)]
+        index = autocomplete.AutocompleteIndex(items)
+        self.assertIn("flat", index.top)
+        expected = [f"Flat {n:04}" for n in range(len(items) - 1, len(items) - 9, -1)]
+        self.assertEqual([item["title"] for item in index.suggest("fla")], expected)
+        self.assertEqual([item["title"] for item in index.suggest("flat 0001")], ["Flat 0001"])
+
+    def test_title_change_rebuilds(self):
+        self.suggest("dh")
+        with self.captureOnCommitCallbacks(execute=True):
+            Location.objects.create(title="Dhalai")
+        self.assertIn(("location", "Dhalai"), self.suggest("dhal"))
+
+    @override_settings(AUTOCOMPLETE_BACKGROUND_REBUILD=True)
+    def test_rebuild_serves_old_index(self):
+        old = autocomplete.get_index()  # First build, no thread
+        self.assertIsNone(autocomplete._rebuilding)
+        started, release = threading.Event(), threading.Event()
+        new = autocomplete.AutocompleteIndex([(1, "location", 99, "Dhalai", "dhalai")])
+
+        def slow_build():
+            started.set()
+            release.wait(5)
+            return new
+
+        with mock.patch.object(autocomplete.AutocompleteIndex, "from_database", side_effect=slow_build) as build:
+            autocomplete.invalidate()
+            self.assertIs(autocomplete.get_index(), old)  # Rebuild started
+            started.wait(5)
+            self.assertIs(autocomplete.get_index(), old)  # Still building, no second build
+            rebuilding = autocomplete._rebuilding
+            release.set()
+            rebuilding.join(5)
+
+        self.assertEqual(build.call_count, 1)
+        self.assertIs(autocomplete.get_index(), new)
+
+
+@override_settings(
+    CACHES=DATABASE_CACHES,
+    CLOUDINARY_CLIENT="config.cloud.OfflineCloudinaryClient",
+    AUTOCOMPLETE_BACKGROUND_REBUILD=False,
+)
+class DatabaseCacheBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Budgets of the cached endpoints including the cache's own queries, with
+    the shared tier in the database table as in production.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user("owner")
+        self.category = Category.objects.create(title="Family")
+        self.location = Location.objects.create(title="Dhaka")
+        with self.captureOnCommitCallbacks(execute=True):  # Sets the listings version, as in production
+            self.flats = [make_flat(self.owner, self.category, self.location) for _ in range(3)]
+        self.client = APIClient(SERVER_NAME="127.0.0.1")
+
+    def get(self, name, **params):
+        return lambda: self.client.get(reverse(name), params)
+
+    def check(self, budget, request):
+        response = self.assertQueryBudget(budget, request)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    # A miss: read, lock (an INSERT, about 5 queries with the database cache),
+    # read again, the endpoint's queries, fill, unlock. A hit on another
+    # worker reads L2 once, then L1 answers (checking for writes is 1 query).
+
+    def test_home(self):
+        self.check(16, self.get("home"))
+        self.check(2, self.get("home"))
+        self.check(1, self.get("home"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_flat(self.owner, self.category, self.location)
+        self.check(16, self.get("home"))
+
+    def test_categories(self):
+        self.check(16, self.get("categories"))
+        self.check(2, self.get("categories"))
+        self.check(1, self.get("categories"))
+
+    def test_category_page(self):
+        # The page key includes the listings version, read fresh each time
+        self.check(19, self.get("category", category=self.category.id))
+        self.check(3, self.get("category", category=self.category.id))
+        self.check(2, self.get("category", category=self.category.id))
@@ -1,12 +1,28 @@
 
 from django.urls import path
 from .views import (
+    BootstrapView,
+    CacheStatsView,
+    ProfilingReportView,
+    OwnerImageUploadSignatureView,
     AddFlatView,
     OwnerFlatListView,
     OwnerFlatUpdateDeleteView,
+    OwnerFlatBulkUpdateView,
+    OwnerFlatBulkDeleteView,
+    OwnerFlatAvailabilityView,
+    OwnerFlatBookingView,
     FlatDetailView,
+    SimilarFlatsView,
+    AutocompleteView,
     FlatListView,
     SendMessageView,
+    OwnerInboxView,
+    OwnerInboxUnreadCountView,
+    OwnerInboxMarkReadView,
+    SavedSearchListCreateView,
+    SavedSearchDeleteView,
+    SavedSearchMatchListView,
     RenterBookingListView,
     RenterBookingDeleteView,
     FlatCategoryFilterView,
@@ -19,16 +35,32 @@ from .views import (
 
 urlpatterns = [
     path('home/', HomeView.as_view(), name='home'),
+    path('bootstrap/', BootstrapView.as_view(), name='bootstrap'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('profiling/', ProfilingReportView.as_view(), name='profiling-report'),
+    path('owner/uploads/sign/', OwnerImageUploadSignatureView.as_view(), name='sign-upload'),
     path('owner/flats/add/', AddFlatView.as_view(), name='add-flat'),
     path('owner/flats_list/', OwnerFlatListView.as_view(), name='list-owner-flats'),
+    path('owner/inbox/', OwnerInboxView.as_view(), name='owner-inbox'),
+    path('owner/inbox/unread_count/', OwnerInboxUnreadCountView.as_view(), name='owner-inbox-unread-count'),
+    path('owner/inbox/mark_read/', OwnerInboxMarkReadView.as_view(), name='owner-inbox-mark-read'),
+    path('owner/flats/bulk_update/', OwnerFlatBulkUpdateView.as_view(), name='bulk-update-flats'),
+    path('owner/flats/bulk_delete/', OwnerFlatBulkDeleteView.as_view(), name='bulk-delete-flats'),
     path('owner/flats/<int:flat_id>/', OwnerFlatUpdateDeleteView.as_view(), name='update-delete-flat'),
+    path('owner/flats/<int:flat_id>/availability/', OwnerFlatAvailabilityView.as_view(), name='flat-availability'),
+    path('owner/flats/<int:flat_id>/bookings/', OwnerFlatBookingView.as_view(), name='flat-bookings'),
     path('renter/bookings/', RenterBookingListView.as_view(), name='renter-bookings'),
     path('renter/bookings/delete/<slug:slug>/', RenterBookingDeleteView.as_view(), name='delete-booking'),
     path('renter/send_message/<slug:slug>/', SendMessageView.as_view(), name='send-message'),
+    path('renter/saved_searches/', SavedSearchListCreateView.as_view(), name='saved-searches'),
+    path('renter/saved_searches/<int:pk>/', SavedSearchDeleteView.as_view(), name='delete-saved-search'),
+    path('renter/saved_searches/matches/', SavedSearchMatchListView.as_view(), name='saved-search-matches'),
     path('all_flats/', FlatListView.as_view(), name='list-flats'),
     path('flat_details/<str:slug>/', FlatDetailView.as_view(), name='flat-details'),
+    path('similar/<slug:slug>/', SimilarFlatsView.as_view(), name='similar-flats'),
     path('filter_category/', FlatCategoryFilterView.as_view(), name='category'),
     path('search/', FlatSearchView.as_view(), name='search'),
+    path('autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
     path('categories/', CategoryListView.as_view(), name='categories'),
     path('locations/', LocationListView.as_view(), name='locations'),
     path('contact/', ContactFormView.as_view(), name='contact'),
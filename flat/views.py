@@ -2,26 +2,63 @@
 
 from rest_framework.generics import RetrieveAPIView, ListAPIView, DestroyAPIView
 from rest_framework.permissions import (
+    IsAdminUser,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
     AllowAny,
 )
 from rest_framework.exceptions import ValidationError
-from django.db.models import Q, Exists, OuterRef
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Window
+from django.core.paginator import Page
+from django.utils import timezone
 from rest_framework.response import Response
-from django.core.mail import EmailMultiAlternatives, send_mail
+from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.core.cache import cache as default_cache
 from rest_framework import status, pagination
 from rest_framework.views import APIView
 
+from config.pagination import count_rows, CountedPaginator
+from config import profiling
+from config.cloud import get_client
+from user_profile.serializers import UserProfileSerializer
+
+from .cache import (
+    CachedResponseMixin,
+    HOME_CACHE_KEY,
+    CATEGORIES_CACHE_KEY,
+    LOCATIONS_CACHE_KEY,
+)
+
 from .models import (
     Flat, 
+    FlatCard,
+    SavedSearch,
+    SavedSearchMatch,
+    Inquiry,
     Category, 
     Location
 )
+from .availability import parse_date_range, filter_available, book_flat
+from .archive import archive_flats, restore_flats, listings_changed
+from . import autocomplete, similarity, cache
+from .idempotency import idempotent
+from .inbox import create_inquiry, get_unread, mark_read, send_inquiry_email
+from .saved_searches import match_new_flat
 from .serializers import (
     FlatSerializer, 
+    FlatListSerializer,
+    FlatCardSerializer,
+    FlatAvailabilitySerializer,
+    FlatBookingSerializer,
+    SavedSearchSerializer,
+    SavedSearchMatchSerializer,
+    InquirySerializer,
+    InquiryMarkReadSerializer,
+    BulkFlatIdsSerializer,
+    BulkFlatUpdateSerializer,
     MessageSerializer,
     CategorySerializer,
     LocationSerializer,
@@ -40,14 +77,26 @@ class PaginationView(pagination.PageNumberPagination):
         return max(50, total_records // 9)  # Ensures at least 50
 
     def paginate_queryset(self, queryset, request, view=None):
-        total_records = len(queryset)  # Total data count
-        self.max_page_size = self.get_max_page_size(total_records)  # Set max dynamically
+        # 🔹 Estimated or capped count instead of loading every row (see config.pagination)
+        self.total_records, self.count_is_exact = count_rows(queryset)
+        self.max_page_size = self.get_max_page_size(self.total_records)  # Set max dynamically
         return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, queryset, page_size):
+        return CountedPaginator(queryset, page_size, self.total_records, self.count_is_exact)
+
+    def get_cached_first_page_response(self, request, entry):
+        """Response for a first page cached as {"count", "count_is_exact", "results"}."""
+        self.request = request
+        paginator = CountedPaginator(entry["results"], self.page_size, entry["count"], entry["count_is_exact"])
+        self.page = Page(entry["results"], 1, paginator)
+        return self.get_paginated_response(entry["results"])
     
     def get_paginated_response(self, data):
         """Customize paginated response to include page links."""
         return Response({
             "count": self.page.paginator.count,  # Total items
+            "count_is_exact": self.page.paginator.count_is_exact,  # False for estimates and capped counts
             "total_pages": self.page.paginator.num_pages,  # Total pages
             "current_page": self.page.number,  # Current page number
             "page_size": self.page.paginator.per_page,  # Items per page
@@ -57,28 +106,108 @@ class PaginationView(pagination.PageNumberPagination):
         })
 
 
-class HomeView(ListAPIView):
-    
-    queryset = (
-        Flat.objects.select_related("owner", "category", "location")
-        # .prefetch_related("renters_who_messaged")
-        .order_by("-created_at")[:6]  # Limit to latest 6 flats
-    )
-    serializer_class = FlatSerializer
+class HomeView(CachedResponseMixin, ListAPIView):
+    cache_key = HOME_CACHE_KEY
+    queryset = FlatCard.objects.order_by("-created_at")[:6]  # Latest 6 flats, no joins
+    serializer_class = FlatCardSerializer
     permission_classes = [AllowAny]
 
 # List all Categories
-class CategoryListView(ListAPIView):
+class CategoryListView(CachedResponseMixin, ListAPIView):
+    cache_key = CATEGORIES_CACHE_KEY
     queryset = Category.objects.all()
     serializer_class = CategorySerializer 
     
     
 # List all Location
-class LocationListView(ListAPIView):
+class LocationListView(CachedResponseMixin, ListAPIView):
+    cache_key = LOCATIONS_CACHE_KEY
     queryset = Location.objects.all()
     serializer_class = LocationSerializer 
     
 
+class CacheStatsView(APIView):
+    """✅ Staff only: per-tier hit rates of the API cache in the worker serving the request"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        if not hasattr(default_cache, "stats"):
+            return Response({"error": "The cache backend keeps no statistics."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(default_cache.stats())
+
+
+class ProfilingReportView(APIView):
+    """✅ Staff only: hottest functions of profiled requests per URL name (?url_name= adds the profiles)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        url_name = request.query_params.get("url_name")
+        profiles = profiling.get_profiles(url_name)
+        report = {name: profiling.summarize(entries) for name, entries in profiles.items()}
+        if url_name:
+            report[url_name]["recent"] = profiles[url_name]
+        return Response(report)
+
+
+class BootstrapView(APIView):
+    """
+    ✅ Everything the SPA needs on page load in one request: profile, categories,
+    locations and the first page of the user's flats (owners) or bookings (renters).
+    Reference lists come from the cache, the page and its total count are one query.
+    """
+
+    permission_classes = [IsAuthenticated]
+    page_size = PaginationView.page_size
+
+    @staticmethod
+    def categories_data():
+        return CategorySerializer(Category.objects.all(), many=True).data
+
+    @staticmethod
+    def locations_data():
+        return LocationSerializer(Location.objects.all(), many=True).data
+
+    def get(self, request):
+        user = request.user
+
+        if user.user_type == "owner":
+            key = "flats"
+            queryset = Flat.objects.filter(owner=user).select_related("owner", "category", "location")
+        else:
+            key = "bookings"
+            queryset = user.messaged_flats.select_related("category", "location", "owner")
+
+        # 🔹 COUNT(*) OVER () is evaluated before LIMIT: the first page carries the total
+        page = list(
+            queryset.annotate(total_count=Window(Count("id"))).order_by("-created_at")[:self.page_size]
+        )
+
+        return Response({
+            "profile": UserProfileSerializer(user).data,
+            "categories": cache.cached_data(CATEGORIES_CACHE_KEY, self.categories_data),
+            "locations": cache.cached_data(LOCATIONS_CACHE_KEY, self.locations_data),
+            key: {
+                "count": page[0].total_count if page else 0,
+                "page_size": self.page_size,
+                "results": FlatListSerializer(page, many=True).data,
+            },
+        })
+
+
+class OwnerImageUploadSignatureView(APIView):
+    """
+    ✅ Signed parameters for uploading an image straight to Cloudinary, so the
+    API worker never receives the file. The client then sends the upload's
+    public_id, version and signature as image_N.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.user.user_type != "owner":
+            return Response({"error": "Only owners can upload images"}, status=status.HTTP_403_FORBIDDEN)
+        return Response(get_client().sign_upload(request.user.id))
+
+
 class AddFlatView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -90,7 +219,8 @@ class AddFlatView(APIView):
 
         serializer = FlatSerializer(data=request.data, context={"request": request})
         if serializer.is_valid():
-            serializer.save()
+            flat = serializer.save()
+            match_new_flat(flat)  # 🔹 Queue saved-search notifications in one batch (active flats only)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -98,7 +228,7 @@ class AddFlatView(APIView):
 class OwnerFlatListView(ListAPIView):
     """List all flats added by the logged-in owner"""
 
-    serializer_class = FlatSerializer
+    serializer_class = FlatListSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -107,8 +237,15 @@ class OwnerFlatListView(ListAPIView):
         if user.user_type != "owner":
             return Flat.objects.none()  # Return an empty queryset instead of filtering
 
+        queryset = Flat.objects.filter(owner=user)
+
+        # 🔹 ?archived=1 only archived flats, ?archived=0 only listed ones
+        archived = self.request.query_params.get("archived")
+        if archived in ("0", "1"):
+            queryset = queryset.filter(is_active=archived == "0")
+
         return (
-            Flat.objects.filter(owner=user)
+            queryset
             .select_related("owner","category", "location")
             # .prefetch_related("renters_who_messaged")
             .order_by("-created_at")  # Show newest flats first
@@ -142,11 +279,8 @@ class OwnerFlatUpdateDeleteView(APIView):
         serializer = FlatSerializer(flat, data=request.data, partial=True, context={"request": request})
         
         if serializer.is_valid():
-            # 🔹 Avoid extra queries by manually updating fields
-            for attr, value in serializer.validated_data.items():
-                setattr(flat, attr, value)
-
-            flat.save()  # 🔹 Only one save query instead of multiple updates
+            # 🔹 One save query, features are only rewritten when they were sent
+            flat = serializer.save()
 
             return Response(FlatSerializer(flat).data, status=status.HTTP_200_OK)
 
@@ -161,11 +295,121 @@ class OwnerFlatUpdateDeleteView(APIView):
         return Response({"message": "Flat deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
 
+def bulk_report(ids, done_ids, done_status):
+    """Per-id result: `done_status` for the owner's flats, not_found for the rest."""
+    return [
+        {"id": flat_id, "status": done_status if flat_id in done_ids else "not_found"}
+        for flat_id in dict.fromkeys(ids)
+    ]
+
+
+class OwnerFlatBulkUpdateView(APIView):
+    """ Change the same fields (e.g. price) on many of the owner's flats in one UPDATE """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkFlatUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        fields = dict(serializer.validated_data)
+        ids = fields.pop("ids")
+        is_active = fields.pop("is_active", None)
+
+        with transaction.atomic():
+            owned = Flat.objects.filter(owner=request.user, id__in=ids)
+            owned_ids = set(owned.select_for_update().values_list("id", flat=True))
+
+            # 🔹 One UPDATE ... WHERE id IN for the flats and one for their listing cards
+            if fields:
+                Flat.objects.filter(id__in=owned_ids).update(**fields, updated_at=timezone.now().date())
+                FlatCard.objects.filter(flat_id__in=owned_ids).update(**fields)
+
+            # 🔹 Archiving drops the cards, restoring rebuilds them in one INSERT
+            if is_active is False:
+                archive_flats(Flat.objects.filter(id__in=owned_ids))
+            elif is_active:
+                restore_flats(Flat.objects.filter(id__in=owned_ids))
+
+        if owned_ids:
+            if is_active is None:
+                cache.invalidate(*cache.LISTING_CACHE_KEYS)
+                similarity.invalidate()
+            else:
+                listings_changed()
+
+        return Response({"results": bulk_report(ids, owned_ids, "updated")}, status=status.HTTP_200_OK)
+
+
+class OwnerFlatBulkDeleteView(APIView):
+    """ Delete many of the owner's flats at once, images are removed after commit in batches """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkFlatIdsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = serializer.validated_data["ids"]
+
+        # 🔹 Queryset delete: no per-flat Flat.delete() and no synchronous Cloudinary calls
+        deleted_ids = Flat.bulk_delete(Flat.objects.filter(owner=request.user, id__in=ids))
+
+        return Response({"results": bulk_report(ids, deleted_ids, "deleted")}, status=status.HTTP_200_OK)
+
+
+class OwnerFlatAvailabilityView(APIView):
+    """ List or add the date ranges in which an owner offers a flat """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, flat_id):
+        flat = Flat.objects.filter(id=flat_id, owner=request.user).first()
+        if not flat:
+            return Response({"error": "Flat not found or unauthorized"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(FlatAvailabilitySerializer(flat.availability.all(), many=True).data)
+
+    def post(self, request, flat_id):
+        flat = Flat.objects.filter(id=flat_id, owner=request.user).first()
+        if not flat:
+            return Response({"error": "Flat not found or unauthorized"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = FlatAvailabilitySerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save(flat=flat)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class OwnerFlatBookingView(APIView):
+    """ List or record bookings of a flat; overlapping bookings are refused """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, flat_id):
+        flat = Flat.objects.filter(id=flat_id, owner=request.user).first()
+        if not flat:
+            return Response({"error": "Flat not found or unauthorized"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(FlatBookingSerializer(flat.bookings.all(), many=True).data)
+
+    def post(self, request, flat_id):
+        flat = Flat.objects.filter(id=flat_id, owner=request.user).first()
+        if not flat:
+            return Response({"error": "Flat not found or unauthorized"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = FlatBookingSerializer(data=request.data)
+        if serializer.is_valid():
+            data = serializer.validated_data
+            booking = book_flat(flat, data["start_date"], data["end_date"], renter=data.get("renter"))
+            return Response(FlatBookingSerializer(booking).data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 class RenterBookingListView(ListAPIView):
     """✅ View for renters to see their booked flats"""
 
     permission_classes = [IsAuthenticated]  # Only logged-in renters
-    serializer_class = FlatSerializer
+    serializer_class = FlatListSerializer
 
     def get_queryset(self):
         return (
@@ -201,9 +445,9 @@ class RenterBookingDeleteView(DestroyAPIView):
 
 
 class FlatDetailView(RetrieveAPIView):
-    queryset = Flat.objects.select_related(
+    queryset = Flat.objects.filter(is_active=True).select_related(
         "owner", "category", "location"
-    ).prefetch_related("renters_who_messaged")
+    ).prefetch_related("features")  # All features in one query
     serializer_class = FlatSerializer
     permission_classes = [
         IsAuthenticatedOrReadOnly
@@ -211,14 +455,49 @@ class FlatDetailView(RetrieveAPIView):
     lookup_field = "slug"  # Retrieve flat details using the slug
 
 
+class SimilarFlatsView(APIView):
+    """Flats most similar to the given one, scored over the in-memory feature matrix"""
+    permission_classes = [AllowAny]
+    default_limit = 6
+    max_limit = 24
+
+    def get(self, request, slug):
+        # Flat.slug is unique and indexed; cards only exist for active flats
+        flat_id = Flat.objects.filter(slug=slug, is_active=True).values_list("id", flat=True).first()
+        if flat_id is None:
+            return Response({"error": "Flat not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            limit = min(int(request.query_params.get("limit", self.default_limit)), self.max_limit)
+        except ValueError:
+            raise ValidationError({"error": "limit must be a number."})
+
+        ids = similarity.get_index().similar(flat_id, k=limit)
+        cards = FlatCard.objects.in_bulk(ids)  # One query, then keep the score order
+        return Response(
+            FlatCardSerializer([cards[pk] for pk in ids if pk in cards], many=True).data
+        )
+
+
+class AutocompleteView(APIView):
+    """Search box suggestions from the in-memory title index, no query per keystroke"""
+    permission_classes = [AllowAny]
+    default_limit = 8
+
+    def get(self, request):
+        query = request.query_params.get("q", "")
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            raise ValidationError({"error": "limit must be a number."})
+
+        return Response(autocomplete.get_index().suggest(query, limit=max(limit, 1)))
+
+
 class FlatListView(ListAPIView):
     pagination_class = PaginationView  # Default pagination class
-    queryset = (
-        Flat.objects.select_related("owner", "category", "location")
-        # .prefetch_related("renters_who_messaged")
-        .order_by("-created_at")
-    )
-    serializer_class = FlatSerializer
+    queryset = FlatCard.objects.order_by("-created_at")  # Denormalized cards, no joins
+    serializer_class = FlatCardSerializer
     permission_classes = [AllowAny]
 
 
@@ -228,72 +507,152 @@ class SendMessageView(APIView):
 
     permission_classes = [IsAuthenticated]  # Only logged-in renters
 
+    @idempotent
     def post(self, request, slug):
         """Handles message sending from renter to flat owner"""
 
-        # Optimize query by checking if the renter already messaged using Exists()
         flat = (
-            Flat.objects.annotate(
-                already_messaged=Exists(
-                    Flat.renters_who_messaged.through.objects.filter(
-                        flat_id=OuterRef("pk"), user_id=request.user.id
-                    )
-                )
-            )
-            .select_related("owner")  # Optimize foreign key lookup
-            .get(slug=slug)
+            Flat.objects.select_related("owner")  # Optimize foreign key lookup
+            .only("id", "title", "owner_id", "owner__first_name", "owner__email", "owner__inquiry_delivery")
+            .filter(slug=slug, is_active=True)
+            .first()
         )
+        if flat is None:
+            return Response({"error": "Flat not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = MessageSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        if flat.already_messaged:
+        validated_data = serializer.validated_data
+
+        # 🔹 Reserve the (renter, flat) pair and store the inquiry together: the
+        # unique row makes double-clicks and concurrent retries lose here.
+        # The owner's inbox is the record of the inquiry, email only notifies.
+        messaged = Flat.renters_who_messaged.through
+        try:
+            with transaction.atomic():
+                messaged.objects.create(flat_id=flat.id, user_id=request.user.id)
+                inquiry = create_inquiry(flat, request.user, validated_data)
+        except IntegrityError:
             return Response(
                 {"error": "You have already sent a message for this flat."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        serializer = MessageSerializer(data=request.data)
-        if serializer.is_valid():
-            validated_data = serializer.validated_data
-            owner_email = flat.owner.email  # Get owner's email
-
-            # Render HTML email template with dynamic data
-            email_html_content = render_to_string(
-                "emails/booking_email.html",
-                {
-                    "owner_name": flat.owner.first_name,
-                    "flat_title": flat.title,
-                    "first_name": validated_data["first_name"],
-                    "last_name": validated_data["last_name"],
-                    "email": validated_data["email"],
-                    "phone": validated_data["phone"],
-                    "message": validated_data["message"],
-                },
-            )
+        # 🔹 Owners on digest delivery get it with the others at the end of the window
+        if getattr(settings, "INQUIRY_EMAILS_ENABLED", True) and flat.owner.inquiry_delivery == "immediate":
+            try:
+                send_inquiry_email(inquiry)
+            except Exception as e:
+                print(f"Error sending inquiry email: {e}")
 
-            subject = f"Message from {validated_data['first_name']} {validated_data['last_name']} - Interested in Your Flat"
+        return Response(
+            {"success": "Message sent successfully"}, status=status.HTTP_200_OK
+        )
 
-            # Send email with both HTML & plain text versions
-            email_msg = EmailMultiAlternatives(
-                subject,
-                validated_data["message"],  # Plain text version (fallback)
-                f"EasyRent Support Team <{settings.EMAIL_HOST_USER}>",  # ✅ Shows "EasyRent" before sender email
-                [owner_email],
-            )
-            email_msg.attach_alternative(email_html_content, "text/html")
-            email_msg.send()
 
-            # 🔹 Mark renter as someone who has already sent a message (optimized bulk update)
-            flat.renters_who_messaged.add(request.user)
+class InboxPagination(pagination.CursorPagination):
+    """Keyset pagination on (owner, created_at): every page is one index range scan"""
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = "-created_at"
 
-            return Response(
-                {"success": "Message sent successfully"}, status=status.HTTP_200_OK
-            )
 
+class OwnerInboxView(ListAPIView):
+    """✅ Owners read the inquiries renters sent about their flats"""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = InquirySerializer
+    pagination_class = InboxPagination
+
+    def get_queryset(self):
+        queryset = (
+            Inquiry.objects.filter(owner=self.request.user)
+            .select_related("flat")
+            .defer("flat__images")
+        )
+        if self.request.query_params.get("unread") in ("1", "true"):
+            queryset = queryset.filter(read_at__isnull=True)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response.data["unread_count"] = get_unread(request.user.id)
+        return response
+
+
+class OwnerInboxUnreadCountView(APIView):
+    """✅ Unread inquiries badge, read from the counter row instead of COUNT(*)"""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({"unread_count": get_unread(request.user.id)})
+
+
+class OwnerInboxMarkReadView(APIView):
+    """✅ Mark several (or all) inquiries as read in one UPDATE"""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = InquiryMarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        updated = mark_read(request.user, serializer.validated_data.get("ids"))
+        return Response(
+            {"updated": updated, "unread_count": get_unread(request.user.id)},
+            status=status.HTTP_200_OK,
+        )
+
+
+class SavedSearchListCreateView(ListAPIView):
+    """✅ Renters list and save search criteria to be notified about new flats"""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = SavedSearchSerializer
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(renter=self.request.user)
+
+    def post(self, request):
+        serializer = SavedSearchSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save(renter=request.user)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class SavedSearchDeleteView(DestroyAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, pk):
+        deleted, _ = SavedSearch.objects.filter(pk=pk, renter=request.user).delete()
+        if not deleted:
+            return Response({"error": "Saved search not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"success": "Saved search removed"}, status=status.HTTP_204_NO_CONTENT)
+
+
+class SavedSearchMatchListView(ListAPIView):
+    """✅ New flats that matched the renter's saved searches"""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = SavedSearchMatchSerializer
+    pagination_class = PaginationView
+
+    def get_queryset(self):
+        return (
+            SavedSearchMatch.objects.filter(saved_search__renter=self.request.user)
+            .select_related("flat__card")
+            .order_by("-created_at")
+        )
+
+
 # Filter Blogs by category
 class FlatCategoryFilterView(ListAPIView):
-    serializer_class = FlatSerializer
+    serializer_class = FlatCardSerializer
     pagination_class = PaginationView  # Default pagination class
 
     def get_queryset(self):
@@ -302,13 +661,33 @@ class FlatCategoryFilterView(ListAPIView):
         if not category_id:
             raise ValidationError({"error": "Category ID is required."})
 
-        return (
-            Flat.objects.select_related("category", "location", "owner")
-            # .prefetch_related("renters_who_messaged")
-            .filter(category_id=category_id)
+        queryset = (
+            FlatCard.objects.filter(category_id=category_id)
             .order_by("-created_at")  # Show newest flats first
         )
 
+        date_range = parse_date_range(self.request.query_params)
+        if date_range:
+            queryset = filter_available(queryset, *date_range)
+
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        # 🔹 Plain first pages are what most visitors open: cached, rebuilt by one worker
+        if set(request.query_params) != {"category"} or not request.query_params["category"].isdigit():
+            return super().list(request, *args, **kwargs)
+
+        def first_page():
+            page = self.paginate_queryset(self.get_queryset())
+            return {
+                "count": self.paginator.page.paginator.count,
+                "count_is_exact": self.paginator.page.paginator.count_is_exact,
+                "results": self.get_serializer(page, many=True).data,
+            }
+
+        entry = cache.get_or_compute(cache.category_page_key(request.query_params["category"]), first_page)
+        return self.paginator.get_cached_first_page_response(request, entry)
+
 
 # 🔍 Why Not Use SearchFilter?
 # The SearchFilter from Django REST Framework (DRF) is great for full-text search across multiple fields
@@ -317,30 +696,32 @@ class FlatCategoryFilterView(ListAPIView):
 
 
 class FlatSearchView(ListAPIView):
-    serializer_class = FlatSerializer
+    serializer_class = FlatCardSerializer
     pagination_class = PaginationView  # Default pagination class
 
     def get_queryset(self):
-        queryset = Flat.objects.select_related(
-            "category", "location", "owner"
-        ).order_by("-created_at")  # Show newest flats first
-        
-        # .prefetch_related("renters_who_messaged")
+        # 🔹 Titles are denormalized on the card, so no joins are needed
+        queryset = FlatCard.objects.order_by("-created_at")  # Show newest flats first
 
         category_query = self.request.query_params.get("category", None)
         location_query = self.request.query_params.get("location", None)
 
         if category_query and location_query:
             queryset = queryset.filter(
-                Q(category__title__icontains=category_query)  # Filter by category
-                & Q(location__title__icontains=location_query)  # Filter by location
+                Q(category_title__icontains=category_query)  # Filter by category
+                & Q(location_title__icontains=location_query)  # Filter by location
             )
         elif category_query:
-            queryset = queryset.filter(Q(category__title__icontains=category_query))
+            queryset = queryset.filter(Q(category_title__icontains=category_query))
         elif location_query:
-            queryset = queryset.filter(Q(location__title__icontains=location_query))
+            queryset = queryset.filter(Q(location_title__icontains=location_query))
+
+        # 🔹 Free in the requested dates, checked by indexed EXISTS subqueries
+        date_range = parse_date_range(self.request.query_params)
+        if date_range:
+            queryset = filter_available(queryset, *date_range)
 
-        return queryset.distinct()
+        return queryset
 
 
 class ContactFormView(APIView):
@@ -350,7 +731,7 @@ class ContactFormView(APIView):
             name = serializer.validated_data["name"]
             email = serializer.validated_data["email"]
             phone = serializer.validated_data["phone"]
-            address = serializer.validated_data["address"]
+            address = serializer.validated_data.get("address", "")
             message = serializer.validated_data["message"]
 
             # Render email template
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.test import RequestFactory
+from django.urls import reverse
+
+from .models import Category
+from . import cache
+
+
+def get_host():
+    return settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else "localhost"
+
+
+def warm_cache(force=False, host=None):
+    """
+    Fill the shared cache with the payloads a cold deploy gets hit with:
+    home, categories, locations and the first listing page of every
+    category. Each one goes through its view, so it is stored exactly as a
+    request would store it, behind the same single-flight lock.
+    Returns (path, status_code) pairs.
+    """
+    from .views import HomeView, CategoryListView, LocationListView, FlatCategoryFilterView, BootstrapView
+
+    if force:
+        cache.invalidate(
+            cache.CATEGORIES_CACHE_KEY, cache.LOCATIONS_CACHE_KEY, *cache.LISTING_CACHE_KEYS
+        )
+
+    factory = RequestFactory(SERVER_NAME=host or get_host(), HTTP_ACCEPT="application/json")
+    requests = [
+        (HomeView, reverse("home"), {}),
+        (CategoryListView, reverse("categories"), {}),
+        (LocationListView, reverse("locations"), {}),
+    ]
+    requests += [
+        (FlatCategoryFilterView, reverse("category"), {"category": category_id})
+        for category_id in Category.objects.values_list("id", flat=True)
+    ]
+
+    results = []
+    for view, path, params in requests:
+        request = factory.get(path, params)
+        response = view.as_view()(request)
+        results.append((request.get_full_path(), response.status_code))
+
+    # Reference lists embedded in bootstrap responses
+    cache.cached_data(cache.CATEGORIES_CACHE_KEY, BootstrapView.categories_data)
+    cache.cached_data(cache.LOCATIONS_CACHE_KEY, BootstrapView.locations_data)
+    return results
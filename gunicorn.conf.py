@@ -0,0 +1,20 @@
+# Picked up automatically by gunicorn when started from the project root
+
+
+def post_worker_init(worker):
+    """
+    Warm the shared cache after a deploy when WARM_CACHE_ON_START is set.
+    Every worker runs this, the single-flight locks make one of them
+    compute each payload while the others reuse it.
+    """
+    from django.conf import settings
+
+    if not getattr(settings, "WARM_CACHE_ON_START", False):
+        return
+
+    from flat.warmup import warm_cache
+
+    try:
+        warm_cache()
+    except Exception as e:
+        print(f"Error warming the cache: {e}")
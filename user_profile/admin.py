@@ -1,4 +1,27 @@
 from django.contrib import admin
+from config.pagination import EstimatedCountPaginator
 from .models import User
 # Register your models here.
-admin.site.register(User)
\ No newline at end of file
+
+
+class UserAdmin(admin.ModelAdmin):
+    list_display = ("email", "first_name", "last_name", "user_type", "is_active", "is_staff", "created_at")
+    list_filter = ("user_type", "is_active", "is_staff")
+    search_fields = ("=email",)  # Case-insensitive exact match, on the UPPER(email) index
+    ordering = ("-created_at",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ["activate_users", "deactivate_users"]
+
+    @admin.action(description="Activate selected users")
+    def activate_users(self, request, queryset):
+        updated = queryset.update(is_active=True)  # Single UPDATE
+        self.message_user(request, f"{updated} users activated.")
+
+    @admin.action(description="Deactivate selected users")
+    def deactivate_users(self, request, queryset):
+        updated = queryset.update(is_active=False)  # Single UPDATE
+        self.message_user(request, f"{updated} users deactivated.")
+
+
+admin.site.register(User, UserAdmin)
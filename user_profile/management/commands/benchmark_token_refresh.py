@@ -0,0 +1,66 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user_profile.models import User
+from user_profile.revocation import RevocationStore
+from user_profile.tokens import RevocableTokenRefreshSerializer
+
+
+class Command(BaseCommand):
+    help = "Benchmark token/refresh with and without the revocation store (changes are rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--refreshes", type=int, default=2_000)
+        parser.add_argument("--revoked", type=int, default=200_000, help="Synthetic revocations in the store")
+        parser.add_argument("--email", help="User to issue tokens for (default: first active user)")
+
+    def time_refreshes(self, serializer_class, tokens):
+        started = time.perf_counter()
+        for token in tokens:
+            serializer = serializer_class(data={"refresh": token})
+            serializer.is_valid(raise_exception=True)
+        return len(tokens) / (time.perf_counter() - started)
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True)
+        if options["email"]:
+            users = users.filter(email=options["email"])
+        user = users.first()
+        if user is None:
+            raise CommandError("No active user to issue tokens for.")
+
+        n = options["refreshes"]
+        with transaction.atomic():
+            stock = self.time_refreshes(TokenRefreshSerializer, [str(RefreshToken.for_user(user)) for _ in range(n)])
+            revocable = self.time_refreshes(
+                RevocableTokenRefreshSerializer, [str(RefreshToken.for_user(user)) for _ in range(n)]
+            )
+            transaction.set_rollback(True)
+
+        # Membership checks alone, against a store holding --revoked jtis
+        store = RevocationStore(capacity=max(options["revoked"], 1), exact_size=options["revoked"])
+        revoked = [uuid.uuid4().hex for _ in range(options["revoked"])]
+        for jti in revoked:
+            store.add(jti)
+        misses = [uuid.uuid4().hex for _ in range(100_000)]
+
+        started = time.perf_counter()
+        for jti in misses:
+            store.contains(jti)
+        miss_us = (time.perf_counter() - started) * 1e6 / len(misses)
+
+        hits = revoked[-100_000:]
+        started = time.perf_counter()
+        for jti in hits:
+            store.contains(jti)
+        hit_us = (time.perf_counter() - started) * 1e6 / len(hits)
+
+        self.stdout.write(f"Refresh (stock, no revocation):     {stock:8.0f} /s")
+        self.stdout.write(f"Refresh (revocation + rotation):    {revocable:8.0f} /s")
+        self.stdout.write(f"Check, not revoked ({options['revoked']} stored): {miss_us:6.2f} µs")
+        self.stdout.write(f"Check, revoked:                     {hit_us:8.2f} µs")
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 # Create your models here.
 
@@ -35,6 +36,10 @@ class User(AbstractBaseUser, PermissionsMixin):
         ('owner', 'Owner'),
         ('renter', 'Renter'),
     )
+    INQUIRY_DELIVERY = (
+        ('immediate', 'Immediate'),
+        ('digest', 'Digest'),
+    )
     
     user_type = models.CharField(max_length=10, choices=USER_TYPES)
     email = models.EmailField(unique=True)
@@ -49,6 +54,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     # ✅ Extra fields for owners
     house_holding_number = models.CharField(max_length=100, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
+    # How renter inquiries are emailed: one by one, or coalesced per INQUIRY_DIGEST_WINDOW
+    inquiry_delivery = models.CharField(max_length=10, choices=INQUIRY_DELIVERY, default='immediate')
     
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
@@ -59,5 +66,25 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = CustomUserManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at"], name="user_created_idx"),  # Admin ordering
+            models.Index(fields=["user_type", "-created_at"], name="user_type_created_idx"),
+            # Admin "=email" searches are case-insensitive, which the unique index can't serve
+            models.Index(Upper("email"), name="user_email_upper_idx"),
+        ]
+
+    def __str__(self):
+        return self.email
+
+class RevokedToken(models.Model):
+    """
+    Refresh tokens that can no longer be used (rotated or logged out).
+    The in-memory revocation store is rebuilt from this table.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)  # Rows are purged once the token expired anyway
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.jti
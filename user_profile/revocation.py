@@ -0,0 +1,158 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+
+class BloomFilter:
+    """
+    Fixed size bloom filter over strings. Membership tests never miss an
+    added value; false positives happen at roughly `error_rate` once
+    `capacity` values were added.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: two 64-bit halves of one blake2b digest give all k positions
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationStore:
+    """
+    In-memory view of the RevokedToken table.
+
+    Lookups are a bloom filter test, then a bounded exact set of the most
+    recent revocations; only the rare values that pass the filter but
+    aren't in the exact set (false positives, evicted entries) reach the
+    database. New rows written by other workers are pulled in with one
+    `id > last_id` query at most once per sync interval.
+    """
+
+    def __init__(self, capacity, exact_size):
+        self.capacity = capacity
+        self.exact_size = exact_size
+        self.bloom = BloomFilter(capacity)
+        self.exact = {}  # jti -> None, insertion ordered
+        self.last_id = 0
+        self.synced_at = 0.0
+
+    @classmethod
+    def from_database(cls, capacity, exact_size):
+        from .models import RevokedToken
+
+        store = cls(capacity, exact_size)
+        store.last_id = RevokedToken.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        rows = (
+            RevokedToken.objects.filter(id__lte=store.last_id, expires_at__gt=timezone.now())
+            .order_by("id")
+            .values_list("jti", flat=True)
+            .iterator(chunk_size=10000)
+        )
+        for jti in rows:
+            store.add(jti)
+        store.synced_at = time.monotonic()
+        return store
+
+    def add(self, jti):
+        if jti in self.exact:
+            return
+        self.bloom.add(jti)
+        self.exact[jti] = None
+        if len(self.exact) > self.exact_size:
+            del self.exact[next(iter(self.exact))]  # Oldest first
+
+    def sync(self):
+        from .models import RevokedToken
+
+        for row_id, jti in RevokedToken.objects.filter(id__gt=self.last_id).order_by("id").values_list("id", "jti"):
+            self.add(jti)
+            self.last_id = row_id
+        self.synced_at = time.monotonic()
+
+    def is_full(self):
+        return self.bloom.count >= self.capacity
+
+    def contains(self, jti):
+        if jti not in self.bloom:
+            return False
+        if jti in self.exact:
+            return True
+
+        from .models import RevokedToken
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_sync_interval():
+    return getattr(settings, "TOKEN_REVOCATION_SYNC_INTERVAL", 1.0)
+
+
+def get_store():
+    """
+    This process' store, built on first use. It is rebuilt from the table
+    (dropping expired tokens) once the bloom filter reached its capacity.
+    """
+    global _store
+    with _lock:
+        if _store is None or _store.is_full():
+            _store = RevocationStore.from_database(
+                getattr(settings, "TOKEN_REVOCATION_CAPACITY", 1_000_000),
+                getattr(settings, "TOKEN_REVOCATION_EXACT_SIZE", 100_000),
+            )
+        elif time.monotonic() - _store.synced_at >= get_sync_interval():
+            _store.sync()
+        return _store
+
+
+def is_revoked(jti):
+    return get_store().contains(jti)
+
+
+def revoke(jti, expires_at):
+    """
+    Revoke a token. Returns False when it already was: the unique jti makes
+    two concurrent uses of the same refresh token lose on the INSERT.
+    """
+    from .models import RevokedToken
+
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+    except IntegrityError:
+        return False
+
+    store = get_store()
+    with _lock:
+        store.add(jti)
+    return True
+
+
+def purge_expired():
+    """Delete revocations of tokens that have expired anyway."""
+    from .models import RevokedToken
+
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
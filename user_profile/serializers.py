@@ -51,7 +51,7 @@ class RegisterSerializer(serializers.ModelSerializer):
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ['id', 'user_type', 'first_name', 'last_name', 'phone_number', 'email']
+        fields = ['id', 'user_type', 'first_name', 'last_name', 'phone_number', 'email', 'inquiry_delivery']
         read_only_fields = ['email', 'user_type']  # ✅ Make email, user_type read-only
 
     def to_representation(self, instance):
@@ -61,5 +61,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         if instance.user_type == "owner":
             data['house_holding_number'] = instance.house_holding_number
             data['address'] = instance.address
+        else:
+            data.pop('inquiry_delivery')  # Only owners receive inquiries
 
         return data
\ No newline at end of file
@@ -1,3 +1,176 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+import jwt
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.querybudget import LOCAL_CACHES, QueryBudgetMixin
+from . import revocation
+from .models import RevokedToken, User
+from .tokens import RevocableRefreshToken
+
+
+def make_user(email, user_type="renter", **extra):
+    return User.objects.create_user(
+        email=email,
+        password="secret-password",
+        user_type=user_type,
+        first_name="Test",
+        last_name="User",
+        phone_number="0123456789",
+        **extra,
+    )
+
+
+@override_settings(CACHES=LOCAL_CACHES, TOKEN_REVOCATION_SYNC_INTERVAL=3600)
+class UserProfileQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Fixed query budgets for the account endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        mail.outbox = []
+        revocation._store = None
+        revocation.get_store()
+
+        self.owner = make_user("owner@example.com", "owner", house_holding_number="12", address="Main street")
+        self.renter = make_user("renter@example.com")
+        self.client = APIClient(SERVER_NAME="127.0.0.1")
+
+    def check(self, budget, request, status=200):
+        response = self.assertQueryBudget(budget, request)
+        self.assertEqual(response.status_code, status, getattr(response, "data", None))
+        return response
+
+    def post(self, name, data, *args, method="post"):
+        return lambda: getattr(self.client, method)(reverse(name, args=args), data, format="json")
+
+    def test_register(self):
+        data = {
+            "user_type": "renter",
+            "first_name": "New",
+            "last_name": "Renter",
+            "email": "new@example.com",
+            "phone_number": "0123456789",
+            "password": "secret-password",
+            "confirm_password": "secret-password",
+        }
+        self.check(3, self.post("register", data), status=201)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_activate(self):
+        self.renter.is_active = False
+        self.renter.save()
+        token = jwt.encode(
+            {"user_id": self.renter.id, "exp": datetime.datetime.now(datetime.UTC) + datetime.timedelta(hours=1)},
+            settings.SECRET_KEY,
+            algorithm="HS256",
+        )
+        self.check(2, lambda: self.client.get(reverse("activate-account", args=[token])), status=302)
+
+    def test_login(self):
+        data = {"email": "renter@example.com", "password": "secret-password"}
+        self.check(1, self.post("login", data))
+
+    def test_token_refresh(self):
+        refresh = str(RefreshToken.for_user(self.renter))
+        # User lookup and the revocation of the rotated token
+        response = self.check(4, self.post("token_refresh", {"refresh": refresh}))
+        self.check(4, self.post("token_refresh", {"refresh": response.data["refresh"]}))
+        self.check(0, self.post("token_refresh", {"refresh": refresh}), status=401)  # Rotated out
+
+    def test_logout(self):
+        refresh = str(RefreshToken.for_user(self.renter))
+        self.check(3, self.post("logout", {"refresh": refresh}))
+        self.check(0, self.post("logout", {"refresh": refresh}), status=400)  # Found in memory
+
+    def test_profile(self):
+        for user in (self.owner, self.renter):
+            self.client.force_authenticate(user)
+            self.check(0, lambda: self.client.get(reverse("api-root")))
+            self.check(1, lambda: self.client.get(reverse("user-profile-list")))
+            self.check(1, lambda: self.client.get(reverse("user-profile-detail", args=[user.id])))
+            # Owners also rename their listing cards
+            self.check(3, self.post("user-profile-detail", {"first_name": "Changed"}, user.id, method="patch"))
+            self.check(
+                3,
+                self.post(
+                    "user-profile-detail",
+                    {"first_name": "New", "last_name": "Name", "phone_number": "0987654321"},
+                    user.id,
+                    method="put",
+                ),
+            )
+
+
+@override_settings(CACHES=LOCAL_CACHES, TOKEN_REVOCATION_SYNC_INTERVAL=0)
+class TokenRevocationTests(TestCase):
+    """Rotated and logged-out refresh tokens are refused, whichever worker revoked them."""
+
+    def setUp(self):
+        revocation._store = None
+        self.renter = make_user("renter@example.com")
+        self.client = APIClient(SERVER_NAME="127.0.0.1")
+
+    def refresh(self, token):
+        return self.client.post(reverse("token_refresh"), {"refresh": token}, format="json")
+
+    def test_rotated_token_rejected(self):
+        token = str(RefreshToken.for_user(self.renter))
+        rotated = self.refresh(token)
+        self.assertEqual(rotated.status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+        self.assertEqual(self.refresh(rotated.data["refresh"]).status_code, 200)
+
+    def test_logged_out_token_rejected(self):
+        token = str(RefreshToken.for_user(self.renter))
+        self.client.post(reverse("logout"), {"refresh": token}, format="json")
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_revoked_by_another_worker(self):
+        revocation.get_store()
+        token = RefreshToken.for_user(self.renter)
+        expires_at = datetime.datetime.fromtimestamp(token["exp"], tz=datetime.UTC)
+        RevokedToken.objects.create(jti=token["jti"], expires_at=expires_at)  # Not in our store yet
+        self.assertEqual(self.refresh(str(token)).status_code, 401)
+
+    @override_settings(TOKEN_REVOCATION_EXACT_SIZE=1)
+    def test_evicted_revocations_checked_in_database(self):
+        tokens = [RevocableRefreshToken.for_user(self.renter) for _ in range(3)]
+        for token in tokens:
+            token.blacklist()
+        self.assertEqual(len(revocation.get_store().exact), 1)
+        self.assertEqual(self.refresh(str(tokens[0])).status_code, 401)
+
+    def test_concurrent_rotation_loses(self):
+        token = RevocableRefreshToken.for_user(self.renter)
+        token.blacklist()
+        with self.assertRaises(TokenError):
+            RevocableRefreshToken(str(token)).blacklist()
+
+    @override_settings(TOKEN_REVOCATION_CAPACITY=2)
+    def test_full_store_rebuilt_without_expired(self):
+        store = revocation.get_store()
+        RevokedToken.objects.create(jti="expired", expires_at=timezone.now() - datetime.timedelta(days=1))
+        token = RevocableRefreshToken.for_user(self.renter)
+        token.blacklist()  # Syncs the expired row first, filling the store
+        self.assertTrue(store.is_full())
+
+        self.assertIsNot(revocation.get_store(), store)
+        self.assertEqual(list(revocation.get_store().exact), [token["jti"]])
+        self.assertEqual(self.refresh(str(token)).status_code, 401)
+
+    def test_bloom_filter_never_misses(self):
+        bloom = revocation.BloomFilter(1000)
+        values = [f"jti-{n}" for n in range(1000)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(f"other-{n}" in bloom for n in range(10000))
+        self.assertLess(false_positives, 50)  # error_rate 0.001: about 10
@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import revocation
+
+
+class RevocableRefreshToken(RefreshToken):
+    """
+    Refresh token checked against the in-memory revocation store instead of
+    simplejwt's token_blacklist tables (no queries on the refresh path).
+    """
+
+    def verify(self, *args, **kwargs):
+        if revocation.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+        super().verify(*args, **kwargs)
+
+    def blacklist(self):
+        """Called on rotation (BLACKLIST_AFTER_ROTATION) and on logout."""
+        expires_at = datetime.fromtimestamp(self.payload["exp"], tz=timezone.utc)
+        if not revocation.revoke(self.payload[api_settings.JTI_CLAIM], expires_at):
+            # A concurrent request already rotated or revoked this token
+            raise TokenError(_("Token is blacklisted"))
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RevocableRefreshToken
@@ -5,6 +5,7 @@ from .views import (
     RegistrationView,
     ActivateAccountView,
     LoginView,
+    LogoutView,
     UserProfileViewSet,
 )
 
@@ -16,5 +17,6 @@ urlpatterns = [
     path('register/', RegistrationView.as_view(), name = 'register'),
     path('activate/<str:token>/', ActivateAccountView.as_view(), name='activate-account'),
     path('login/', LoginView.as_view(), name = 'login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
     path('token/refresh/', jwt_views.TokenRefreshView.as_view(), name='token_refresh'),
 ]
\ No newline at end of file
@@ -4,6 +4,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import viewsets, status
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework.permissions import IsAuthenticated
 from .models import User
 from django.conf import settings
@@ -16,6 +17,7 @@ from django.shortcuts import redirect
 import jwt
 import datetime
 # Create your views here.
+from .tokens import RevocableRefreshToken
 from .serializers import (
     RegisterSerializer,
     UserProfileSerializer,
@@ -146,6 +148,20 @@ class LoginView(APIView):
         )
 
 
+class LogoutView(APIView):
+    """✅ Revoke a refresh token so it can't be used to get new access tokens"""
+    def post(self, request):
+        try:
+            # An empty string must not reach RefreshToken(), None would mint a new token
+            RevocableRefreshToken(request.data.get('refresh') or '').blacklist()
+        except TokenError:
+            return Response(
+                {"status": "error", "message": "Invalid or already revoked token."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({"status": "success"}, status=status.HTTP_200_OK)
+
+
 class UserProfileViewSet(viewsets.ModelViewSet):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]